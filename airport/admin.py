@@ -1,4 +1,8 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.db.models import Q
+from django.utils import timezone
 
 from airport.models import (Country,
                             City,
@@ -6,18 +10,287 @@ from airport.models import (Country,
                             AirplaneType,
                             Airplane,
                             Route,
+                            CancelledDeparture,
                             Flight,
+                            FlightSchedule,
                             Order,
                             Ticket,
                             Crew)
+from airport.pagination import EstimatedCountPaginator
+from airport.pricing import reprice_flights
+from airport.schedules import (check_airplane_overlaps,
+                               check_crew_conflicts,
+                               check_duration,
+                               check_sold_seats,
+                               check_time_zone,
+                               local_departure,
+                               materialize_schedules,
+                               update_schedule_flights)
 
-admin.site.register(Crew)
-admin.site.register(Country)
-admin.site.register(City)
-admin.site.register(Airport)
-admin.site.register(AirplaneType)
-admin.site.register(Airplane)
-admin.site.register(Route)
-admin.site.register(Flight)
-admin.site.register(Order)
-admin.site.register(Ticket)
+ROUTE_RELATED = (
+    "source__city__country",
+    "destination__city__country",
+)
+FLIGHT_RELATED = (
+    *(f"route__{related}" for related in ROUTE_RELATED),
+    "airplane__airplane_type",
+)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows.
+
+    Counts come from planner estimates and the unfiltered total is never
+    computed, so opening a changelist does not scan the whole table.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class IdOnlyRawIdWidget(ForeignKeyRawIdWidget):
+    """Raw id widget that doesn't fetch the related object for a label"""
+
+    def label_and_url_for_value(self, value):
+        return "", ""
+
+
+class TicketInline(admin.TabularInline):
+    """Tickets of an order, in a constant number of queries.
+
+    Each row shows ``Ticket.__str__``, which walks the flight route, so
+    they are joined up front; the flight widget would look up every
+    flight again for its label, so it shows the id only.
+    """
+
+    model = Ticket
+    extra = 0
+    raw_id_fields = ("flight",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "order", *(f"flight__{related}" for related in FLIGHT_RELATED)
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "flight":
+            kwargs["widget"] = IdOnlyRawIdWidget(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get("using"),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(Crew)
+class CrewAdmin(admin.ModelAdmin):
+    list_display = ("id", "first_name", "last_name")
+    search_fields = ("first_name", "last_name")
+
+
+@admin.register(Country)
+class CountryAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ("name", "country")
+    list_select_related = ("country",)
+    autocomplete_fields = ("country",)
+    search_fields = ("name",)
+
+
+@admin.register(Airport)
+class AirportAdmin(admin.ModelAdmin):
+    list_display = ("name", "city", "closest_big_city")
+    list_select_related = ("city__country",)
+    autocomplete_fields = ("city",)
+    search_fields = ("name",)
+
+
+@admin.register(AirplaneType)
+class AirplaneTypeAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(Airplane)
+class AirplaneAdmin(admin.ModelAdmin):
+    list_display = ("name", "airplane_type", "rows", "seats_in_row")
+    list_select_related = ("airplane_type",)
+    autocomplete_fields = ("airplane_type",)
+    search_fields = ("name",)
+
+
+@admin.register(Route)
+class RouteAdmin(admin.ModelAdmin):
+    list_display = ("id", "source", "destination", "distance")
+    list_select_related = ROUTE_RELATED
+    autocomplete_fields = ("source", "destination")
+    search_fields = ("source__name", "destination__name")
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        return queryset.select_related(*ROUTE_RELATED), may_have_duplicates
+
+
+@admin.register(Flight)
+class FlightAdmin(LargeTableAdmin):
+    list_display = (
+        "id", "route", "airplane", "departure_time", "arrival_time"
+    )
+    list_select_related = FLIGHT_RELATED
+    autocomplete_fields = ("route", "airplane", "crew")
+    date_hierarchy = "departure_time"
+    search_fields = ("=id",)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search flights by primary key only, which is always indexed"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        if not search_term.isdigit():
+            return queryset.none(), False
+
+        return queryset.filter(pk=int(search_term)), False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        reprice_flights(Flight.objects.filter(pk=obj.pk))
+
+
+class CancelledDepartureInline(admin.TabularInline):
+    """Days the schedule doesn't fly; deleting one brings its flight back"""
+
+    model = CancelledDeparture
+    extra = 0
+
+
+class FlightScheduleAdminForm(forms.ModelForm):
+    """Refuse edits the schedule's upcoming flights can't follow"""
+
+    departure_shift = None
+
+    def clean_time_zone(self):
+        check_time_zone(self.cleaned_data["time_zone"])
+        return self.cleaned_data["time_zone"]
+
+    def clean_duration(self):
+        check_duration(self.cleaned_data["duration"])
+        return self.cleaned_data["duration"]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        schedule = self.instance
+        if self.errors:
+            return cleaned_data
+
+        edited = FlightSchedule(
+            pk=schedule.pk,
+            days_of_week=cleaned_data["days_of_week"],
+            departure_time=cleaned_data["departure_time"],
+            time_zone=cleaned_data["time_zone"],
+            duration=cleaned_data["duration"],
+            valid_from=cleaned_data["valid_from"],
+            valid_until=cleaned_data["valid_until"],
+        )
+        check_crew_conflicts(edited, cleaned_data["crew"])
+        if schedule.pk is None:
+            return cleaned_data
+
+        today = timezone.now().date()
+        self.departure_shift = (
+            local_departure(edited, today) - local_departure(schedule, today)
+        )
+        check_sold_seats(schedule, cleaned_data["airplane"])
+        check_airplane_overlaps(
+            schedule,
+            cleaned_data["airplane"],
+            self.departure_shift,
+            cleaned_data["duration"],
+        )
+        return cleaned_data
+
+
+@admin.register(FlightSchedule)
+class FlightScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "route",
+        "airplane",
+        "departure_time",
+        "valid_from",
+        "valid_until",
+        "materialized_until",
+    )
+    list_select_related = FLIGHT_RELATED
+    autocomplete_fields = ("route", "airplane", "crew")
+    readonly_fields = ("materialized_until",)
+    form = FlightScheduleAdminForm
+    inlines = (CancelledDepartureInline,)
+
+    def save_related(self, request, form, formsets, change):
+        # The crew is saved here, so flights follow the schedule after it
+        super().save_related(request, form, formsets, change)
+        schedule = form.instance
+        if not change:
+            materialize_schedules(
+                FlightSchedule.objects.filter(pk=schedule.pk)
+            )
+        elif form.has_changed() or any(
+            formset.has_changed() for formset in formsets
+        ):
+            update_schedule_flights(
+                schedule,
+                shift=form.departure_shift,
+                crew_changed="crew" in form.changed_data,
+            )
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    date_hierarchy = "created_at"
+    search_fields = ("=id", "=user__email")
+    inlines = (TicketInline,)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match an order id or the exact (unique, indexed) user email"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+
+        return queryset.filter(user__email=search_term), False
+
+
+@admin.register(Ticket)
+class TicketAdmin(LargeTableAdmin):
+    list_display = ("id", "flight", "row", "seat", "order")
+    list_select_related = (
+        *(f"flight__route__{related}" for related in ROUTE_RELATED),
+        "order",
+    )
+    raw_id_fields = ("flight", "order")
+    search_fields = ("=order__id", "=flight__id")
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search tickets by their indexed order or flight foreign keys"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        if not search_term.isdigit():
+            return queryset.none(), False
+
+        return queryset.filter(
+            Q(order_id=int(search_term)) | Q(flight_id=int(search_term))
+        ), False
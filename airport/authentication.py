@@ -0,0 +1,13 @@
+from rest_framework.authentication import BaseAuthentication
+
+
+class BatchSubRequestAuthentication(BaseAuthentication):
+    """Authenticate /api/batch/ sub-requests as the batch request's user.
+
+    The batch request went through the regular authentication and
+    ``airport.batch`` attaches its credentials to the sub-requests it
+    builds in-process; requests coming from the network never carry them.
+    """
+
+    def authenticate(self, request):
+        return getattr(request._request, "batch_credentials", None)
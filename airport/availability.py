@@ -0,0 +1,418 @@
+"""Live seat availability pushed to clients as server-sent events.
+
+Writes to tickets ``publish`` the affected flights once they commit,
+through ``settings.SEAT_AVAILABILITY_BACKEND``:
+
+* ``LocalBackend`` only reaches streams of the same process. It is
+  enough for a single ASGI worker and for tests;
+* ``PostgresBackend`` sends ``NOTIFY`` on the database, and a thread in
+  every process with open streams ``LISTEN``s for it.
+
+Each event loop serving streams has a ``SeatAvailabilityHub``. It only
+marks the published flights as changed; every
+``SEAT_AVAILABILITY_INTERVAL`` seconds it reads the availability of the
+changed flights that have subscribers with one query and hands one update
+per flight to each subscriber. A burst of bookings therefore costs one
+query and one event per flight and interval, however many clients watch.
+Subscriptions keep only the latest update of each flight, so a slow
+client can't make them grow.
+
+Browsers' ``EventSource`` can't send headers, so clients first trade
+their access token for a ``StreamTicket``: a JWT that lives
+``SEAT_AVAILABILITY_TICKET_LIFETIME`` seconds, opens one stream and
+nothing else, so the copy left in access logs is worthless. Each user
+has at most ``SEAT_AVAILABILITY_MAX_STREAMS`` streams open; tickets and
+open streams are tracked in the default cache, which has to be shared by
+the processes for the limits to hold across them.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import weakref
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import Token
+
+from airport.models import Flight
+
+logger = logging.getLogger(__name__)
+
+RETRY_MILLISECONDS = 1000
+
+_hubs = weakref.WeakKeyDictionary()
+_hubs_lock = threading.Lock()
+_backend = None
+_backend_lock = threading.Lock()
+_pending = threading.local()
+
+
+class StreamTicket(Token):
+    """Short-lived JWT opening a single availability stream"""
+
+    token_type = "stream"
+    lifetime = timedelta(seconds=settings.SEAT_AVAILABILITY_TICKET_LIFETIME)
+
+
+def seat_availability(flight_ids) -> list[dict]:
+    return list(
+        Flight.objects
+        .filter(pk__in=flight_ids)
+        .order_by("pk")
+        .annotate(
+            capacity=F("airplane__rows") * F("airplane__seats_in_row"),
+            tickets_available=(
+                F("airplane__rows") * F("airplane__seats_in_row")
+                - Count("tickets")
+            ),
+        )
+        .values("id", "capacity", "tickets_available", "price")
+    )
+
+
+class Subscription:
+    """Latest update of each watched flight, waiting to be sent"""
+
+    def __init__(self, flight_ids):
+        self.flight_ids = frozenset(flight_ids)
+        self._updates = {}
+        self._ready = asyncio.Event()
+
+    def deliver(self, update):
+        self._updates[update["id"]] = update
+        self._ready.set()
+
+    async def updates(self, timeout) -> list[dict]:
+        """Wait for updates, return an empty list after ``timeout``"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return []
+
+        self._ready.clear()
+        updates, self._updates = list(self._updates.values()), {}
+        return updates
+
+
+class SeatAvailabilityHub:
+    """Subscriptions served by one event loop"""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self._changed = set()
+        self._changed_lock = threading.Lock()
+        self._flusher = None
+
+    def mark_changed(self, flight_ids):
+        """Record changed flights, safe to call from any thread"""
+        with self._changed_lock:
+            self._changed.update(flight_ids)
+
+    def subscribe(self, flight_ids) -> Subscription:
+        subscription = Subscription(flight_ids)
+        for flight_id in subscription.flight_ids:
+            self.subscriptions[flight_id].add(subscription)
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(
+                self._run()
+            )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for flight_id in subscription.flight_ids:
+            subscribers = self.subscriptions.get(flight_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[flight_id]
+
+    async def flush(self):
+        """Send the availability of flights changed since the last flush"""
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        flight_ids = changed & self.subscriptions.keys()
+        if not flight_ids:
+            return
+
+        for update in await sync_to_async(seat_availability)(flight_ids):
+            for subscription in self.subscriptions.get(update["id"], ()):
+                subscription.deliver(update)
+
+    async def _run(self):
+        while self.subscriptions:
+            await asyncio.sleep(settings.SEAT_AVAILABILITY_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to push seat availability")
+
+
+def get_hub() -> SeatAvailabilityHub:
+    """Hub of the running event loop, listening to the backend"""
+    loop = asyncio.get_running_loop()
+    with _hubs_lock:
+        hub = _hubs.get(loop)
+        if hub is None:
+            hub = _hubs[loop] = SeatAvailabilityHub()
+    get_backend().listen()
+    return hub
+
+
+def receive(flight_ids):
+    """Pass flights published by the backend to the hubs of the process"""
+    flight_ids = set(flight_ids)
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    for hub in hubs:
+        hub.mark_changed(flight_ids)
+
+
+class LocalBackend:
+    """Publishes to the streams of the current process only"""
+
+    def publish(self, flight_ids):
+        receive(flight_ids)
+
+    def listen(self):
+        pass
+
+
+class PostgresBackend:
+    """Publishes to the streams of every process with LISTEN/NOTIFY"""
+
+    channel = "seat_availability"
+
+    def __init__(self, using="default"):
+        self.using = using
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, flight_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [self.channel, ",".join(map(str, sorted(flight_ids)))],
+            )
+
+    def listen(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="seat-availability",
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def _listen(self):
+        database = connections[self.using]
+        connection = database.Database.connect(
+            **database.get_connection_params()
+        )
+        connection.autocommit = True
+        try:
+            connection.cursor().execute(f"LISTEN {self.channel}")
+            while True:
+                if select.select([connection], [], [], 60) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    payload = connection.notifies.pop(0).payload
+                    receive(int(pk) for pk in payload.split(",") if pk)
+        except Exception:
+            # The next stream opened starts a new listener
+            logger.exception("Seat availability listener stopped")
+        finally:
+            connection.close()
+
+
+def get_backend():
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.SEAT_AVAILABILITY_BACKEND)()
+        return _backend
+
+
+def _pending_flights(using) -> set[int]:
+    if not hasattr(_pending, "flight_ids"):
+        _pending.flight_ids = {}
+
+    return _pending.flight_ids.setdefault(using, set())
+
+
+def _flush_pending_flights(using):
+    flight_ids = _pending_flights(using)
+    if flight_ids:
+        published = set(flight_ids)
+        flight_ids.clear()
+        get_backend().publish(published)
+
+
+def publish(flight_ids, using=DEFAULT_DB_ALIAS):
+    """Push the availability of the flights once the transaction commits.
+
+    Like ``mark_changed``, flights are collected per thread and the first
+    callback of a transaction publishes all of them. A failed publish is
+    logged and doesn't fail the committed write.
+    """
+    flight_ids = set(flight_ids)
+    if flight_ids:
+        _pending_flights(using).update(flight_ids)
+        transaction.on_commit(
+            lambda: _flush_pending_flights(using), using=using, robust=True
+        )
+
+
+def format_event(update) -> str:
+    data = json.dumps({
+        "flight": update["id"],
+        "capacity": update["capacity"],
+        "tickets_available": update["tickets_available"],
+        "price": None if update["price"] is None else str(update["price"]),
+    })
+    return f"event: availability\ndata: {data}\n\n"
+
+
+async def _authenticate(request):
+    """User of the JWT in the Authorization header or of ``?ticket=``"""
+    authentication = JWTAuthentication()
+    raw_ticket = request.GET.get("ticket")
+    if raw_ticket is not None:
+        try:
+            token = StreamTicket(raw_ticket)
+        except TokenError as error:
+            raise AuthenticationFailed(str(error)) from error
+        used = not await cache.aadd(
+            f"stream-ticket:{token['jti']}", True,
+            timeout=settings.SEAT_AVAILABILITY_TICKET_LIFETIME,
+        )
+        if used:
+            raise AuthenticationFailed("Ticket was already used.")
+    else:
+        header = authentication.get_header(request)
+        raw_token = header and authentication.get_raw_token(header)
+        if not raw_token:
+            raise AuthenticationFailed("Authentication credentials were not "
+                                       "provided.")
+        token = authentication.get_validated_token(raw_token)
+
+    return await sync_to_async(authentication.get_user)(token)
+
+
+def _streams_key(user) -> str:
+    return f"availability-streams:{user.pk}"
+
+
+async def _open_stream(user) -> bool:
+    """Count a stream of the user, False when they have too many open"""
+    key = _streams_key(user)
+    # Counts of streams dropped without closing expire with them
+    timeout = settings.SEAT_AVAILABILITY_STREAM_TIMEOUT + 60
+    await cache.aadd(key, 0, timeout=timeout)
+    try:
+        streams = await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=timeout)
+        return True
+
+    await cache.atouch(key, timeout=timeout)
+    if streams > settings.SEAT_AVAILABILITY_MAX_STREAMS:
+        await _close_stream(user)
+        return False
+    return True
+
+
+async def _close_stream(user):
+    try:
+        await cache.adecr(_streams_key(user))
+    except ValueError:
+        # Expired meanwhile
+        pass
+
+
+async def _events(hub, subscription, snapshot, user):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SEAT_AVAILABILITY_STREAM_TIMEOUT
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        for update in snapshot:
+            yield format_event(update)
+
+        # Streams end after a while, and clients reconnect: the ASGI
+        # handler of Django 4.2 does not stop them on disconnect
+        while (remaining := deadline - loop.time()) > 0:
+            updates = await subscription.updates(
+                min(settings.SEAT_AVAILABILITY_HEARTBEAT, remaining)
+            )
+            if not updates:
+                yield ": keep-alive\n\n"
+            for update in updates:
+                yield format_event(update)
+    finally:
+        hub.unsubscribe(subscription)
+        await _close_stream(user)
+
+
+async def availability_stream(request):
+    """Stream seat availability of ``?flights=1,2`` as server-sent events"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Streaming requires an ASGI server."}, status=501
+        )
+
+    try:
+        user = await _authenticate(request)
+    except AuthenticationFailed as error:
+        return JsonResponse({"detail": str(error.detail)}, status=401)
+
+    try:
+        flight_ids = {
+            int(flight_id)
+            for flight_id in request.GET.get("flights", "").split(",")
+            if flight_id.strip()
+        }
+    except ValueError:
+        flight_ids = set()
+    max_flights = settings.SEAT_AVAILABILITY_MAX_FLIGHTS
+    if not 0 < len(flight_ids) <= max_flights:
+        return JsonResponse(
+            {"flights": f"Pass 1 to {max_flights} flight ids "
+                        f"(ex. ?flights=1,2)."},
+            status=400,
+        )
+
+    if not await _open_stream(user):
+        return JsonResponse({"detail": "Too many open streams."},
+                            status=429)
+
+    # Subscribe before reading the snapshot, so no change falls between
+    hub = get_hub()
+    subscription = hub.subscribe(flight_ids)
+    snapshot = await sync_to_async(seat_availability)(flight_ids)
+    if not snapshot:
+        hub.unsubscribe(subscription)
+        await _close_stream(user)
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    response = StreamingHttpResponse(
+        _events(hub, subscription, snapshot, user),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
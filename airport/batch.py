@@ -0,0 +1,202 @@
+"""Batch endpoint multiplexing several API calls into one request.
+
+Every sub-request is dispatched in-process to the regular view,
+authenticated as the batch user by ``BatchSubRequestAuthentication`` and
+throttled like a request of its own. Consecutive read-only sub-requests
+run concurrently in a thread pool, while each write is a barrier executed
+on its own so later sub-requests observe its effects. A sub-request
+failing with an unexpected error gets a 500 entry; the others still run.
+Streaming responses (manifests, files) can't be embedded and get a 400
+entry.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, connections
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from airport.serializers import (BatchRequestSerializer,
+                                 BatchResponseSerializer)
+
+logger = logging.getLogger(__name__)
+
+BATCH_URL_PREFIXES = ("/api/airport/", "/api/user/")
+INHERITED_HEADERS = (
+    "HTTP_HOST",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT_LANGUAGE",
+    "HTTP_X_FORWARDED_FOR",
+    "HTTP_X_FORWARDED_PROTO",
+)
+
+
+def _sub_request_environ(request, sub_request):
+    url = urlsplit(sub_request["url"])
+    body = b""
+    if sub_request.get("body") is not None:
+        body = json.dumps(sub_request["body"]).encode()
+
+    environ = {
+        key: value
+        for key, value in request.META.items()
+        if not key.startswith(("HTTP_", "CONTENT_"))
+        or key in INHERITED_HEADERS
+    }
+    for name, value in sub_request.get("headers", {}).items():
+        key = "HTTP_" + name.upper().replace("-", "_")
+        if key not in INHERITED_HEADERS + ("HTTP_AUTHORIZATION",):
+            environ[key] = value
+
+    environ.update({
+        "REQUEST_METHOD": sub_request["method"],
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": BytesIO(body),
+    })
+    return environ
+
+
+def _error(sub_request, status_code, detail):
+    return {
+        "key": sub_request.get("key"),
+        "status": status_code,
+        "headers": {},
+        "body": {"detail": detail},
+    }
+
+
+def dispatch_sub_request(request, sub_request):
+    """Run one sub-request through its view and return its response data"""
+    path = urlsplit(sub_request["url"]).path
+    if not path.startswith(BATCH_URL_PREFIXES):
+        return _error(
+            sub_request, status.HTTP_400_BAD_REQUEST, "URL not allowed."
+        )
+
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(sub_request, status.HTTP_404_NOT_FOUND, "Not found.")
+
+    django_request = WSGIRequest(_sub_request_environ(request, sub_request))
+    django_request.batch_credentials = (request.user, request.auth)
+    django_request.resolver_match = match
+
+    try:
+        response = match.func(django_request, *match.args, **match.kwargs)
+        if response.streaming:
+            # Not response.close(): it sends request_finished, which would
+            # close the database connection of the batch request
+            return _error(
+                sub_request,
+                status.HTTP_400_BAD_REQUEST,
+                "Streaming responses can't be batched.",
+            )
+        if hasattr(response, "render"):
+            response.render()
+        body = response.content.decode(response.charset or "utf-8")
+        if body and response.get("Content-Type", "").startswith(
+                "application/json"
+        ):
+            body = json.loads(body)
+    except Exception:
+        logger.exception(
+            "Batch sub-request %s %s failed", sub_request["method"], path
+        )
+        return _error(
+            sub_request,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "Internal server error.",
+        )
+
+    return {
+        "key": sub_request.get("key"),
+        "status": response.status_code,
+        "headers": {
+            name: value
+            for name, value in response.items()
+            if name in ("Content-Type", "ETag", "Last-Modified", "Location")
+        },
+        "body": body if body != "" else None,
+    }
+
+
+def _dispatch_in_thread(request, sub_request):
+    try:
+        return dispatch_sub_request(request, sub_request)
+    finally:
+        connections.close_all()
+
+
+def _read_only_groups(sub_requests):
+    """Split sub-requests into runs of reads separated by single writes"""
+    group = []
+    for sub_request in sub_requests:
+        if sub_request["method"] in SAFE_METHODS:
+            group.append(sub_request)
+            continue
+
+        if group:
+            yield group
+            group = []
+        yield [sub_request]
+
+    if group:
+        yield group
+
+
+class BatchView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def run_group(self, request, group):
+        """Run a group of sub-requests, concurrently when it is safe to.
+
+        Worker threads use their own database connections, so they could
+        not see uncommitted writes of an enclosing transaction: in that
+        case the group runs sequentially.
+        """
+        concurrent = (
+            len(group) > 1
+            and group[0]["method"] in SAFE_METHODS
+            and settings.BATCH_MAX_WORKERS > 1
+            and not connection.in_atomic_block
+        )
+        if not concurrent:
+            return [
+                dispatch_sub_request(request, sub_request)
+                for sub_request in group
+            ]
+
+        max_workers = min(settings.BATCH_MAX_WORKERS, len(group))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(partial(_dispatch_in_thread, request), group)
+            )
+
+    @extend_schema(
+        request=BatchRequestSerializer,
+        responses=BatchResponseSerializer,
+    )
+    def post(self, request):
+        """Endpoint running several API requests and returning all results"""
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        responses = []
+        for group in _read_only_groups(serializer.validated_data["requests"]):
+            responses.extend(self.run_group(request, group))
+
+        return Response({"responses": responses}, status=status.HTTP_200_OK)
@@ -0,0 +1,157 @@
+"""Boarding pass images, rendered off the booking path.
+
+Once an order commits, its tickets are handed to a pool of worker
+processes drawing the passes with Pillow (``airport.pass_renderer``), so
+neither the order transaction nor the GIL of the serving process pays
+for it. Images are cached in ``BOARDING_PASS_DIR`` under a digest of
+their content, so a pass is drawn again only when its flight, route or
+airplane changed. A pass that is missing when downloaded is rendered on
+demand, and concurrent requests for the same pass share one render.
+A pool broken by a dying worker is replaced on the next render.
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from airport.models import Ticket
+from airport.pass_renderer import write_pass
+
+TIME_FORMAT = "%d %b %Y %H:%M"
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def pass_tickets():
+    return Ticket.objects.select_related(
+        "order__user",
+        "flight__route__source__city",
+        "flight__route__destination__city",
+        "flight__airplane",
+    )
+
+
+def pass_data(ticket) -> dict:
+    """Everything printed on the pass of ``ticket``, as plain values"""
+    flight = ticket.flight
+    route = flight.route
+    return {
+        "ticket": ticket.id,
+        "order": ticket.order_id,
+        "passenger": ticket.order.user.email,
+        "flight": flight.id,
+        "source": route.source.name,
+        "source_city": route.source.city.name,
+        "destination": route.destination.name,
+        "destination_city": route.destination.city.name,
+        "departure": timezone.localtime(flight.departure_time).strftime(
+            TIME_FORMAT
+        ),
+        "arrival": timezone.localtime(flight.arrival_time).strftime(
+            TIME_FORMAT
+        ),
+        "airplane": flight.airplane.name,
+        "row": ticket.row,
+        "seat": ticket.seat,
+    }
+
+
+def pass_digest(data) -> str:
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True).encode()
+    ).hexdigest()[:16]
+
+
+def pass_path(data) -> Path:
+    return (
+        Path(settings.BOARDING_PASS_DIR)
+        / f"{data['ticket']}-{pass_digest(data)}.png"
+    )
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers do not inherit the server's threads and
+            # database connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.BOARDING_PASS_WORKERS,
+                mp_context=get_context("spawn"),
+            )
+        return _executor
+
+
+def _replace_executor(broken):
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _forget(path, future):
+    with _pending_lock:
+        if _pending.get(path) is future:
+            del _pending[path]
+
+
+def render(data):
+    """Return the future of the pass image, None when it is cached"""
+    path = pass_path(data)
+    with _pending_lock:
+        future = _pending.get(path)
+        if future is not None or path.is_file():
+            return future
+
+        executor = get_executor()
+        try:
+            future = executor.submit(write_pass, data, str(path))
+        except BrokenProcessPool:
+            _replace_executor(executor)
+            future = get_executor().submit(write_pass, data, str(path))
+        _pending[path] = future
+
+    future.add_done_callback(partial(_forget, path))
+    return future
+
+
+def discard_render(data, future):
+    """Forget a failed render so the next download starts a new one"""
+    _forget(pass_path(data), future)
+
+
+def render_order_passes(order_id):
+    """Queue the passes of an order, called once it committed"""
+    for ticket in pass_tickets().filter(order_id=order_id):
+        render(pass_data(ticket))
+
+
+def wait_for_passes(timeout=None):
+    """Block until the queued passes are written"""
+    with _pending_lock:
+        futures = list(_pending.values())
+    wait(futures, timeout=timeout)
+
+
+def discard_passes(ticket_ids):
+    """Remove the cached passes of cancelled tickets"""
+    directory = Path(settings.BOARDING_PASS_DIR)
+    if not directory.is_dir():
+        return
+
+    for ticket_id in ticket_ids:
+        for path in directory.glob(f"{ticket_id}-*.png"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,140 @@
+"""Ticket cancellation.
+
+Seats are counted from tickets, so deleting a ticket is what frees its
+seat. ``QuerySet.delete()`` would load every ticket and send a
+``post_delete`` signal per row, since ``airport.signals`` listens to
+deletes of all models; cancellations instead delete tickets, and the
+orders they leave empty, with plain ``DELETE`` statements by primary key
+inside the transaction and bump the table versions themselves. Fares of
+the affected flights are recomputed and cached boarding passes discarded
+once the transaction commits. Tickets are checked, for departed flights
+among others, only once their rows are locked.
+
+A cancelled flight of a schedule leaves a ``CancelledDeparture``, so
+materializing the schedule again doesn't bring it back.
+"""
+from dataclasses import dataclass, replace
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from airport.availability import publish
+from airport.boarding_passes import discard_passes
+from airport.conditional import mark_changed
+from airport.models import CancelledDeparture, Flight, Order, Ticket
+from airport.pricing import reprice_flights
+
+
+@dataclass(frozen=True)
+class Cancellation:
+    tickets: int
+    orders: int
+    refund: Decimal
+    flights: int = 0
+
+
+def _delete_rows(model, ids) -> int:
+    """Delete rows by primary key without loading them or sending signals"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    ids = list(ids)
+    batch_size = max(connection.ops.bulk_batch_size(["pk"], ids), 1)
+
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {column} IN ({placeholders})",
+                batch,
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
+def cancel_tickets(tickets, ticket_ids=None) -> Cancellation:
+    """Cancel a queryset of tickets and delete the orders left empty.
+
+    With ``ticket_ids``, only those tickets are cancelled and all of them
+    must be in ``tickets``. Raises ``ValidationError`` when they aren't or
+    a ticket's flight has departed. The refund is the total fare the
+    tickets were sold at.
+    """
+    if ticket_ids is not None:
+        ticket_ids = set(ticket_ids)
+        tickets = tickets.filter(pk__in=ticket_ids)
+
+    with transaction.atomic():
+        # Locking the rows first makes concurrent cancellations of the
+        # same tickets refund them once
+        cancelled = list(
+            tickets.select_for_update()
+            .order_by("pk")
+            .values_list("pk", "order_id", "flight_id", "price")
+        )
+        order_ids = {order_id for _, order_id, _, _ in cancelled}
+        flight_ids = {flight_id for _, _, flight_id, _ in cancelled}
+        if ticket_ids is not None and len(cancelled) != len(ticket_ids):
+            raise ValidationError(
+                {"tickets": "Tickets must belong to the order."}
+            )
+        if Flight.objects.filter(
+            pk__in=flight_ids, departure_time__lte=timezone.now()
+        ).exists():
+            raise ValidationError(
+                {"tickets": "Tickets of departed flights can't be cancelled."}
+            )
+
+        ticket_ids = [ticket_id for ticket_id, _, _, _ in cancelled]
+
+        deleted_tickets = _delete_rows(Ticket, ticket_ids)
+        deleted_orders = _delete_rows(
+            Order,
+            Order.objects.filter(pk__in=order_ids)
+            .filter(~Exists(Ticket.objects.filter(order=OuterRef("pk"))))
+            .order_by("pk")
+            .values_list("pk", flat=True),
+        )
+
+        if deleted_tickets:
+            mark_changed(Ticket, Order)
+            # The cancellation stands even if the follow-ups fail
+            flights = Flight.objects.filter(pk__in=flight_ids)
+            transaction.on_commit(
+                lambda: reprice_flights(flights), robust=True
+            )
+            transaction.on_commit(
+                lambda: discard_passes(ticket_ids), robust=True
+            )
+            publish(flight_ids)
+
+    return Cancellation(
+        tickets=deleted_tickets,
+        orders=deleted_orders,
+        refund=sum(
+            (price or Decimal("0") for _, _, _, price in cancelled),
+            Decimal("0.00"),
+        ),
+    )
+
+
+def cancel_flight(flight) -> Cancellation:
+    """Cancel every ticket of the flight, then the flight itself"""
+    with transaction.atomic():
+        cancellation = cancel_tickets(Ticket.objects.filter(flight=flight))
+        if flight.schedule_id is not None:
+            schedule = flight.schedule
+            CancelledDeparture.objects.get_or_create(
+                schedule=schedule,
+                day=flight.departure_time.astimezone(
+                    ZoneInfo(schedule.time_zone)
+                ).date(),
+            )
+        flight.delete()
+
+    return replace(cancellation, flights=1)
@@ -0,0 +1,186 @@
+"""Conditional GET support based on per-table change versions.
+
+Every committed write to an airport table bumps its ``TableVersion`` row
+(see ``airport.signals``). A list or detail response only depends on the
+tables its serializers read, so their versions together with the request
+URL identify the representation and make a strong ETag. The check runs
+right after authentication, before any queryset is evaluated.
+
+``Last-Modified`` only has a one-second resolution, so it is left out
+while writes may still land in the second of the latest one, and
+``If-Modified-Since`` is ignored whenever ``If-None-Match`` is sent.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from airport.models import TableVersion
+
+
+_pending = threading.local()
+
+
+def _pending_labels(using) -> set[str]:
+    if not hasattr(_pending, "labels"):
+        _pending.labels = {}
+
+    return _pending.labels.setdefault(using, set())
+
+
+def _flush_pending_labels(using):
+    labels = _pending_labels(using)
+    if labels:
+        pending = set(labels)
+        labels.clear()
+        bump_versions(pending, using=using)
+
+
+def bump_versions(labels, using=DEFAULT_DB_ALIAS):
+    now = timezone.now()
+    versions = TableVersion.objects.using(using)
+    for label in sorted(labels):
+        updated = versions.filter(label=label).update(
+            version=F("version") + 1, updated_at=now
+        )
+        if not updated:
+            versions.get_or_create(
+                label=label, defaults={"version": 1, "updated_at": now}
+            )
+
+
+def mark_changed(*models, using=DEFAULT_DB_ALIAS):
+    """Bump the versions of the models' tables once the write commits.
+
+    Signals call this for single-object writes; set-based writes
+    (``update()``, ``bulk_create()``) must call it themselves. Labels are
+    collected per thread and the first on_commit callback of a
+    transaction bumps all of them, the following ones find nothing left.
+    """
+    _pending_labels(using).update(
+        model._meta.label_lower for model in models
+    )
+    # Robust callbacks are logged by their __qualname__, which partial
+    # objects lack
+    transaction.on_commit(
+        lambda: _flush_pending_labels(using), using=using, robust=True
+    )
+
+
+def current_versions(models, using=DEFAULT_DB_ALIAS):
+    """Return ``{label: (version, updated_at)}`` in a single query"""
+    labels = sorted(model._meta.label_lower for model in models)
+    versions = {label: (0, None) for label in labels}
+    versions.update(
+        (label, (version, updated_at))
+        for label, version, updated_at in (
+            TableVersion.objects.using(using)
+            .filter(label__in=labels)
+            .values_list("label", "version", "updated_at")
+        )
+    )
+    return versions
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Serve ETag/Last-Modified and answer 304 from table versions.
+
+    ``etag_models`` lists every model the responses read. Responses that
+    differ per user (e.g. orders) set ``etag_per_user`` and vary on
+    ``Authorization``; responses that change with the clock (e.g.
+    upcoming flights) set ``etag_time_bucket`` to the number of seconds
+    an ETag may stay valid.
+    """
+
+    etag_models = ()
+    etag_per_user = False
+    etag_time_bucket = None
+    conditional_actions = ("list", "retrieve")
+
+    def get_validators(self, request):
+        versions = current_versions(self.etag_models)
+        updated = [updated_at for _, updated_at in versions.values()
+                   if updated_at]
+        bucket = ""
+        if self.etag_time_bucket:
+            bucket = int(time.time() // self.etag_time_bucket)
+            updated.append(datetime.fromtimestamp(
+                bucket * self.etag_time_bucket, tz=dt_timezone.utc
+            ))
+
+        key = "|".join([
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(request.user.pk) if self.etag_per_user else "",
+            str(bucket),
+            *(f"{label}:{version}"
+              for label, (version, _) in versions.items()),
+        ])
+        etag = quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+        last_modified = max(updated) if updated else None
+        if last_modified and last_modified.timestamp() >= int(time.time()):
+            # Another write in this second would keep the same value
+            last_modified = None
+
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if (
+            request.method not in ("GET", "HEAD")
+            or self.action not in self.conditional_actions
+            or not self.etag_models
+        ):
+            return
+
+        etag, last_modified = self.get_validators(request)
+        self.conditional_validators = etag, last_modified
+        if "HTTP_IF_NONE_MATCH" in request.META:
+            last_modified = None
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified else None
+            ),
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        validators = getattr(self, "conditional_validators", None)
+        if self.etag_per_user:
+            patch_vary_headers(response, ["Authorization"])
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(
+                    last_modified.timestamp()
+                )
+
+        return response
@@ -0,0 +1,99 @@
+"""Airplane scheduling checks.
+
+On PostgreSQL double-booking is prevented by the
+``flight_airplane_no_overlap`` exclusion constraint over
+``tstzrange(departure_time, arrival_time)`` per airplane. Other backends
+fall back to an EXISTS query on the ``(airplane, departure_time)`` index,
+run after ``lock_airplane`` so concurrent bookings of an airplane are
+checked one at a time.
+
+No flight lasts longer than ``settings.MAX_FLIGHT_DURATION``, so the
+flights overlapping a period all depart less than that before it starts:
+lookups bound ``departure_time`` on both sides and only scan that slice
+of the index instead of the airplane's whole history.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+
+from airport.models import Airplane, Flight
+
+AIRPLANE_OVERLAP_CONSTRAINT = "flight_airplane_no_overlap"
+AIRPLANE_OVERLAP_MESSAGE = (
+    "The airplane is already scheduled for another flight at this time."
+)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    start: datetime
+    end: datetime
+
+
+def enforced_by_database(using="default") -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def is_airplane_overlap_error(error) -> bool:
+    return AIRPLANE_OVERLAP_CONSTRAINT in str(error)
+
+
+def lock_airplane(airplane_id: int):
+    """Lock the airplane row until the end of the transaction"""
+    list(
+        Airplane.objects
+        .select_for_update()
+        .filter(pk=airplane_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def overlapping_flights(
+        airplane_id: int,
+        departure_time: datetime,
+        arrival_time: datetime,
+        exclude_flight_id: int | None = None,
+):
+    return (
+        Flight.objects
+        .filter(
+            airplane_id=airplane_id,
+            departure_time__gt=departure_time - settings.MAX_FLIGHT_DURATION,
+            departure_time__lt=arrival_time,
+            arrival_time__gt=departure_time,
+        )
+        .exclude(pk=exclude_flight_id)
+    )
+
+
+def airplane_free_windows(
+        airplane_id: int,
+        start: datetime,
+        end: datetime,
+) -> list[TimeWindow]:
+    """Return the gaps between the airplane's flights inside a period"""
+    busy = (
+        Flight.objects
+        .filter(
+            airplane_id=airplane_id,
+            departure_time__gt=start - settings.MAX_FLIGHT_DURATION,
+            departure_time__lt=end,
+            arrival_time__gt=start,
+        )
+        .order_by("departure_time")
+        .values_list("departure_time", "arrival_time")
+    )
+
+    windows = []
+    free_from = start
+    for departure_time, arrival_time in busy:
+        if departure_time > free_from:
+            windows.append(TimeWindow(free_from, departure_time))
+        free_from = max(free_from, arrival_time)
+
+    if free_from < end:
+        windows.append(TimeWindow(free_from, end))
+
+    return windows
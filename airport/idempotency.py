@@ -0,0 +1,94 @@
+"""Idempotency keys for create endpoints.
+
+A client sending ``Idempotency-Key`` gets the stored response of the
+first request with that key back when it retries, instead of creating
+the object again. The key row is inserted in the same transaction as
+the object, so a concurrent duplicate blocks on the unique index until
+the first request commits and then replays its response, or proceeds if
+it rolled back. Only successful responses are stored, failed requests
+can be retried with the same key.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from airport.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description="Unique key of the request; retries with the same key "
+                "replay the first response instead of creating again",
+)
+
+
+def request_hash(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method} {request.path}\n{body}".encode()
+    ).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """Replay the response of a create retried with the same key"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({
+                IDEMPOTENCY_HEADER: f"Must be 1 to {MAX_KEY_LENGTH} "
+                                    f"characters long."
+            })
+
+        keys = IdempotencyKey.objects.filter(user=request.user)
+        keys.filter(
+            created_at__lt=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        ).delete()
+        fingerprint = request_hash(request)
+        try:
+            with transaction.atomic():
+                stored = IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    request_hash=fingerprint,
+                    status_code=status.HTTP_201_CREATED,
+                    response={},
+                )
+                response = super().create(request, *args, **kwargs)
+                stored.status_code = response.status_code
+                stored.response = response.data
+                stored.save(update_fields=["status_code", "response"])
+        except IntegrityError:
+            stored = keys.filter(key=key).first()
+            if stored is None:
+                raise
+            return self.replay(stored, fingerprint)
+
+        return response
+
+    @staticmethod
+    def replay(stored, fingerprint):
+        if stored.request_hash != fingerprint:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} was already used for "
+                           f"a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+
+        response = Response(stored.response, status=stored.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
@@ -0,0 +1,268 @@
+"""Load generator for ``manage.py loadtest``.
+
+Virtual users run weighted booking scenarios over plain HTTP, so this
+module does not touch the ORM and can be imported by the worker
+processes without setting Django up.
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote
+from urllib.request import Request, urlopen
+
+from django.urls import reverse
+
+REQUEST_TIMEOUT = 30
+TOKEN_MAX_AGE = 240  # access tokens live 5 minutes
+MAX_SEATS_PER_ORDER = 2
+# More users must add this much throughput or the server is saturated
+SATURATION_GAIN = 0.1
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+def api_paths() -> dict:
+    """Resolve the endpoints the scenarios call from the URLconf"""
+    return {
+        "register": reverse("user:create"),
+        "token": reverse("user:token_obtain_pair"),
+        "flights": reverse("airport:flight-list"),
+        "flight": unquote(reverse("airport:flight-detail", args=["{pk}"])),
+        "orders": reverse("airport:order-list"),
+    }
+
+
+class VirtualUser:
+    """One simulated customer with its own account and JWT"""
+
+    def __init__(self, base_url, paths, samples, rng):
+        self.base_url = base_url
+        self.paths = paths
+        self.samples = samples
+        self.rng = rng
+        self.new_identity()
+
+    def new_identity(self):
+        self.email = f"loadtest-{uuid.uuid4().hex}@example.com"
+        self.password = uuid.uuid4().hex
+        self.registered = False
+        self.token = None
+        self.token_obtained_at = 0.0
+
+    def call(self, name, method, path, data=None, expected=(200,)):
+        """Send a request, record its sample and return the decoded body"""
+        headers = {"Accept": "application/json"}
+        body = None
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(data).encode()
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        request = Request(self.base_url + path, data=body, headers=headers,
+                          method=method)
+        start = time.perf_counter()
+        try:
+            with urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                status, content = response.status, response.read()
+        except HTTPError as error:
+            status, content = error.code, error.read()
+        except (URLError, OSError):
+            status, content = 0, b""
+        self.samples.append(
+            (name, status, time.perf_counter() - start, status in expected)
+        )
+
+        if status not in expected:
+            raise ScenarioFailed(f"{method} {path}: {status}")
+        return json.loads(content) if content else None
+
+    def log_in(self):
+        if not self.registered:
+            self.call(
+                "register",
+                "POST",
+                self.paths["register"],
+                {"email": self.email, "password": self.password},
+                expected=(201,),
+            )
+            self.registered = True
+
+        if time.monotonic() - self.token_obtained_at > TOKEN_MAX_AGE:
+            self.token = None
+            tokens = self.call(
+                "token",
+                "POST",
+                self.paths["token"],
+                {"email": self.email, "password": self.password},
+            )
+            self.token = tokens["access"]
+            self.token_obtained_at = time.monotonic()
+
+    def view_flight(self, flight_id):
+        return self.call(
+            "flight", "GET", self.paths["flight"].format(pk=flight_id)
+        )
+
+
+def browse(user):
+    """List flights and open a few of them"""
+    user.log_in()
+    flights = user.call("flights", "GET", user.paths["flights"])
+    for flight in user.rng.sample(flights, min(len(flights), 2)):
+        user.view_flight(flight["id"])
+
+
+def book(user):
+    """Pick a flight, look at its free seats, order some and list orders"""
+    user.log_in()
+    flights = [
+        flight
+        for flight in user.call("flights", "GET", user.paths["flights"])
+        if flight["tickets_available"]
+    ]
+    if not flights:
+        return
+
+    flight = user.view_flight(user.rng.choice(flights)["id"])
+    taken = {(place["row"], place["seat"]) for place in flight["taken_places"]}
+    free = [
+        (row, seat)
+        for row in range(1, flight["airplane"]["rows"] + 1)
+        for seat in range(1, flight["airplane"]["seats_in_row"] + 1)
+        if (row, seat) not in taken
+    ]
+    if not free:
+        return
+
+    places = user.rng.sample(
+        free, min(len(free), user.rng.randint(1, MAX_SEATS_PER_ORDER))
+    )
+    # 400 is a valid outcome: someone else took the seat in the meantime
+    user.call(
+        "order",
+        "POST",
+        user.paths["orders"],
+        {
+            "tickets": [
+                {"row": row, "seat": seat, "flight": flight["id"]}
+                for row, seat in places
+            ]
+        },
+        expected=(201, 400),
+    )
+    user.call("orders", "GET", user.paths["orders"])
+
+
+def new_customer(user):
+    """Register, get a token and book, the whole flow of a first visit"""
+    user.new_identity()
+    book(user)
+
+
+SCENARIOS = {
+    "browse": browse,
+    "book": book,
+    "new_customer": new_customer,
+}
+
+
+def run_users(base_url, paths, weights, users, duration, seed):
+    """Drive concurrent virtual users until ``duration`` seconds passed.
+
+    Returns the samples ``(name, status, seconds, ok)`` and the elapsed
+    time, which includes the scenarios still running at the deadline.
+    """
+    names = list(weights)
+    scenario_weights = [weights[name] for name in names]
+    samples = []
+    start = time.monotonic()
+    deadline = start + duration
+
+    def loop(index):
+        rng = random.Random(f"{seed}-{index}")
+        user = VirtualUser(base_url, paths, samples, rng)
+        while time.monotonic() < deadline:
+            scenario = SCENARIOS[rng.choices(names, scenario_weights)[0]]
+            try:
+                scenario(user)
+            except ScenarioFailed:
+                pass
+
+    threads = [
+        threading.Thread(target=loop, args=(index,), daemon=True)
+        for index in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples, time.monotonic() - start
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def summarize(samples, elapsed) -> dict:
+    latencies = sorted(seconds for _, _, seconds, _ in samples)
+    statuses = Counter(status for _, status, _, _ in samples)
+    errors = sum(
+        1 for _, status, _, ok in samples if not ok and status != 429
+    )
+    total = len(samples)
+    return {
+        "requests": total,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "throttled": statuses[429],
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p90_ms": percentile(latencies, 0.9) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "statuses": {str(status): count
+                     for status, count in sorted(statuses.items())},
+    }
+
+
+def summarize_stage(concurrency, samples, elapsed) -> dict:
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        **summarize(samples, elapsed),
+        "endpoints": {
+            name: summarize(endpoint_samples, elapsed)
+            for name, endpoint_samples in sorted(by_endpoint.items())
+        },
+    }
+
+
+def saturation_point(stages) -> dict | None:
+    """Return the stage after which more users stopped adding throughput.
+
+    None when throughput still grew at the highest concurrency tested.
+    """
+    best = None
+    for stage in stages:
+        if best is not None and stage["throughput"] < best["throughput"] * (
+            1 + SATURATION_GAIN
+        ):
+            return best
+        best = stage
+
+    return None
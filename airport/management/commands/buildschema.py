@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from airport.schema import (generate_schema,
+                            source_fingerprint,
+                            write_schema_file)
+
+
+class Command(BaseCommand):
+    """Generate the OpenAPI schema once and store it for /api/schema/"""
+
+    def handle(self, *args, **options):
+        if not settings.OPENAPI_SCHEMA_FILE:
+            raise CommandError("OPENAPI_SCHEMA_FILE is not set")
+
+        write_schema_file(generate_schema(), source_fingerprint())
+        self.stdout.write(self.style.SUCCESS(
+            f"Schema written to {settings.OPENAPI_SCHEMA_FILE}"
+        ))
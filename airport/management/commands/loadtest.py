@@ -0,0 +1,329 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import permutations
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.testcases import LiveServerThread
+from django.test.utils import (override_settings,
+                               setup_databases,
+                               teardown_databases)
+from django.utils import timezone
+
+from airport.conditional import mark_changed
+from airport.loadtest import (SCENARIOS,
+                              api_paths,
+                              run_users,
+                              saturation_point,
+                              summarize_stage)
+from airport.models import (Airplane,
+                            AirplaneType,
+                            Airport,
+                            City,
+                            Country,
+                            Flight,
+                            Route)
+from airport.pricing import reprice_flights
+
+DEFAULT_WEIGHTS = "browse=6,book=3,new_customer=1"
+
+
+def parse_weights(value) -> dict:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(
+                f"Unknown scenario {name!r}, choose from "
+                f"{', '.join(SCENARIOS)}"
+            )
+        try:
+            weights[name] = float(weight)
+        except ValueError as error:
+            raise CommandError(f"Invalid weight in {item!r}") from error
+
+    if not any(weight > 0 for weight in weights.values()):
+        raise CommandError("At least one scenario needs a positive weight")
+    return weights
+
+
+def parse_concurrency(value) -> list[int]:
+    try:
+        levels = [int(level) for level in value.split(",")]
+    except ValueError as error:
+        raise CommandError(f"Invalid concurrency levels {value!r}") from error
+    if not levels or min(levels) < 1:
+        raise CommandError("Concurrency levels must be positive")
+    return levels
+
+
+def seed_flights(count, rows, seats_in_row):
+    """Create ``count`` upcoming flights with empty cabins"""
+    country = Country.objects.create(name="Load Test Country")
+    city = City.objects.create(name="Load Test City", country=country)
+    airports = [
+        Airport.objects.create(
+            name=f"Load Test Airport {number}",
+            city=city,
+            closest_big_city=city.name,
+        )
+        for number in range(1, 5)
+    ]
+    routes = [
+        Route.objects.create(
+            source=source, destination=destination, distance=500
+        )
+        for source, destination in permutations(airports, 2)
+    ]
+    airplane_type = AirplaneType.objects.create(name="Load Test Type")
+    # One airplane per flight, so no flights overlap
+    airplanes = Airplane.objects.bulk_create(
+        Airplane(
+            name=f"Load Test Airplane {number}",
+            rows=rows,
+            seats_in_row=seats_in_row,
+            airplane_type=airplane_type,
+        )
+        for number in range(1, count + 1)
+    )
+    departure = timezone.now() + timedelta(days=1)
+    Flight.objects.bulk_create(
+        Flight(
+            route=routes[number % len(routes)],
+            airplane=airplane,
+            departure_time=departure + timedelta(hours=number),
+            arrival_time=departure + timedelta(hours=number + 2),
+        )
+        for number, airplane in enumerate(airplanes)
+    )
+    mark_changed(Airplane, Flight)
+    reprice_flights()
+
+
+class Command(BaseCommand):
+    """Find the saturation point of the booking flow.
+
+    Starts a live server on a fresh test database seeded with flights and
+    drives weighted scenarios (browse, book, new_customer) against it
+    while concurrency ramps up, reporting throughput, latency percentiles
+    and error rates per stage. ``--url`` targets a running deployment
+    instead, e.g. gunicorn, using the flights it already has. Rate limits
+    are lifted on the live server unless ``--throttle`` is passed.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            default="1,2,4,8,16,32",
+            help="Comma separated numbers of concurrent users, one stage "
+                 "each",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10,
+            help="Seconds per stage",
+        )
+        parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=2,
+            help="Worker processes generating the load, 0 runs the users "
+                 "as threads of this process",
+        )
+        parser.add_argument("--url", help="Base URL of a running server")
+        parser.add_argument("--flights", type=int, default=20)
+        parser.add_argument("--rows", type=int, default=30)
+        parser.add_argument("--seats-in-row", type=int, default=6)
+        parser.add_argument("--throttle", action="store_true")
+        parser.add_argument("--seed", default="loadtest")
+        parser.add_argument(
+            "--max-error-rate",
+            type=float,
+            help="Fail when a stage has a higher error rate",
+        )
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        weights = parse_weights(options["weights"])
+        levels = parse_concurrency(options["concurrency"])
+        paths = api_paths()
+
+        if options["url"]:
+            stages = self.ramp(options["url"].rstrip("/"), paths, weights,
+                               levels, options)
+        else:
+            stages = self.run_on_live_server(paths, weights, levels, options)
+
+        report = {
+            "weights": weights,
+            "stages": stages,
+            "saturation": saturation_point(stages),
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_report(report)
+
+        max_error_rate = options["max_error_rate"]
+        failing = [
+            stage for stage in stages
+            if max_error_rate is not None
+            and stage["error_rate"] > max_error_rate
+        ]
+        if failing:
+            raise CommandError(
+                f"Error rate {failing[0]['error_rate']:.1%} at concurrency "
+                f"{failing[0]['concurrency']} exceeds {max_error_rate:.1%}"
+            )
+
+    def run_on_live_server(self, paths, weights, levels, options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed_flights(options["flights"], options["rows"],
+                         options["seats_in_row"])
+            connections_override = {
+                connection.alias: connection
+                for connection in connections.all()
+                if connection.vendor == "sqlite"
+                and connection.is_in_memory_db()
+            }
+            for connection in connections_override.values():
+                connection.inc_thread_sharing()
+
+            host = "localhost"
+            server = LiveServerThread(host, StaticFilesHandler,
+                                      connections_override)
+            server.daemon = True
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, host],
+                DEBUG=False,
+                THROTTLING_ENABLED=options["throttle"],
+            ):
+                server.start()
+                server.is_ready.wait()
+                if server.error:
+                    raise CommandError(
+                        f"Live server failed: {server.error}"
+                    ) from server.error
+                try:
+                    return self.ramp(f"http://{host}:{server.port}", paths,
+                                     weights, levels, options)
+                finally:
+                    server.terminate()
+                    for connection in connections_override.values():
+                        connection.dec_thread_sharing()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def ramp(self, base_url, paths, weights, levels, options):
+        processes = options["processes"]
+        executor = None
+        if processes > 0:
+            # Separate interpreters keep the load generator from competing
+            # with the live server for the GIL
+            executor = ProcessPoolExecutor(
+                max_workers=processes, mp_context=get_context("spawn")
+            )
+
+        stages = []
+        try:
+            for index, users in enumerate(levels):
+                seed = f"{options['seed']}-{index}"
+                if executor is None:
+                    samples, elapsed = run_users(
+                        base_url, paths, weights, users, options["duration"],
+                        seed,
+                    )
+                else:
+                    samples, elapsed = self.run_in_processes(
+                        executor, processes, base_url, paths, weights,
+                        users, options["duration"], seed,
+                    )
+                stage = summarize_stage(users, samples, elapsed)
+                stages.append(stage)
+                if not options["json"] and options["verbosity"] > 1:
+                    self.stderr.write(
+                        f"{users} users: {stage['throughput']:.1f} req/s"
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return stages
+
+    @staticmethod
+    def run_in_processes(executor, processes, base_url, paths, weights,
+                         users, duration, seed):
+        shares = [
+            users // processes + (index < users % processes)
+            for index in range(processes)
+        ]
+        futures = [
+            executor.submit(run_users, base_url, paths, weights, share,
+                            duration, f"{seed}-{index}")
+            for index, share in enumerate(shares)
+            if share
+        ]
+        samples = []
+        elapsed = 0.0
+        for future in futures:
+            process_samples, process_elapsed = future.result()
+            samples.extend(process_samples)
+            elapsed = max(elapsed, process_elapsed)
+
+        return samples, elapsed
+
+    def write_report(self, report):
+        weights = ", ".join(
+            f"{name}={weight:g}" for name, weight in report["weights"].items()
+        )
+        self.stdout.write(f"Scenario weights: {weights}\n")
+        self.stdout.write(
+            f"{'users':>6} {'requests':>9} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p90 ms':>8} {'p99 ms':>8} {'errors':>7} {'429':>5}"
+        )
+        for stage in report["stages"]:
+            self.stdout.write(
+                f"{stage['concurrency']:>6} {stage['requests']:>9} "
+                f"{stage['throughput']:>8.1f} {stage['p50_ms']:>8.1f} "
+                f"{stage['p90_ms']:>8.1f} {stage['p99_ms']:>8.1f} "
+                f"{stage['error_rate']:>7.1%} {stage['throttled']:>5}"
+            )
+
+        saturation = report["saturation"]
+        if saturation is None:
+            self.stdout.write(
+                "\nThroughput still grew at the highest concurrency, "
+                "ramp further to find the saturation point."
+            )
+            peak = max(report["stages"], key=lambda s: s["throughput"])
+        else:
+            self.stdout.write(
+                f"\nSaturated at {saturation['concurrency']} users, "
+                f"{saturation['throughput']:.1f} req/s "
+                f"(p99 {saturation['p99_ms']:.0f} ms)"
+            )
+            peak = saturation
+
+        self.stdout.write(
+            f"\nEndpoints at {peak['concurrency']} users:\n"
+            f"{'endpoint':<10} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'errors':>7}  statuses"
+        )
+        for name, endpoint in peak["endpoints"].items():
+            statuses = " ".join(
+                f"{status}x{count}"
+                for status, count in endpoint["statuses"].items()
+            )
+            self.stdout.write(
+                f"{name:<10} {endpoint['requests']:>9} "
+                f"{endpoint['p50_ms']:>8.1f} {endpoint['p99_ms']:>8.1f} "
+                f"{endpoint['error_rate']:>7.1%}  {statuses}"
+            )
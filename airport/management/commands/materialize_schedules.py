@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from airport.schedules import materialize_schedules
+
+
+class Command(BaseCommand):
+    """Create the flights of all schedules up to the horizon, e.g. daily"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon-days",
+            type=int,
+            help="Materialize this many days ahead instead of "
+                 "FLIGHT_SCHEDULE_HORIZON",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        horizon = None
+        if options["horizon_days"]:
+            horizon = timedelta(days=options["horizon_days"])
+
+        start = time.perf_counter()
+        created = materialize_schedules(
+            horizon=horizon, batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} flights in "
+            f"{time.perf_counter() - start:.2f} s"
+        ))
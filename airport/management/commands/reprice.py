@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from airport.pricing import reprice_flights
+
+
+class Command(BaseCommand):
+    """Recompute the fares of all upcoming flights, e.g. from cron"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        repriced = reprice_flights(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Repriced {repriced} flights in "
+            f"{time.perf_counter() - start:.2f} s"
+        ))
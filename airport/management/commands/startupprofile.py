@@ -0,0 +1,157 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Boots the WSGI application in a fresh interpreter and serves one request,
+# printing the timings as JSON on the last line of stdout.
+BOOT_SCRIPT = """
+import io, json, sys, time
+start = time.perf_counter()
+from airport_system.wsgi import application
+booted = time.perf_counter()
+statuses = []
+environ = {
+    "REQUEST_METHOD": "GET",
+    "PATH_INFO": sys.argv[1],
+    "QUERY_STRING": "",
+    "SERVER_NAME": sys.argv[2],
+    "SERVER_PORT": "80",
+    "HTTP_HOST": sys.argv[2],
+    "wsgi.input": io.BytesIO(),
+    "wsgi.errors": sys.stderr,
+    "wsgi.url_scheme": "http",
+}
+body = b"".join(
+    application(environ, lambda status, *_: statuses.append(status))
+)
+done = time.perf_counter()
+print(json.dumps({
+    "boot_ms": (booted - start) * 1000,
+    "first_request_ms": (done - start) * 1000,
+    "status": statuses[0],
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parse ``-X importtime`` output into (module, self, cumulative, depth)"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[12:].split("|")
+            imports.append((
+                name.strip(),
+                int(self_us),
+                int(cumulative_us),
+                (len(name) - len(name.lstrip())) // 2,
+            ))
+        except ValueError:
+            continue  # the "self [us] | cumulative | imported package" header
+
+    return imports
+
+
+class Command(BaseCommand):
+    """Profile the cold start of the WSGI application.
+
+    Reports the median boot time and time to first request over several
+    fresh interpreters, plus an ``-X importtime`` breakdown. ``--max-ms``
+    turns it into a benchmark that fails when startup regresses.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--url", default="/api/airport/")
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument(
+            "--max-ms",
+            type=float,
+            help="Fail when the median time to first request is slower",
+        )
+        parser.add_argument("--json", action="store_true")
+
+    def boot(self, url, host, *python_options):
+        result = subprocess.run(
+            [sys.executable, *python_options, "-c", BOOT_SCRIPT, url, host],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+            },
+        )
+        if result.returncode:
+            raise CommandError(f"Boot failed:\n{result.stderr}")
+
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        runs = [
+            self.boot(options["url"], options["host"])[0]
+            for _ in range(max(options["runs"], 1))
+        ]
+        _, stderr = self.boot(options["url"], options["host"], "-X",
+                              "importtime")
+        imports = parse_importtime(stderr)
+
+        packages = Counter()
+        for module, self_us, _, _ in imports:
+            packages[module.split(".")[0]] += self_us
+
+        report = {
+            "runs": len(runs),
+            "status": runs[0]["status"],
+            "boot_ms": statistics.median(run["boot_ms"] for run in runs),
+            "first_request_ms": statistics.median(
+                run["first_request_ms"] for run in runs
+            ),
+            "packages": sorted(
+                ((name, us / 1000) for name, us in packages.items()),
+                key=lambda item: -item[1],
+            )[:options["top"]],
+            "modules": sorted(
+                ((module, cumulative_us / 1000)
+                 for module, _, cumulative_us, depth in imports
+                 if depth == 0),
+                key=lambda item: -item[1],
+            )[:options["top"]],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_report(report)
+
+        if (
+            options["max_ms"] is not None
+            and report["first_request_ms"] > options["max_ms"]
+        ):
+            raise CommandError(
+                f"Time to first request {report['first_request_ms']:.0f} ms "
+                f"exceeds {options['max_ms']:.0f} ms"
+            )
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"Median of {report['runs']} cold starts "
+            f"(first response {report['status']}):\n"
+            f"  boot              {report['boot_ms']:8.1f} ms\n"
+            f"  first request     {report['first_request_ms']:8.1f} ms"
+        )
+        self.stdout.write("\nSelf import time by package:")
+        for name, ms in report["packages"]:
+            self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+        self.stdout.write("\nCumulative time of top-level imports:")
+        for module, ms in report["modules"]:
+            self.stdout.write(f"  {ms:8.1f} ms  {module}")
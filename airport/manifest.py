@@ -0,0 +1,106 @@
+"""Passenger manifest of a flight, streamed to gate agents.
+
+Passengers come from a single query joining tickets, orders and users,
+ordered by the ``(flight, row, seat)`` unique index and read with a
+server-side cursor, so rows are written out as the database returns
+them and the response never holds the whole manifest in memory.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from airport.models import Ticket
+
+MANIFEST_FIELDS = (
+    "row",
+    "seat",
+    "order",
+    "email",
+    "first_name",
+    "last_name",
+    "price",
+)
+CHUNK_SIZE = 500
+
+
+class CSVRenderer(BaseRenderer):
+    """Select the CSV manifest with ``?format=csv`` or ``Accept``.
+
+    The manifest itself is streamed; only error responses go through
+    ``render``, as ``field,value`` rows.
+    """
+
+    media_type = "text/csv"
+    format = "csv"  # noqa: VNE003
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not isinstance(data, dict):
+            data = {"detail": data}
+
+        buffer = _Echo()
+        writer = csv.writer(buffer)
+        return "".join(
+            writer.writerow([field, value]) for field, value in data.items()
+        ).encode(self.charset)
+
+
+class _Echo:
+    """File-like object handing each CSV line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def seat_map(flight) -> dict:
+    capacity = flight.airplane.capacity
+    sold = flight.tickets.count()
+    return {
+        "rows": flight.airplane.rows,
+        "seats_in_row": flight.airplane.seats_in_row,
+        "capacity": capacity,
+        "sold": sold,
+        "available": capacity - sold,
+    }
+
+
+def manifest_rows(flight):
+    """Yield the passengers of the flight as tuples of MANIFEST_FIELDS"""
+    return (
+        Ticket.objects
+        .filter(flight=flight)
+        .order_by("row", "seat")
+        .values_list(
+            "row",
+            "seat",
+            "order_id",
+            "order__user__email",
+            "order__user__first_name",
+            "order__user__last_name",
+            "price",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(MANIFEST_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_json(header: dict, rows):
+    """Yield ``header`` as a JSON object with the rows as ``passengers``"""
+    encoder = DjangoJSONEncoder()
+    opening = encoder.encode(header)[:-1]
+    yield f'{opening}, "passengers": ['
+    separator = ""
+    for row in rows:
+        passenger = dict(zip(MANIFEST_FIELDS, row, strict=True))
+        yield separator + encoder.encode(passenger)
+        separator = ", "
+    yield "]}"
@@ -0,0 +1,171 @@
+"""Serving uploaded media files.
+
+Files are handed to the front proxy when ``settings.MEDIA_SENDFILE_HEADER``
+is set (nginx ``X-Accel-Redirect`` or Apache/lighttpd ``X-Sendfile``), so
+no application worker is busy while an image downloads. Otherwise they
+are streamed with ``FileResponse``; WSGI servers providing
+``wsgi.file_wrapper`` (e.g. gunicorn) send them with ``os.sendfile``.
+
+Single ``Range`` requests are supported. Upload names end with a UUID
+(see ``airplane_image_file_path``), so their content never changes and
+they are cached as immutable.
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+UUID_FILENAME = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.\w+$"
+)
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Return the inclusive ``(start, end)`` of a single byte range.
+
+    Malformed and multi-range headers are ignored (None), so the whole
+    file is served as the RFC allows.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if size == 0:
+        raise RangeNotSatisfiable
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+
+    return start, end
+
+
+def _read_range(media_file, start, end):
+    media_file.seek(start)
+    remaining = end - start + 1
+    try:
+        while remaining > 0:
+            chunk = media_file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        media_file.close()
+
+
+def _etag(stat):
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def _content_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    return content_type or "application/octet-stream", encoding
+
+
+def _sendfile_response(path, relative_path):
+    response = HttpResponse(content_type=_content_type(path)[0])
+    if settings.MEDIA_SENDFILE_HEADER == "x-accel-redirect":
+        response["X-Accel-Redirect"] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + relative_path
+        )
+    else:
+        response["X-Sendfile"] = str(path)
+    return response
+
+
+def _file_response(request, path, stat):
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if "HTTP_RANGE" in request.META and if_range in (
+        None, _etag(stat), http_date(stat.st_mtime)
+    ):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    content_type, encoding = _content_type(path)
+    if byte_range is None:
+        response = FileResponse(path.open("rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        media_file = path.open("rb")
+        if end == size - 1:
+            # Ranges up to the end still go through the file wrapper
+            media_file.seek(start)
+            response = FileResponse(media_file, content_type=content_type,
+                                    status=206)
+        else:
+            response = FileResponse(
+                _read_range(media_file, start, end),
+                content_type=content_type,
+                status=206,
+            )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from ``MEDIA_ROOT``"""
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+        stat = full_path.stat()
+    except (SuspiciousFileOperation, OSError) as error:
+        raise Http404("File not found.") from error
+    if not full_path.is_file():
+        raise Http404("File not found.")
+
+    etag = _etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.MEDIA_SENDFILE_HEADER:
+            response = _sendfile_response(full_path, path)
+        else:
+            response = _file_response(request, full_path, stat)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if UUID_FILENAME.search(os.path.basename(path)):
+        patch_cache_control(
+            response,
+            public=True,
+            immutable=True,
+            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE,
+        )
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+
+    return response
@@ -0,0 +1,329 @@
+"""Prometheus metrics without a client library.
+
+Every thread increments its own dict of samples, so recording a value
+takes no lock; the shards are only merged when ``/metrics`` is scraped.
+When a thread exits its shard is folded into the process totals and
+dropped, so short-lived threads (one per request under runserver, batch
+worker pools) don't pile shards up.
+With ``METRICS_MULTIPROCESS_DIR`` set each worker process also dumps its
+totals to a file in that directory every ``METRICS_FLUSH_INTERVAL``
+seconds and the scrape adds all files up, so any worker can answer it.
+Clear the directory when the server starts, as counters from previous
+runs would otherwise be added to the new ones.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_local = threading.local()
+_shards = {}
+_retired = defaultdict(float)
+_shards_lock = threading.RLock()
+_last_flush = {"at": 0.0}
+_registry = []
+
+
+class _Owner:
+    """Lives in the thread-local storage, so dies with its thread"""
+
+
+def _retire(samples):
+    with _shards_lock:
+        del _shards[id(samples)]
+        for key, value in samples.items():
+            _retired[key] += value
+
+
+def _shard() -> dict:
+    try:
+        return _local.samples
+    except AttributeError:
+        samples = _local.samples = {}
+        _local.owner = _Owner()
+        with _shards_lock:
+            _shards[id(samples)] = samples
+        weakref.finalize(_local.owner, _retire, samples)
+        return samples
+
+
+def _add(key, amount):
+    samples = _shard()
+    samples[key] = samples.get(key, 0) + amount
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        _add((self.name, labels, ""), amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        _add((self.name, labels, bisect_left(self.buckets, value)), 1)
+        _add((self.name, labels, "sum"), value)
+
+
+REQUEST_LATENCY = Histogram(
+    "airport_http_request_duration_seconds",
+    "Request latency by view and viewset action",
+    ("view", "action", "method", "status"),
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "airport_http_response_size_bytes",
+    "Response body size by view",
+    ("view", "action"),
+    SIZE_BUCKETS,
+)
+DB_QUERIES = Counter(
+    "airport_db_queries_total",
+    "Database queries run by view",
+    ("view", "action"),
+)
+DB_QUERY_TIME = Counter(
+    "airport_db_query_seconds_total",
+    "Time spent in database queries by view",
+    ("view", "action"),
+)
+SERIALIZER_TIME = Counter(
+    "airport_serializer_seconds_total",
+    "Time spent serializing objects by serializer",
+    ("serializer",),
+)
+SERIALIZED_OBJECTS = Counter(
+    "airport_serialized_objects_total",
+    "Objects serialized by serializer",
+    ("serializer",),
+)
+THROTTLED_REQUESTS = Counter(
+    "airport_throttled_requests_total",
+    "Requests rejected with 429 by view",
+    ("view", "action"),
+)
+ORDERS_CREATED = Counter(
+    "airport_orders_created_total", "Committed orders"
+)
+TICKETS_CREATED = Counter(
+    "airport_tickets_created_total", "Committed tickets"
+)
+
+
+def snapshot() -> dict:
+    """Return this process' samples summed over all threads"""
+    with _shards_lock:
+        totals = defaultdict(float, _retired)
+        shards = list(_shards.values())
+    for shard in shards:
+        for key, value in shard.copy().items():
+            totals[key] += value
+
+    return totals
+
+
+def flush(directory=None):
+    """Write this process' samples for the multi-process scrape"""
+    directory = Path(directory or settings.METRICS_MULTIPROCESS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"metrics-{os.getpid()}.json"
+    temporary_path = path.with_name(f".{path.name}")
+    temporary_path.write_text(json.dumps([
+        [name, list(labels), suffix, value]
+        for (name, labels, suffix), value in snapshot().items()
+    ]))
+    os.replace(temporary_path, path)
+    _last_flush["at"] = time.monotonic()
+
+
+def maybe_flush():
+    if (
+        settings.METRICS_MULTIPROCESS_DIR
+        and time.monotonic() - _last_flush["at"]
+        > settings.METRICS_FLUSH_INTERVAL
+    ):
+        flush()
+
+
+def collect() -> dict:
+    """Return the samples of this process, or of all of them"""
+    if not settings.METRICS_MULTIPROCESS_DIR:
+        return snapshot()
+
+    flush()
+    totals = defaultdict(float)
+    for path in Path(settings.METRICS_MULTIPROCESS_DIR).glob("metrics-*"):
+        try:
+            samples = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # being replaced or removed
+        for name, labels, suffix, value in samples:
+            totals[(name, tuple(labels), suffix)] += value
+
+    return totals
+
+
+def _quote(value) -> str:
+    escaped = (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+    return '"' + escaped + '"'
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values, strict=True), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f"{name}={_quote(value)}" for name, value in pairs
+    ) + "}"
+
+
+def render(samples) -> str:
+    """Format samples in the Prometheus text exposition format"""
+    by_metric = defaultdict(dict)
+    for (name, labels, suffix), value in samples.items():
+        by_metric[name][(labels, suffix)] = value
+
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        values = by_metric.get(metric.name, {})
+        if metric.kind == "counter":
+            for (labels, _), value in sorted(values.items()):
+                lines.append(
+                    f"{metric.name}{_labels(metric.labelnames, labels)} "
+                    f"{_number(value)}"
+                )
+            continue
+
+        for labels in sorted({key[0] for key in values}):
+            cumulative = 0
+            bounds = [*map(str, metric.buckets), "+Inf"]
+            for index, bound in enumerate(bounds):
+                cumulative += values.get((labels, index), 0)
+                label_text = _labels(
+                    metric.labelnames, labels, [("le", bound)]
+                )
+                lines.append(
+                    f"{metric.name}_bucket{label_text} {_number(cumulative)}"
+                )
+            label_text = _labels(metric.labelnames, labels)
+            lines.append(
+                f"{metric.name}_sum{label_text} "
+                f"{_number(values.get((labels, 'sum'), 0))}"
+            )
+            lines.append(
+                f"{metric.name}_count{label_text} {_number(cumulative)}"
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+class QueryMetrics:
+    """Execute wrapper counting the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, "actions", None) or {}
+        request.metrics_labels = (
+            request.resolver_match.view_name,
+            actions.get(request.method.lower(), ""),
+        )
+
+    def __call__(self, request):
+        queries = QueryMetrics()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        labels = getattr(request, "metrics_labels", ("unmatched", ""))
+        REQUEST_LATENCY.observe(
+            (*labels, request.method, str(response.status_code)), duration
+        )
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+        if queries.count:
+            DB_QUERIES.inc(labels, queries.count)
+            DB_QUERY_TIME.inc(labels, queries.seconds)
+        if response.status_code == 429:
+            THROTTLED_REQUESTS.inc(labels)
+
+        maybe_flush()
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint.
+
+    Scrapers send ``METRICS_TOKEN`` as a bearer token; without one
+    configured only staff users logged in to the admin can read it.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(
+            request.META.get("HTTP_AUTHORIZATION", ""),
+            f"Bearer {settings.METRICS_TOKEN}",
+        )
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
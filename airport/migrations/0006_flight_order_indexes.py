@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0005_alter_airplane_name_alter_airplanetype_name"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(fields=["departure_time"], name="airport_fli_departu_abe547_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="airport_ord_created_ff47a7_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-19 07:55
+
+from django.db import migrations, models
+
+
+def add_airplane_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE airport_flight "
+        "ADD CONSTRAINT flight_airplane_no_overlap "
+        "EXCLUDE USING gist ("
+        "airplane_id WITH =, "
+        "tstzrange(departure_time, arrival_time) WITH &&"
+        ")"
+    )
+
+
+def remove_airplane_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        "ALTER TABLE airport_flight "
+        "DROP CONSTRAINT IF EXISTS flight_airplane_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0006_flight_order_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(fields=["airplane", "departure_time"], name="airport_fli_airplan_da655c_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.CheckConstraint(check=models.Q(("arrival_time__gte", models.F("departure_time"))), name="flight_arrival_after_departure"),
+        ),
+        migrations.RunPython(
+            add_airplane_overlap_constraint,
+            remove_airplane_overlap_constraint,
+        ),
+    ]
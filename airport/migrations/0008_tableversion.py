@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-19 08:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+TRACKED_LABELS = (
+    "airport.crew",
+    "airport.country",
+    "airport.city",
+    "airport.airport",
+    "airport.airplanetype",
+    "airport.airplane",
+    "airport.route",
+    "airport.flight",
+    "airport.order",
+    "airport.ticket",
+)
+
+
+def create_table_versions(apps, schema_editor):
+    TableVersion = apps.get_model("airport", "TableVersion")
+    TableVersion.objects.using(schema_editor.connection.alias).bulk_create(
+        [TableVersion(label=label) for label in TRACKED_LABELS],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0007_flight_airplane_no_overlap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("label", models.CharField(max_length=100, unique=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(
+            create_table_versions, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0008_tableversion"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(fields=["route", "departure_time"], name="airport_fli_route_i_baa295_idx"),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-19 08:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0011_flight_ticket_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightSchedule",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("days_of_week", models.PositiveSmallIntegerField()),
+                ("departure_time", models.TimeField()),
+                ("time_zone", models.CharField(default="UTC", max_length=64)),
+                ("duration", models.DurationField()),
+                ("valid_from", models.DateField()),
+                ("valid_until", models.DateField()),
+                ("materialized_until", models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="airplane",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="schedules", to="airport.airplane"),
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="crew",
+            field=models.ManyToManyField(blank=True, related_name="schedules", to="airport.crew"),
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="route",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="schedules", to="airport.route"),
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="schedule",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="flights", to="airport.flightschedule"),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.UniqueConstraint(fields=("schedule", "departure_time"), name="flight_unique_schedule_departure"),
+        ),
+        migrations.AddConstraint(
+            model_name="flightschedule",
+            constraint=models.CheckConstraint(check=models.Q(("valid_until__gte", models.F("valid_from"))), name="flight_schedule_valid_period"),
+        ),
+        migrations.AddConstraint(
+            model_name="flightschedule",
+            constraint=models.CheckConstraint(check=models.Q(("days_of_week__range", (1, 127))), name="flight_schedule_days_of_week"),
+        ),
+    ]
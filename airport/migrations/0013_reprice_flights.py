@@ -0,0 +1,95 @@
+# Generated by Django 4.2 on 2026-10-19 10:12
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import (Case,
+                              Count,
+                              F,
+                              FloatField,
+                              OuterRef,
+                              Subquery,
+                              Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+
+def _float(expression):
+    return Cast(expression, FloatField())
+
+
+def reprice_unpriced_flights(apps, schema_editor):
+    """Give upcoming flights without a fare the one airport.pricing would.
+
+    The fare expression is a copy of ``airport.pricing.fare_expression``
+    over the historical models, so later changes to the app can't break
+    this migration.
+    """
+    Airplane = apps.get_model("airport", "Airplane")
+    Flight = apps.get_model("airport", "Flight")
+    Route = apps.get_model("airport", "Route")
+    Ticket = apps.get_model("airport", "Ticket")
+    using = schema_editor.connection.alias
+    now = timezone.now()
+
+    distance = Subquery(
+        Route.objects.using(using)
+        .filter(pk=OuterRef("route_id"))
+        .values("distance")[:1]
+    )
+    capacity = Subquery(
+        Airplane.objects.using(using)
+        .filter(pk=OuterRef("airplane_id"))
+        .order_by()
+        .annotate(capacity=F("rows") * F("seats_in_row"))
+        .values("capacity")[:1]
+    )
+    sold = Coalesce(
+        Subquery(
+            Ticket.objects.using(using)
+            .filter(flight_id=OuterRef("pk"))
+            .order_by()
+            .values("flight_id")
+            .annotate(sold=Count("id"))
+            .values("sold")[:1]
+        ),
+        0,
+    )
+    departure_surcharge = Case(
+        *[
+            When(departure_time__lt=now + within, then=Value(surcharge))
+            for within, surcharge in settings.FARE_DEPARTURE_SURCHARGES
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    base = Value(float(settings.FARE_BASE)) + Value(
+        float(settings.FARE_PER_KM)
+    ) * _float(distance)
+    load_factor = Coalesce(
+        _float(sold) / NullIf(_float(capacity), Value(0.0)), Value(0.0)
+    )
+    fare = Round(
+        base
+        * (Value(1.0) + Value(settings.FARE_LOAD_FACTOR_SURCHARGE)
+           * load_factor)
+        * (Value(1.0) + departure_surcharge),
+        2,
+    )
+
+    Flight.objects.using(using).filter(
+        price__isnull=True, departure_time__gt=now
+    ).update(price=fare)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0012_flightschedule"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            reprice_unpriced_flights, migrations.RunPython.noop
+        ),
+    ]
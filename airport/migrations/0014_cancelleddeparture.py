@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-19 10:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0013_reprice_flights"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CancelledDeparture",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("schedule", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="cancelled_departures", to="airport.flightschedule")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="cancelleddeparture",
+            constraint=models.UniqueConstraint(fields=("schedule", "day"), name="cancelled_departure_unique_schedule_day"),
+        ),
+    ]
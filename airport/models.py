@@ -4,6 +4,7 @@ import uuid
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -12,7 +13,7 @@ class Crew(models.Model):
     last_name = models.CharField(max_length=255)
 
     @property
-    def full_name(self):
+    def full_name(self) -> str:
         return f"{self.first_name} {self.last_name}"
 
     def __str__(self):
@@ -105,6 +106,75 @@ class Route(models.Model):
         return f"{self.source} -> {self.destination} ({self.distance} km)"
 
 
+class FlightSchedule(models.Model):
+    """Recurring flight, materialized into ``Flight`` rows ahead of time"""
+
+    route = models.ForeignKey(Route,
+                              on_delete=models.CASCADE,
+                              related_name="schedules")
+    airplane = models.ForeignKey(Airplane,
+                                 on_delete=models.CASCADE,
+                                 related_name="schedules")
+    crew = models.ManyToManyField(Crew,
+                                  related_name="schedules",
+                                  blank=True)
+    # Bit n - 1 is set when the flight operates on ISO weekday n
+    days_of_week = models.PositiveSmallIntegerField()
+    departure_time = models.TimeField()
+    time_zone = models.CharField(max_length=64, default="UTC")
+    duration = models.DurationField()
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+    materialized_until = models.DateField(null=True, blank=True)
+
+    @staticmethod
+    def weekdays_mask(weekdays) -> int:
+        return sum(1 << (day - 1) for day in set(weekdays))
+
+    @property
+    def weekdays(self) -> list[int]:
+        return [
+            day for day in range(1, 8)
+            if self.days_of_week & (1 << (day - 1))
+        ]
+
+    def __str__(self):
+        return (f"{self.route}, {self.departure_time} "
+                f"({self.valid_from} - {self.valid_until})")
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(valid_until__gte=models.F("valid_from")),
+                name="flight_schedule_valid_period",
+            ),
+            models.CheckConstraint(
+                check=models.Q(days_of_week__range=(1, 127)),
+                name="flight_schedule_days_of_week",
+            ),
+        ]
+
+
+class CancelledDeparture(models.Model):
+    """Day, in the schedule's time zone, its flight was cancelled on"""
+
+    schedule = models.ForeignKey(FlightSchedule,
+                                 on_delete=models.CASCADE,
+                                 related_name="cancelled_departures")
+    day = models.DateField()
+
+    def __str__(self):
+        return f"{self.schedule}, cancelled on {self.day}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["schedule", "day"],
+                name="cancelled_departure_unique_schedule_day",
+            ),
+        ]
+
+
 class Flight(models.Model):
     route = models.ForeignKey(Route,
                               on_delete=models.CASCADE,
@@ -117,6 +187,14 @@ class Flight(models.Model):
                                   blank=True)
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    schedule = models.ForeignKey(FlightSchedule,
+                                 on_delete=models.SET_NULL,
+                                 null=True,
+                                 blank=True,
+                                 related_name="flights")
 
     @property
     def duration(self) -> float | int:
@@ -129,6 +207,23 @@ class Flight(models.Model):
     def __str__(self):
         return f"{self.route}, {self.departure_time} -> {self.arrival_time}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["departure_time"]),
+            models.Index(fields=["airplane", "departure_time"]),
+            models.Index(fields=["route", "departure_time"]),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(arrival_time__gte=models.F("departure_time")),
+                name="flight_arrival_after_departure",
+            ),
+            models.UniqueConstraint(
+                fields=["schedule", "departure_time"],
+                name="flight_unique_schedule_departure",
+            ),
+        ]
+
 
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -141,6 +236,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
 
 
 class Ticket(models.Model):
@@ -152,6 +250,9 @@ class Ticket(models.Model):
     order = models.ForeignKey(Order,
                               on_delete=models.CASCADE,
                               related_name="tickets")
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
 
     @staticmethod
     def validate_ticket(row, seat, airplane, error_to_raise):
@@ -187,6 +288,9 @@ class Ticket(models.Model):
             update_fields=None,
     ):
         self.full_clean()
+        if self._state.adding and self.price is None:
+            # The fare is fixed when the ticket is sold
+            self.price = self.flight.price
         return super(Ticket, self).save(
             force_insert, force_update, using, update_fields
         )
@@ -198,3 +302,37 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("flight", "row", "seat")
         ordering = ["row", "seat"]
+
+
+class TableVersion(models.Model):
+    """Change counter of a model table, bumped after every committed write"""
+
+    label = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class IdempotencyKey(models.Model):
+    """Response of a create request, replayed when the key is sent again"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotency_key_unique_per_user"
+            ),
+        ]
@@ -0,0 +1,59 @@
+"""Travel summary of a user, aggregated by the database.
+
+A trip is a flight the user holds at least one ticket for, however many
+tickets they bought for it. Everything comes from two aggregate queries
+over the user's tickets, so the cost does not grow with the number of
+rows sent to the client, only with the number of distinct routes flown.
+"""
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from airport.models import Ticket
+
+TOP_ROUTES = 5
+
+
+def order_summary(user, top_routes=TOP_ROUTES, now=None) -> dict:
+    now = now or timezone.now()
+    tickets = Ticket.objects.filter(order__user=user).order_by()
+    departed = Q(flight__departure_time__lte=now)
+
+    summary = tickets.aggregate(
+        orders=Count("order_id", distinct=True),
+        tickets=Count("id"),
+        upcoming_trips=Count("flight_id", distinct=True, filter=~departed),
+        past_trips=Count("flight_id", distinct=True, filter=departed),
+        total_spent=Coalesce(
+            Sum("price"),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+    routes = list(
+        tickets.filter(departed)
+        .values(
+            "flight__route_id",
+            "flight__route__source__name",
+            "flight__route__destination__name",
+            "flight__route__distance",
+        )
+        .annotate(trips=Count("flight_id", distinct=True))
+        .order_by("-trips", "flight__route_id")
+    )
+    summary["distance_flown"] = sum(
+        route["trips"] * route["flight__route__distance"] for route in routes
+    )
+    summary["top_routes"] = [
+        {
+            "route": route["flight__route_id"],
+            "source": route["flight__route__source__name"],
+            "destination": route["flight__route__destination__name"],
+            "distance": route["flight__route__distance"],
+            "trips": route["trips"],
+        }
+        for route in routes[:top_routes]
+    ]
+
+    return summary
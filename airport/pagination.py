@@ -0,0 +1,69 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset) -> int | None:
+    """Return the PostgreSQL planner row estimate for a queryset.
+
+    Unfiltered querysets read ``pg_class.reltuples`` for the model table,
+    filtered ones take the top-level ``Plan Rows`` of an ``EXPLAIN``.
+    Returns None on other backends or when the table was never analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+        else:
+            try:
+                sql, params = query.get_compiler(queryset.db).as_sql()
+            except EmptyResultSet:
+                return 0
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]["Plan"]["Plan Rows"]
+
+    if estimate is None or estimate < 0:
+        return None
+
+    return int(estimate)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts planner estimates for very large result sets.
+
+    Below ``ESTIMATED_COUNT_THRESHOLD`` rows the exact ``COUNT(*)`` is
+    cheap, so it is used instead; ``is_estimate`` tells which one was used.
+    """
+
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        estimate = None
+        if hasattr(self.object_list, "query"):
+            estimate = estimate_count(self.object_list)
+
+        if (
+            estimate is not None
+            and estimate >= settings.ESTIMATED_COUNT_THRESHOLD
+        ):
+            self.is_estimate = True
+            return estimate
+
+        return super().count
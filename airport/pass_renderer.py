@@ -0,0 +1,95 @@
+"""Drawing boarding pass images.
+
+Runs in the boarding pass worker processes, so it works on plain data
+and imports neither the ORM nor, until the first pass, Pillow.
+"""
+import io
+import os
+from pathlib import Path
+
+WIDTH = 800
+HEIGHT = 320
+MARGIN = 24
+STUB_WIDTH = 220
+INK = (33, 37, 41)
+MUTED = (108, 117, 125)
+ACCENT = (13, 110, 253)
+PAPER = (255, 255, 255)
+
+
+def _font(size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size)
+    except (ImportError, OSError):
+        return ImageFont.load_default()  # Pillow built without FreeType
+
+
+def render_pass(data: dict) -> bytes:
+    """Return a PNG boarding pass for the ticket described by ``data``"""
+    from PIL import Image, ImageDraw
+
+    font = _font(14)
+    large_font = _font(28)
+    image = Image.new("RGB", (WIDTH, HEIGHT), PAPER)
+    draw = ImageDraw.Draw(image)
+
+    draw.rectangle((0, 0, WIDTH, 48), fill=ACCENT)
+    draw.text((MARGIN, 16), "BOARDING PASS", fill=PAPER, font=font)
+    draw.text(
+        (WIDTH - STUB_WIDTH + MARGIN, 16),
+        f"TICKET {data['ticket']}",
+        fill=PAPER,
+        font=font,
+    )
+
+    fields = (
+        ("PASSENGER", data["passenger"]),
+        ("FROM", f"{data['source']} ({data['source_city']})"),
+        ("TO", f"{data['destination']} ({data['destination_city']})"),
+        ("FLIGHT", str(data["flight"])),
+        ("DEPARTURE", data["departure"]),
+        ("ARRIVAL", data["arrival"]),
+        ("AIRPLANE", data["airplane"]),
+    )
+    for index, (label, value) in enumerate(fields):
+        top = 64 + index * 34
+        draw.text((MARGIN, top), label, fill=MUTED, font=font)
+        draw.text((MARGIN + 110, top), value, fill=INK, font=font)
+
+    stub_left = WIDTH - STUB_WIDTH
+    for top in range(56, HEIGHT - 8, 12):
+        draw.line((stub_left, top, stub_left, top + 6), fill=MUTED)
+    for index, (label, value) in enumerate((
+        ("ROW", str(data["row"])),
+        ("SEAT", str(data["seat"])),
+        ("ORDER", str(data["order"])),
+    )):
+        top = 72 + index * 70
+        draw.text((stub_left + MARGIN, top), label, fill=MUTED, font=font)
+        draw.text(
+            (stub_left + MARGIN, top + 20),
+            value,
+            fill=INK,
+            font=large_font,
+        )
+
+    output = io.BytesIO()
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def write_pass(data: dict, path: str) -> str:
+    """Render a pass to ``path`` and remove outdated ones of the ticket"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary_path.write_bytes(render_pass(data))
+    os.replace(temporary_path, path)
+
+    for outdated in path.parent.glob(f"{data['ticket']}-*.png"):
+        if outdated != path:
+            outdated.unlink(missing_ok=True)
+
+    return str(path)
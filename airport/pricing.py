@@ -0,0 +1,122 @@
+"""Dynamic fares.
+
+The fare of a flight is a base fare plus a rate per kilometre of its
+route, raised with the load factor (sold / capacity, the math behind
+``tickets_available``) and as departure approaches. Fares are computed
+by the database, one ``UPDATE`` per batch of flights, instead of loading
+the schedule into Python; tickets keep the fare of their flight at the
+moment they are sold.
+"""
+from django.conf import settings
+from django.db.models import (Case,
+                              Count,
+                              DecimalField,
+                              F,
+                              FloatField,
+                              OuterRef,
+                              Subquery,
+                              Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from airport.conditional import mark_changed
+from airport.models import Airplane, Flight, Route, Ticket
+
+
+def _float(expression):
+    return Cast(expression, FloatField())
+
+
+def fare_expression(now):
+    """Fare of the flight of the current row, for ``update(price=...)``"""
+    distance = Subquery(
+        Route.objects.filter(pk=OuterRef("route_id")).values("distance")[:1]
+    )
+    capacity = Subquery(
+        Airplane.objects.filter(pk=OuterRef("airplane_id"))
+        .order_by()
+        .annotate(capacity=F("rows") * F("seats_in_row"))
+        .values("capacity")[:1]
+    )
+    sold = Coalesce(
+        Subquery(
+            Ticket.objects.filter(flight_id=OuterRef("pk"))
+            .order_by()
+            .values("flight_id")
+            .annotate(sold=Count("id"))
+            .values("sold")[:1]
+        ),
+        0,
+    )
+    departure_surcharge = Case(
+        *[
+            When(departure_time__lt=now + within, then=Value(surcharge))
+            for within, surcharge in settings.FARE_DEPARTURE_SURCHARGES
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    base = Value(float(settings.FARE_BASE)) + Value(
+        float(settings.FARE_PER_KM)
+    ) * _float(distance)
+    load_factor = Coalesce(
+        _float(sold) / NullIf(_float(capacity), Value(0.0)), Value(0.0)
+    )
+
+    return Round(
+        base
+        * (Value(1.0) + Value(settings.FARE_LOAD_FACTOR_SURCHARGE)
+           * load_factor)
+        * (Value(1.0) + departure_surcharge),
+        2,
+    )
+
+
+def current_fare(flight_id):
+    """Fare ``reprice_flights`` would give the flight now, without saving"""
+    return (
+        Flight.objects.filter(pk=flight_id)
+        .annotate(fare=Cast(
+            fare_expression(timezone.now()),
+            DecimalField(max_digits=10, decimal_places=2),
+        ))
+        .values_list("fare", flat=True)
+        .first()
+    )
+
+
+def reprice_flights(flights=None, batch_size=None) -> int:
+    """Recompute the fares of upcoming ``flights`` (all by default).
+
+    Updates at most ``batch_size`` flights per statement, so no statement
+    locks the whole schedule, and returns the number of changed fares.
+    """
+    now = timezone.now()
+    batch_size = batch_size or settings.FARE_REPRICE_BATCH_SIZE
+    if flights is None:
+        flights = Flight.objects.all()
+    flights = flights.filter(departure_time__gt=now).order_by("pk")
+
+    repriced = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            flights.filter(pk__gt=last_pk)
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        fare = fare_expression(now)
+        # Rewriting rows whose fare did not change would only bloat the
+        # table and its indexes
+        repriced += (
+            flights.filter(pk__gt=last_pk, pk__lte=batch[-1])
+            .exclude(price=fare)
+            .update(price=fare)
+        )
+        last_pk = batch[-1]
+
+    if repriced:
+        mark_changed(Flight)
+    return repriced
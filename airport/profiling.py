@@ -0,0 +1,170 @@
+"""Opt-in request profiling.
+
+``ProfilingMiddleware`` runs a sample of requests under ``cProfile``: a
+``PROFILING_SAMPLE_RATE`` fraction of all requests, requests whose path
+matches one of ``PROFILING_PATHS`` and requests sending the
+``X-Profile`` header with ``PROFILING_TOKEN``. Each profile is stored in
+a bounded on-disk ring buffer together with the view name and a summary
+of the SQL it ran, and staff download it from ``/api/profiles/`` to open
+it with ``pstats`` or snakeviz.
+
+Unsampled requests only pay for the sampling decision, and the
+middleware removes itself when ``PROFILING_ENABLED`` is off.
+"""
+import cProfile
+import marshal
+import pstats
+import random
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import FileResponse, Http404
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from airport.ring_buffer import DiskRingBuffer
+from airport.serializers import ProfileSerializer
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+TOP_FUNCTIONS = 20
+SLOWEST_QUERIES = 5
+
+
+def get_profile_buffer() -> DiskRingBuffer:
+    return DiskRingBuffer(
+        settings.PROFILING_DIR, settings.PROFILING_MAX_ENTRIES
+    )
+
+
+class QueryRecorder:
+    """Execute wrapper timing every query of a profiled request"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def summary(self) -> dict:
+        counts = Counter(sql for sql, _ in self.queries)
+        slowest = sorted(self.queries, key=lambda query: -query[1])
+        return {
+            "count": len(self.queries),
+            "time_ms": sum(duration for _, duration in self.queries) * 1000,
+            "duplicates": sum(count - 1 for count in counts.values()),
+            "slowest": [
+                {"sql": sql[:1000], "time_ms": duration * 1000}
+                for sql, duration in slowest[:SLOWEST_QUERIES]
+            ],
+        }
+
+
+def top_functions(profiler) -> list[dict]:
+    stats = pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE)
+    return [
+        {
+            "function": pstats.func_std_string(function),
+            "calls": stats.stats[function][1],
+            "own_ms": stats.stats[function][2] * 1000,
+            "cumulative_ms": stats.stats[function][3] * 1000,
+        }
+        for function in stats.fcn_list[:TOP_FUNCTIONS]
+    ]
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.paths = [re.compile(path) for path in settings.PROFILING_PATHS]
+
+    def should_profile(self, request) -> bool:
+        token = request.META.get(PROFILE_HEADER)
+        if token and settings.PROFILING_TOKEN:
+            return constant_time_compare(token, settings.PROFILING_TOKEN)
+
+        return (
+            any(path.search(request.path) for path in self.paths)
+            or random.random() < settings.PROFILING_SAMPLE_RATE
+        )
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        queries = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        profiler.create_stats()
+        payload = marshal.dumps(profiler.stats)
+        resolver_match = getattr(request, "resolver_match", None)
+        profile_id = get_profile_buffer().append(
+            {
+                "created_at": timezone.now().isoformat(),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "view": resolver_match.view_name if resolver_match else None,
+                "status": response.status_code,
+                "duration_ms": duration * 1000,
+                "sql": queries.summary(),
+                "top_functions": top_functions(profiler),
+            },
+            payload,
+        )
+        if PROFILE_HEADER in request.META:
+            response["X-Profile-Id"] = profile_id
+
+        return response
+
+
+class ProfileListView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=ProfileSerializer(many=True))
+    def get(self, request):
+        """Endpoint listing the stored request profiles, newest first"""
+        serializer = ProfileSerializer(get_profile_buffer().entries(),
+                                       many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ProfileDownloadView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses={(200, "application/octet-stream"):
+                              OpenApiTypes.BINARY})
+    def get(self, request, profile_id):
+        """Endpoint downloading a profile in pstats format"""
+        path = get_profile_buffer().payload_path(profile_id)
+        if path is None:
+            raise Http404("Profile not found.")
+
+        return FileResponse(
+            path.open("rb"),
+            as_attachment=True,
+            filename=f"{profile_id}.prof",
+            content_type="application/octet-stream",
+        )
@@ -0,0 +1,96 @@
+"""Bounded on-disk store of diagnostic records.
+
+Each entry is a JSON metadata file plus an optional binary payload in one
+directory. Entry ids start with a nanosecond timestamp, so a directory
+listing is already in chronological order and the oldest entries are
+removed once ``capacity`` is exceeded. Files are written atomically, so
+several worker processes can share the directory without locking.
+"""
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+ENTRY_ID = re.compile(r"^\d{20}-[0-9a-f]{8}$")
+
+
+class DiskRingBuffer:
+    def __init__(self, directory, capacity: int):
+        self.directory = Path(directory)
+        self.capacity = capacity
+
+    def _write(self, path, data: bytes):
+        temporary_path = path.with_name(f".{path.name}.{os.getpid()}")
+        temporary_path.write_bytes(data)
+        os.replace(temporary_path, path)
+
+    def append(self, metadata: dict, payload: bytes | None = None) -> str:
+        """Store an entry and return its id"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        if payload is not None:
+            self._write(self.directory / f"{entry_id}.bin", payload)
+        metadata = {"entry_id": entry_id, **metadata}
+        self._write(
+            self.directory / f"{entry_id}.json",
+            json.dumps(metadata, default=str).encode(),
+        )
+        self.prune()
+        return entry_id
+
+    def entry_ids(self) -> list[str]:
+        """Return the stored ids, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        return sorted(
+            name[:-5] for name in names
+            if name.endswith(".json") and ENTRY_ID.match(name[:-5])
+        )
+
+    def update(self, entry_id: str, metadata: dict) -> bool:
+        """Merge ``metadata`` into a stored entry, False once it is gone"""
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+
+        entry.update(metadata)
+        self._write(
+            self.directory / f"{entry_id}.json",
+            json.dumps(entry, default=str).encode(),
+        )
+        return True
+
+    def prune(self):
+        entry_ids = self.entry_ids()
+        for entry_id in entry_ids[:max(len(entry_ids) - self.capacity, 0)]:
+            for suffix in (".json", ".bin"):
+                try:
+                    os.remove(self.directory / f"{entry_id}{suffix}")
+                except FileNotFoundError:
+                    pass  # already removed by another process
+
+    def get(self, entry_id: str) -> dict | None:
+        if not ENTRY_ID.match(entry_id):
+            return None
+        try:
+            return json.loads(
+                (self.directory / f"{entry_id}.json").read_bytes()
+            )
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def entries(self) -> list[dict]:
+        """Return the metadata of every entry, newest first"""
+        entries = (self.get(entry_id) for entry_id in self.entry_ids())
+        return [entry for entry in reversed(list(entries)) if entry]
+
+    def payload_path(self, entry_id: str) -> Path | None:
+        if not ENTRY_ID.match(entry_id):
+            return None
+        path = self.directory / f"{entry_id}.bin"
+        return path if path.is_file() else None
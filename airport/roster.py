@@ -0,0 +1,231 @@
+"""Crew rostering checks.
+
+A crew member's duties are the flights they are assigned to. Two duties
+conflict when they overlap or when the gap between them is shorter than
+``settings.CREW_MIN_REST``. All lookups go through the index on
+``Flight.departure_time`` and the crew foreign key of the M2M table, so
+they never load a whole schedule into Python.
+"""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import pairwise
+
+from django.conf import settings
+
+from airport.models import Flight
+
+CrewAssignment = Flight.crew.through
+
+
+@dataclass(frozen=True)
+class CrewConflict:
+    crew_id: int
+    flight_id: int | None
+    conflicting_flight_id: int | None
+    kind: str
+    gap_hours: float
+
+    OVERLAP = "overlap"
+    INSUFFICIENT_REST = "insufficient_rest"
+
+
+def _classify(previous_arrival, next_departure, min_rest):
+    gap = next_departure - previous_arrival
+    if gap.total_seconds() < 0:
+        return CrewConflict.OVERLAP, gap
+    if gap < min_rest:
+        return CrewConflict.INSUFFICIENT_REST, gap
+    return None, gap
+
+
+def find_crew_conflicts(
+        crew_ids,
+        departure_time: datetime,
+        arrival_time: datetime,
+        exclude_flight_id: int | None = None,
+        min_rest=None,
+) -> list[CrewConflict]:
+    """Return conflicts a new duty would cause for the given crew.
+
+    Only assignments whose flight falls inside the duty window widened by
+    the minimum rest are fetched, using a single range query.
+    """
+    if min_rest is None:
+        min_rest = settings.CREW_MIN_REST
+
+    assignments = (
+        CrewAssignment.objects
+        .filter(
+            crew_id__in=crew_ids,
+            flight__departure_time__lt=arrival_time + min_rest,
+            flight__arrival_time__gt=departure_time - min_rest,
+        )
+        .exclude(flight_id=exclude_flight_id)
+        .order_by("crew_id", "flight__departure_time")
+        .values_list(
+            "crew_id",
+            "flight_id",
+            "flight__departure_time",
+            "flight__arrival_time",
+        )
+    )
+
+    conflicts = []
+    for crew_id, flight_id, other_departure, other_arrival in assignments:
+        if other_departure <= departure_time:
+            kind, gap = _classify(other_arrival, departure_time, min_rest)
+        else:
+            kind, gap = _classify(arrival_time, other_departure, min_rest)
+
+        if kind:
+            conflicts.append(CrewConflict(
+                crew_id=crew_id,
+                flight_id=exclude_flight_id,
+                conflicting_flight_id=flight_id,
+                kind=kind,
+                gap_hours=gap.total_seconds() / 3600,
+            ))
+
+    return conflicts
+
+
+def find_duties_conflicts(
+        crew_ids,
+        duties,
+        exclude_flights=None,
+        min_rest=None,
+) -> list[CrewConflict]:
+    """Return conflicts a series of new duties would cause for the crew.
+
+    ``duties`` are ``(departure, arrival)`` pairs sorted by departure, with
+    arrivals in the same order, like the flights of a schedule. The crew's
+    assignments of the whole period are fetched with a single range query
+    and matched to the duties by binary search; consecutive duties are
+    checked against each other too, with no ``conflicting_flight_id``.
+    """
+    if min_rest is None:
+        min_rest = settings.CREW_MIN_REST
+    if not crew_ids or not duties:
+        return []
+
+    departures = [departure for departure, _ in duties]
+    arrivals = [arrival for _, arrival in duties]
+    assignments = CrewAssignment.objects.filter(
+        crew_id__in=crew_ids,
+        flight__departure_time__lt=arrivals[-1] + min_rest,
+        flight__arrival_time__gt=departures[0] - min_rest,
+    )
+    if exclude_flights is not None:
+        assignments = assignments.exclude(flight__in=exclude_flights)
+    assignments = assignments.order_by(
+        "crew_id", "flight__departure_time"
+    ).values_list(
+        "crew_id",
+        "flight_id",
+        "flight__departure_time",
+        "flight__arrival_time",
+    )
+
+    conflicts = []
+    for crew_id, flight_id, other_departure, other_arrival in assignments:
+        # Only duties within the minimum rest of the flight can conflict
+        first = bisect_right(arrivals, other_departure - min_rest)
+        last = bisect_left(departures, other_arrival + min_rest)
+        for departure, arrival in duties[first:last]:
+            if other_departure <= departure:
+                kind, gap = _classify(other_arrival, departure, min_rest)
+            else:
+                kind, gap = _classify(arrival, other_departure, min_rest)
+
+            if kind:
+                conflicts.append(CrewConflict(
+                    crew_id=crew_id,
+                    flight_id=None,
+                    conflicting_flight_id=flight_id,
+                    kind=kind,
+                    gap_hours=gap.total_seconds() / 3600,
+                ))
+
+    for (_, arrival), (next_departure, _) in pairwise(duties):
+        kind, gap = _classify(arrival, next_departure, min_rest)
+        if kind:
+            conflicts.extend(
+                CrewConflict(
+                    crew_id=crew_id,
+                    flight_id=None,
+                    conflicting_flight_id=None,
+                    kind=kind,
+                    gap_hours=gap.total_seconds() / 3600,
+                )
+                for crew_id in crew_ids
+            )
+
+    return conflicts
+
+
+def crew_schedule(crew_id: int, start=None, end=None):
+    """Return the crew member's flights ordered by departure time"""
+    queryset = (
+        Flight.objects
+        .filter(crew__id=crew_id)
+        .select_related("route__source", "route__destination")
+        .order_by("departure_time")
+    )
+    if start:
+        queryset = queryset.filter(arrival_time__gte=start)
+    if end:
+        queryset = queryset.filter(departure_time__lt=end)
+
+    return queryset
+
+
+def season_conflicts(start=None, end=None, min_rest=None):
+    """Yield every crew conflict in a period with a single sweep.
+
+    Assignments are streamed sorted by crew and departure time, so each
+    duty only has to be compared with the latest-arriving earlier duty of
+    the same crew member: O(n log n) for the sort instead of O(n^2).
+    """
+    if min_rest is None:
+        min_rest = settings.CREW_MIN_REST
+
+    assignments = CrewAssignment.objects.all()
+    if start:
+        assignments = assignments.filter(flight__arrival_time__gte=start)
+    if end:
+        assignments = assignments.filter(flight__departure_time__lt=end)
+
+    assignments = (
+        assignments
+        .order_by("crew_id", "flight__departure_time", "flight_id")
+        .values_list(
+            "crew_id",
+            "flight_id",
+            "flight__departure_time",
+            "flight__arrival_time",
+        )
+        .iterator(chunk_size=2000)
+    )
+
+    current_crew_id = None
+    latest_flight_id = None
+    latest_arrival = None
+    for crew_id, flight_id, departure_time, arrival_time in assignments:
+        if crew_id != current_crew_id:
+            current_crew_id = crew_id
+            latest_flight_id, latest_arrival = flight_id, arrival_time
+            continue
+
+        kind, gap = _classify(latest_arrival, departure_time, min_rest)
+        if kind:
+            yield CrewConflict(
+                crew_id=crew_id,
+                flight_id=flight_id,
+                conflicting_flight_id=latest_flight_id,
+                kind=kind,
+                gap_hours=gap.total_seconds() / 3600,
+            )
+
+        if arrival_time > latest_arrival:
+            latest_flight_id, latest_arrival = flight_id, arrival_time
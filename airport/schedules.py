@@ -0,0 +1,371 @@
+"""Recurring flight schedules.
+
+A ``FlightSchedule`` is turned into concrete ``Flight`` rows for a rolling
+horizon of ``settings.FLIGHT_SCHEDULE_HORIZON`` by
+``materialize_schedules`` (``manage.py materialize_schedules``, e.g. from
+cron). Occurrences are computed in Python and written with
+``bulk_create`` in batches; flights that already exist are skipped and the
+unique ``(schedule, departure_time)`` constraint absorbs concurrent runs,
+so materializing is idempotent. ``materialized_until`` remembers how far
+a schedule was materialized, so later runs only look at the new days.
+Days whose flight was cancelled (``CancelledDeparture``) are skipped.
+
+Editing a schedule rewrites its upcoming flights with a few ``UPDATE``
+and ``DELETE`` statements (``update_schedule_flights``) instead of
+saving every flight. Edits are refused when seats sold on those flights
+don't exist on the new airplane or the moved flights would overlap the
+airplane's other flights. Both materializing and editing refuse, with a
+``ValidationError``, flights whose crew would break the roster rules of
+``airport.roster``.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import accumulate
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from airport.conditional import mark_changed
+from airport.fleet import (AIRPLANE_OVERLAP_MESSAGE,
+                           enforced_by_database,
+                           lock_airplane,
+                           overlapping_flights)
+from airport.models import Flight, FlightSchedule, Ticket
+from airport.pricing import reprice_flights
+from airport.roster import find_duties_conflicts
+
+CrewAssignment = Flight.crew.through
+SOLD_SEATS_MESSAGE = (
+    "Seats sold on upcoming flights of the schedule don't exist on this "
+    "airplane."
+)
+
+
+def check_time_zone(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError) as error:
+        raise ValidationError("Unknown time zone.") from error
+
+
+def check_duration(duration):
+    if duration <= timedelta(0):
+        raise ValidationError("Duration must be positive.")
+    if duration > settings.MAX_FLIGHT_DURATION:
+        raise ValidationError(
+            f"Flights can't last longer than {settings.MAX_FLIGHT_DURATION}."
+        )
+
+
+def local_departure(schedule, day: date) -> datetime:
+    """Departure of the schedule on ``day``, in UTC"""
+    return datetime.combine(
+        day, schedule.departure_time, tzinfo=ZoneInfo(schedule.time_zone)
+    ).astimezone(dt_timezone.utc)
+
+
+def occurrences(schedule, start: date, end: date):
+    """Yield ``(departure, arrival)`` of the schedule from start to end"""
+    weekdays = set(schedule.weekdays)
+    day = max(start, schedule.valid_from)
+    end = min(end, schedule.valid_until)
+    while day <= end:
+        if day.isoweekday() in weekdays:
+            departure = local_departure(schedule, day)
+            yield departure, departure + schedule.duration
+        day += timedelta(days=1)
+
+
+def _busy_checker(airplane_id, start, end, schedule):
+    """Return a predicate telling if the airplane is busy in a window.
+
+    Loads the airplane's other flights of the period with one query;
+    every check is then a binary search.
+    """
+    busy = list(
+        overlapping_flights(airplane_id, start, end)
+        .exclude(schedule=schedule)
+        .order_by("departure_time")
+        .values_list("departure_time", "arrival_time")
+    )
+    latest_arrivals = list(accumulate(
+        (arrival for _, arrival in busy), max
+    ))
+
+    def is_busy(departure, arrival):
+        index = bisect_left(busy, (arrival,))
+        return index > 0 and latest_arrivals[index - 1] > departure
+
+    return is_busy
+
+
+def _planned(schedule, start, now, until):
+    """Occurrences departing after ``now``, but on cancelled days"""
+    cancelled = set()
+    if schedule.pk is not None:
+        cancelled = set(
+            schedule.cancelled_departures.filter(day__gte=start)
+            .values_list("day", flat=True)
+        )
+    zone = ZoneInfo(schedule.time_zone)
+    return [
+        (departure, arrival)
+        for departure, arrival in occurrences(schedule, start, until)
+        if departure > now
+        and departure.astimezone(zone).date() not in cancelled
+    ]
+
+
+def _check_crew(crew, duties, exclude_flights=None):
+    """Refuse duties that would break the crew's roster rules"""
+    crew_by_id = {member.id: member for member in crew}
+    conflicts = find_duties_conflicts(
+        list(crew_by_id), duties, exclude_flights=exclude_flights
+    )
+    if not conflicts:
+        return
+
+    messages = []
+    for conflict in conflicts:
+        member = crew_by_id[conflict.crew_id]
+        kind = conflict.kind.replace("_", " ")
+        if conflict.conflicting_flight_id is None:
+            messages.append(f"{member} can't fly consecutive flights of "
+                            f"the schedule ({kind})")
+        else:
+            messages.append(f"{member} is assigned to flight "
+                            f"{conflict.conflicting_flight_id} ({kind})")
+    raise ValidationError({"crew": list(dict.fromkeys(messages))})
+
+
+def _materialize(schedule, now, until, batch_size) -> int:
+    start = now.date()
+    if schedule.materialized_until:
+        start = max(start, schedule.materialized_until + timedelta(days=1))
+    planned = _planned(schedule, start, now, until)
+
+    created = []
+    if planned:
+        first_departure, last_arrival = planned[0][0], planned[-1][1]
+        existing = set(
+            Flight.objects
+            .filter(
+                schedule=schedule,
+                departure_time__gte=first_departure,
+                departure_time__lte=planned[-1][0],
+            )
+            .values_list("departure_time", flat=True)
+        )
+        is_busy = _busy_checker(
+            schedule.airplane_id, first_departure, last_arrival, schedule
+        )
+        created = [
+            Flight(
+                route_id=schedule.route_id,
+                airplane_id=schedule.airplane_id,
+                schedule=schedule,
+                departure_time=departure,
+                arrival_time=arrival,
+            )
+            for departure, arrival in planned
+            if departure not in existing and not is_busy(departure, arrival)
+        ]
+
+    crew = schedule.crew.all()
+    _check_crew(
+        crew,
+        [(flight.departure_time, flight.arrival_time) for flight in created],
+    )
+    with transaction.atomic():
+        # Conflicts left are flights a concurrent run just created or, on
+        # PostgreSQL, airplane overlaps caught by the exclusion constraint
+        Flight.objects.bulk_create(
+            created, batch_size=batch_size, ignore_conflicts=True
+        )
+        crew_ids = [member.id for member in crew]
+        if created and crew_ids:
+            departures = {flight.departure_time for flight in created}
+            flight_ids = [
+                flight_id
+                for flight_id, departure in Flight.objects.filter(
+                    schedule=schedule,
+                    departure_time__gte=created[0].departure_time,
+                    departure_time__lte=created[-1].departure_time,
+                ).values_list("id", "departure_time")
+                if departure in departures
+            ]
+            CrewAssignment.objects.bulk_create(
+                [
+                    CrewAssignment(flight_id=flight_id, crew_id=crew_id)
+                    for flight_id in flight_ids
+                    for crew_id in crew_ids
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+        FlightSchedule.objects.filter(pk=schedule.pk).update(
+            materialized_until=until
+        )
+
+    return len(created)
+
+
+def materialize_schedules(schedules=None, horizon=None,
+                          batch_size=None) -> int:
+    """Create the missing flights of ``schedules`` (all by default).
+
+    Flights are created up to ``horizon`` ahead; schedules already
+    materialized that far are skipped without a look at their flights.
+    Returns the number of flights created. Raises ``ValidationError`` when
+    the new flights would break the roster rules of a schedule's crew.
+    """
+    now = timezone.now()
+    until = (now + (horizon or settings.FLIGHT_SCHEDULE_HORIZON)).date()
+    batch_size = batch_size or settings.FLIGHT_SCHEDULE_BATCH_SIZE
+    if schedules is None:
+        schedules = FlightSchedule.objects.all()
+    schedules = (
+        schedules
+        .filter(valid_until__gte=now.date())
+        .filter(
+            Q(materialized_until__isnull=True)
+            | Q(materialized_until__lt=until)
+        )
+        .prefetch_related("crew")
+    )
+
+    created = 0
+    materialized = []
+    for schedule in schedules:
+        created += _materialize(schedule, now, until, batch_size)
+        materialized.append(schedule.pk)
+
+    if materialized:
+        mark_changed(FlightSchedule)
+    if created:
+        mark_changed(Flight)
+        reprice_flights(Flight.objects.filter(schedule__in=materialized))
+    return created
+
+
+def _upcoming_flights(schedule):
+    return Flight.objects.filter(
+        schedule=schedule, departure_time__gt=timezone.now()
+    )
+
+
+def check_sold_seats(schedule, airplane):
+    """Refuse an airplane missing seats sold on upcoming flights"""
+    missing_seats = Ticket.objects.filter(
+        flight__in=_upcoming_flights(schedule)
+    ).filter(Q(row__gt=airplane.rows) | Q(seat__gt=airplane.seats_in_row))
+    if missing_seats.exists():
+        raise ValidationError({"airplane": SOLD_SEATS_MESSAGE})
+
+
+def _moved_flights(schedule, shift, duration):
+    """``(departure, arrival)`` of the upcoming flights once moved"""
+    return [
+        (departure + shift, departure + shift + duration)
+        for departure in _upcoming_flights(schedule)
+        .order_by("departure_time")
+        .values_list("departure_time", flat=True)
+    ]
+
+
+def check_airplane_overlaps(schedule, airplane, shift, duration):
+    """Refuse moving upcoming flights onto the airplane's other flights"""
+    with transaction.atomic():
+        lock_airplane(airplane.id)
+        moved = _moved_flights(schedule, shift, duration)
+        if not moved:
+            return
+
+        is_busy = _busy_checker(
+            airplane.id, moved[0][0], moved[-1][1], schedule
+        )
+        if any(is_busy(departure, arrival) for departure, arrival in moved):
+            raise ValidationError({"airplane": AIRPLANE_OVERLAP_MESSAGE})
+
+
+def check_crew_conflicts(schedule, crew):
+    """Refuse a crew the schedule's flights would break roster rules for.
+
+    ``schedule`` may be unsaved or carry unsaved edits: its flights up to
+    the horizon are checked in place of its upcoming ones.
+    """
+    now = timezone.now()
+    until = (now + settings.FLIGHT_SCHEDULE_HORIZON).date()
+    _check_crew(
+        crew,
+        _planned(schedule, now.date(), now, until),
+        exclude_flights=(
+            _upcoming_flights(schedule) if schedule.pk is not None else None
+        ),
+    )
+
+
+def update_schedule_flights(schedule, shift=None, crew_changed=False):
+    """Apply an edited schedule to its upcoming flights.
+
+    ``shift`` is how much the departure moved. Flights that fall off the
+    schedule are deleted, or detached from it when tickets were sold;
+    days the schedule now covers are materialized. Raises
+    ``ValidationError`` when the flights can't follow the edit.
+    """
+    shift = shift or timedelta(0)
+    upcoming = _upcoming_flights(schedule)
+
+    with transaction.atomic():
+        check_sold_seats(schedule, schedule.airplane)
+        if not enforced_by_database():
+            check_airplane_overlaps(
+                schedule, schedule.airplane, shift, schedule.duration
+            )
+        _check_crew(
+            schedule.crew.all(),
+            _moved_flights(schedule, shift, schedule.duration),
+            exclude_flights=upcoming,
+        )
+        upcoming.update(
+            route_id=schedule.route_id,
+            airplane_id=schedule.airplane_id,
+            departure_time=F("departure_time") + shift,
+            arrival_time=F("departure_time") + shift + schedule.duration,
+        )
+
+        # Weekdays and dates are those of the schedule's time zone
+        with timezone.override(ZoneInfo(schedule.time_zone)):
+            off_schedule = upcoming.filter(
+                ~Q(departure_time__iso_week_day__in=schedule.weekdays)
+                | Q(departure_time__date__lt=schedule.valid_from)
+                | Q(departure_time__date__gt=schedule.valid_until)
+            )
+            off_schedule.filter(tickets__isnull=False).update(schedule=None)
+            off_schedule.delete()
+
+        if crew_changed:
+            crew_ids = list(schedule.crew.values_list("id", flat=True))
+            CrewAssignment.objects.filter(flight__in=upcoming).delete()
+            CrewAssignment.objects.bulk_create(
+                [
+                    CrewAssignment(flight_id=flight_id, crew_id=crew_id)
+                    for flight_id in upcoming.values_list("id", flat=True)
+                    for crew_id in crew_ids
+                ],
+                batch_size=settings.FLIGHT_SCHEDULE_BATCH_SIZE,
+            )
+
+        schedule.materialized_until = None
+        FlightSchedule.objects.filter(pk=schedule.pk).update(
+            materialized_until=None
+        )
+
+    mark_changed(Flight, FlightSchedule)
+    reprice_flights(Flight.objects.filter(schedule=schedule))
+    materialize_schedules(FlightSchedule.objects.filter(pk=schedule.pk))
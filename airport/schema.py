@@ -0,0 +1,175 @@
+"""Precomputed OpenAPI schema.
+
+drf-spectacular introspects every view and serializer to build the
+schema, which takes hundreds of milliseconds. The schema only changes
+with the code, so it is generated once per deployment: ``manage.py
+buildschema`` writes it to ``settings.OPENAPI_SCHEMA_FILE``, and otherwise
+the first request generates and stores it. Each process keeps the
+rendered YAML/JSON documents, their gzipped bodies and ETags in memory.
+
+The file records a fingerprint of the project's source files, so a stale
+schema from a previous release is regenerated instead of served.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+
+@dataclass(frozen=True)
+class SchemaDocument:
+    content: bytes
+    gzipped: bytes
+    etag: str
+
+
+def source_fingerprint() -> str:
+    """Hash the path, size and mtime of the project's Python files"""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    stats = []
+    for app_config in apps.get_app_configs():
+        app_path = Path(app_config.path).resolve()
+        if base_dir not in app_path.parents:
+            continue
+        for path in sorted(app_path.rglob("*.py")):
+            if "migrations" in path.parts or "tests" in path.parts:
+                continue
+            stat = path.stat()
+            stats.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+
+    stats.append(repr(sorted(settings.SPECTACULAR_SETTINGS.items())))
+    return hashlib.sha256("\n".join(stats).encode()).hexdigest()
+
+
+def generate_schema() -> dict:
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def write_schema_file(schema, fingerprint, path=None):
+    """Atomically store the schema next to the fingerprint it matches"""
+    path = Path(path or settings.OPENAPI_SCHEMA_FILE)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary_path.write_text(
+        json.dumps({"fingerprint": fingerprint, "schema": schema})
+    )
+    os.replace(temporary_path, path)
+
+
+def read_schema_file(fingerprint, path=None):
+    """Return the stored schema, or None when missing or stale"""
+    path = Path(path or settings.OPENAPI_SCHEMA_FILE)
+    try:
+        stored = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if stored.get("fingerprint") != fingerprint:
+        return None
+
+    return stored.get("schema")
+
+
+_lock = threading.Lock()
+_cache = {"schema": None, "documents": {}}
+
+
+def clear_schema_cache():
+    with _lock:
+        _cache["schema"] = None
+        _cache["documents"] = {}
+
+
+def get_schema() -> dict:
+    """Return the schema from memory, the schema file or a fresh build"""
+    if _cache["schema"] is not None:
+        return _cache["schema"]
+
+    with _lock:
+        if _cache["schema"] is None:
+            fingerprint = source_fingerprint()
+            schema = None
+            if settings.OPENAPI_SCHEMA_FILE:
+                schema = read_schema_file(fingerprint)
+            if schema is None:
+                schema = generate_schema()
+                if settings.OPENAPI_SCHEMA_FILE:
+                    try:
+                        write_schema_file(schema, fingerprint)
+                    except OSError:
+                        pass  # read-only deployments keep it in memory
+            _cache["schema"] = schema
+
+    return _cache["schema"]
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header accepts gzip with a non-zero q"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def get_document(renderer) -> SchemaDocument:
+    """Return the schema rendered with ``renderer``, computed once"""
+    documents = _cache["documents"]
+    if renderer.media_type not in documents:
+        content = renderer.render(get_schema(), renderer.media_type, {})
+        documents[renderer.media_type] = SchemaDocument(
+            content=content,
+            gzipped=gzip.compress(content, mtime=0),
+            etag=quote_etag(hashlib.sha256(content).hexdigest()[:32]),
+        )
+
+    return documents[renderer.media_type]
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """Serve the precomputed schema with an ETag and gzip compression.
+
+    Requests for another API version or language bypass the cache.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("lang") or request.GET.get("version"):
+            response = super().get(request, *args, **kwargs)
+            patch_vary_headers(response, ("Accept",))
+            return response
+
+        document = get_document(request.accepted_renderer)
+        response = get_conditional_response(request, etag=document.etag)
+        if response is None:
+            response = HttpResponse(content_type=(
+                request.accepted_renderer.media_type
+            ))
+            if accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+                response.content = document.gzipped
+                response["Content-Encoding"] = "gzip"
+            else:
+                response.content = document.content
+
+        response["ETag"] = document.etag
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
@@ -0,0 +1,173 @@
+"""In-process prefix index for typeahead search.
+
+Airports, cities, countries and airplanes are few enough to keep in
+memory. Their names are split into lowercase words kept in one sorted
+list, so a prefix lookup is a binary search plus a short scan instead of
+an ``icontains`` sequential scan per keystroke. The index is rebuilt
+lazily whenever the ``TableVersion`` of one of its tables changes, which
+costs a single small query per search.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from airport.conditional import current_versions
+from airport.models import Airplane, AirplaneType, Airport, City, Country
+
+SEARCH_MODELS = (Airport, City, Country, Airplane, AirplaneType)
+KIND_ORDER = ("airport", "city", "country", "airplane")
+NAME, SECONDARY = 0, 1
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so "Zürich" matches "zur" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).lower()
+
+
+def words(text: str) -> list[str]:
+    return _WORD.findall(normalize(text))
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    kind: str
+    pk: int
+    label: str
+    detail: str
+
+
+class PrefixIndex:
+    def __init__(self, results):
+        """Index ``(result, secondary_texts)`` pairs"""
+        self.results = []
+        self.names = []
+        tokens = []
+        for result, secondary_texts in results:
+            position = len(self.results)
+            name_words = words(result.label)
+            self.results.append(result)
+            self.names.append(" ".join(name_words))
+            tokens.extend((word, NAME, position) for word in name_words)
+            for text in secondary_texts:
+                tokens.extend(
+                    (word, SECONDARY, position) for word in words(text)
+                )
+
+        tokens.sort()
+        self.words = [word for word, _, _ in tokens]
+        self.postings = [(field, position) for _, field, position in tokens]
+
+    def _prefix_matches(self, prefix):
+        """Return ``{position: best field}`` of results with the prefix"""
+        matches = {}
+        start = bisect_left(self.words, prefix)
+        for index in range(start, len(self.words)):
+            if not self.words[index].startswith(prefix):
+                break
+            field, position = self.postings[index]
+            matches[position] = min(field, matches.get(position, field))
+
+        return matches
+
+    def search(self, query: str, limit: int) -> list[SearchResult]:
+        """Return results whose words start with every term of the query.
+
+        Exact names come first, then names starting with the query, then
+        matches on a name word and finally matches on secondary fields.
+        """
+        terms = words(query)
+        if not terms:
+            return []
+
+        matches = self._prefix_matches(terms[0])
+        for term in terms[1:]:
+            term_matches = self._prefix_matches(term)
+            matches = {
+                position: max(field, term_matches[position])
+                for position, field in matches.items()
+                if position in term_matches
+            }
+
+        phrase = " ".join(terms)
+
+        def rank(position):
+            result = self.results[position]
+            name = self.names[position]
+            return (
+                name != phrase,
+                not name.startswith(phrase),
+                matches[position],
+                KIND_ORDER.index(result.kind),
+                len(result.label),
+                result.label,
+            )
+
+        return [
+            self.results[position]
+            for position in sorted(matches, key=rank)[:limit]
+        ]
+
+
+def _indexed_results():
+    for airport in Airport.objects.select_related("city__country"):
+        yield SearchResult(
+            "airport",
+            airport.id,
+            airport.name,
+            f"{airport.city.name}, {airport.city.country.name}",
+        ), (airport.closest_big_city, airport.city.name)
+
+    for city in City.objects.select_related("country"):
+        yield SearchResult(
+            "city", city.id, city.name, city.country.name
+        ), ()
+
+    for country in Country.objects.all():
+        yield SearchResult("country", country.id, country.name, ""), ()
+
+    for airplane in Airplane.objects.select_related("airplane_type"):
+        yield SearchResult(
+            "airplane", airplane.id, airplane.name,
+            airplane.airplane_type.name,
+        ), ()
+
+
+def build_index() -> PrefixIndex:
+    return PrefixIndex(_indexed_results())
+
+
+_lock = threading.Lock()
+_cached = {"versions": None, "index": None}
+
+
+def clear_index():
+    """Force a rebuild on the next search"""
+    _cached["versions"] = None
+
+
+def get_index() -> PrefixIndex:
+    """Return the index, rebuilding it if a searched table changed"""
+    versions = {
+        label: version
+        for label, (version, _) in current_versions(SEARCH_MODELS).items()
+    }
+    if _cached["versions"] == versions:
+        return _cached["index"]
+
+    with _lock:
+        if _cached["versions"] != versions:
+            _cached["index"] = build_index()
+            _cached["versions"] = versions
+
+    return _cached["index"]
+
+
+def autocomplete(query: str, limit: int = 10) -> list[SearchResult]:
+    return get_index().search(query, limit)
@@ -1,6 +1,12 @@
+import time
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
 from airport.models import (Country,
                             City,
@@ -9,42 +15,181 @@ from airport.models import (Country,
                             Airplane,
                             Route,
                             Flight,
+                            FlightSchedule,
                             Order,
                             Ticket,
                             Crew)
-
-
-class CrewSerializer(serializers.ModelSerializer):
+from airport.fleet import (AIRPLANE_OVERLAP_MESSAGE,
+                           enforced_by_database,
+                           is_airplane_overlap_error,
+                           lock_airplane,
+                           overlapping_flights)
+from airport.metrics import SERIALIZED_OBJECTS, SERIALIZER_TIME
+from airport.roster import find_crew_conflicts
+from airport.schedules import (check_duration,
+                               check_time_zone,
+                               local_departure,
+                               materialize_schedules,
+                               update_schedule_flights)
+
+SEAT_TAKEN_MESSAGE = "Seat {row}-{seat} of flight {flight} is already taken."
+DUPLICATE_SEAT_MESSAGE = "Seat {row}-{seat} of flight {flight} is repeated."
+
+
+def query_param_set(request, name) -> set[str] | None:
+    """Parse a comma separated query parameter, None when it is absent"""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """Sparse fieldsets (``?fields=``) and on-demand expansion (``?expand=``).
+
+    Only a root serializer of a safe request reacts to the parameters.
+    ``expandable_fields`` maps a field to the nested serializer replacing
+    it, ``select_related_fields``/``prefetch_related_fields`` and
+    ``annotated_fields`` tell ``optimize_queryset`` what each field needs,
+    so fields that are not rendered are not queried either.
+    """
+
+    expandable_fields = {}
+    select_related_fields = {}
+    prefetch_related_fields = {}
+    annotated_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        for name in self.requested_expansions(request):
+            expansion = self.expandable_fields[name]
+            self.fields[name] = expansion["serializer"](
+                many=expansion.get("many", False), read_only=True
+            )
+
+        requested_fields = self.requested_fields(request)
+        for name in list(self.fields):
+            if name not in requested_fields:
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        """Time top-level objects, nested ones are part of their parent"""
+        parent = self.parent
+        if parent is not None and not (
+            isinstance(parent, serializers.ListSerializer)
+            and parent.parent is None
+        ):
+            return super().to_representation(instance)
+
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            labels = (type(self).__name__,)
+            SERIALIZER_TIME.inc(labels, time.perf_counter() - start)
+            SERIALIZED_OBJECTS.inc(labels)
+
+    @classmethod
+    def requested_expansions(cls, request) -> set[str]:
+        expand = query_param_set(request, "expand") or set()
+        return expand & set(cls.expandable_fields)
+
+    @classmethod
+    def requested_fields(cls, request) -> set[str]:
+        fields = set(cls.Meta.fields) | cls.requested_expansions(request)
+        only = query_param_set(request, "fields")
+        if only is not None:
+            fields &= only
+
+        return fields
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Join, prefetch and annotate only what the response will use"""
+        expansions = cls.requested_expansions(request)
+        select_related = set()
+        prefetch_related = set()
+        annotations = {}
+        for name in cls.requested_fields(request):
+            if name in expansions:
+                expansion = cls.expandable_fields[name]
+                select_related.update(expansion.get("select_related", ()))
+                prefetch_related.update(expansion.get("prefetch_related", ()))
+            else:
+                select_related.update(cls.select_related_fields.get(name, ()))
+                prefetch_related.update(
+                    cls.prefetch_related_fields.get(name, ())
+                )
+
+            if name in cls.annotated_fields:
+                annotations[name] = cls.annotated_fields[name]
+
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(prefetch_related))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+
+        return queryset
+
+
+class CrewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Crew
         fields = ("id", "first_name", "last_name")
 
 
-class CountrySerializer(serializers.ModelSerializer):
+class CountrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Country
         fields = ("id", "name")
 
 
-class CitySerializer(serializers.ModelSerializer):
+class CitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "country": {
+            "serializer": CountrySerializer,
+            "select_related": ("country",),
+        },
+    }
+
     class Meta:
         model = City
         fields = ("id", "name", "country")
 
 
-class AirportSerializer(serializers.ModelSerializer):
+class AirportSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "city": {
+            "serializer": CitySerializer,
+            "select_related": ("city",),
+        },
+    }
+
     class Meta:
         model = Airport
         fields = ("id", "name", "city", "closest_big_city")
 
 
-class AirplaneTypeSerializer(serializers.ModelSerializer):
+class AirplaneTypeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AirplaneType
         fields = ("id", "name")
 
 
-class AirplaneSerializer(serializers.ModelSerializer):
+class AirplaneSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "airplane_type": {
+            "serializer": AirplaneTypeSerializer,
+            "select_related": ("airplane_type",),
+        },
+    }
 
     class Meta:
         model = Airplane
@@ -61,12 +206,18 @@ class AirplaneListSerializer(AirplaneSerializer):
         many=False, read_only=True, slug_field="name"
     )
 
+    select_related_fields = {
+        "airplane_type": ("airplane_type",),
+    }
+
     class Meta:
         model = Airplane
         fields = (
             "id",
             "name",
             "airplane_type",
+            "rows",
+            "seats_in_row",
             "capacity",
             "image",
         )
@@ -78,7 +229,18 @@ class AirplaneImageSerializer(serializers.ModelSerializer):
         fields = ("id", "image")
 
 
-class RouteSerializer(serializers.ModelSerializer):
+class RouteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "source": {
+            "serializer": AirportSerializer,
+            "select_related": ("source",),
+        },
+        "destination": {
+            "serializer": AirportSerializer,
+            "select_related": ("destination",),
+        },
+    }
+
     class Meta:
         model = Route
         fields = ("id", "source", "destination", "distance")
@@ -92,13 +254,100 @@ class RouteListSerializer(RouteSerializer):
         many=False, read_only=True, slug_field="name"
     )
 
+    select_related_fields = {
+        "source": ("source",),
+        "destination": ("destination",),
+    }
+
+
+class FlightSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    prefetch_related_fields = {
+        "crew": ("crew",),
+    }
+
+    def validate(self, attrs):
+        data = super(FlightSerializer, self).validate(attrs=attrs)
+        instance = self.instance
+        departure_time = attrs.get(
+            "departure_time", getattr(instance, "departure_time", None)
+        )
+        arrival_time = attrs.get(
+            "arrival_time", getattr(instance, "arrival_time", None)
+        )
+        if arrival_time < departure_time:
+            raise serializers.ValidationError(
+                {"arrival_time": "Arrival can't be earlier than departure."}
+            )
+        if arrival_time - departure_time > settings.MAX_FLIGHT_DURATION:
+            raise serializers.ValidationError(
+                {"arrival_time": "Flights can't last longer than "
+                                 f"{settings.MAX_FLIGHT_DURATION}."}
+            )
+
+        crew = attrs.get("crew")
+        if crew is None:
+            crew = list(instance.crew.all()) if instance else []
+        if not crew:
+            return data
+
+        conflicts = find_crew_conflicts(
+            [member.id for member in crew],
+            departure_time,
+            arrival_time,
+            exclude_flight_id=getattr(instance, "pk", None),
+        )
+        if conflicts:
+            crew_by_id = {member.id: member for member in crew}
+            raise serializers.ValidationError({
+                "crew": [
+                    f"{crew_by_id[conflict.crew_id]} is assigned to flight "
+                    f"{conflict.conflicting_flight_id} "
+                    f"({conflict.kind.replace('_', ' ')})"
+                    for conflict in conflicts
+                ]
+            })
+        return data
+
+    def check_airplane_is_free(self):
+        """Lock the airplane and look for flights overlapping this one"""
+        instance = self.instance
+
+        def value(field):
+            return self.validated_data.get(
+                field, getattr(instance, field, None)
+            )
+
+        airplane = value("airplane")
+        lock_airplane(airplane.id)
+        if overlapping_flights(
+            airplane.id,
+            value("departure_time"),
+            value("arrival_time"),
+            exclude_flight_id=getattr(instance, "pk", None),
+        ).exists():
+            raise serializers.ValidationError(
+                {"airplane": AIRPLANE_OVERLAP_MESSAGE}
+            )
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                if not enforced_by_database():
+                    self.check_airplane_is_free()
+                return super(FlightSerializer, self).save(**kwargs)
+        except IntegrityError as error:
+            if is_airplane_overlap_error(error):
+                raise serializers.ValidationError(
+                    {"airplane": AIRPLANE_OVERLAP_MESSAGE}
+                ) from error
+            raise
 
-class FlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flight
         fields = ("id",
                   "route",
                   "airplane",
+                  "crew",
                   "departure_time",
                   "arrival_time",
                   "duration",
@@ -108,7 +357,9 @@ class FlightSerializer(serializers.ModelSerializer):
 class RouteDetailSerializer(RouteListSerializer):
     flights = FlightSerializer(
         many=True,
-        read_only=True)
+        read_only=True,
+        source="upcoming_flights")
+    flights_next = serializers.URLField(read_only=True, allow_null=True)
 
     class Meta:
         model = Route
@@ -118,6 +369,7 @@ class RouteDetailSerializer(RouteListSerializer):
             "destination",
             "distance",
             "flights",
+            "flights_next",
         )
 
 
@@ -125,7 +377,7 @@ class FlightListSerializer(FlightSerializer):
     route_source = serializers.CharField(
         source="route.source.name",
         read_only=True)
-    route_destination = serializers.ImageField(
+    route_destination = serializers.CharField(
         source="route.destination.name",
         read_only=True)
     airplane_name = serializers.CharField(
@@ -136,6 +388,34 @@ class FlightListSerializer(FlightSerializer):
     )
     tickets_available = serializers.IntegerField(read_only=True)
 
+    expandable_fields = {
+        "route": {
+            "serializer": RouteListSerializer,
+            "select_related": ("route__source", "route__destination"),
+        },
+        "airplane": {
+            "serializer": AirplaneListSerializer,
+            "select_related": ("airplane__airplane_type",),
+        },
+        "crew": {
+            "serializer": CrewSerializer,
+            "many": True,
+            "prefetch_related": ("crew",),
+        },
+    }
+    select_related_fields = {
+        "route_source": ("route__source",),
+        "route_destination": ("route__destination",),
+        "airplane_name": ("airplane",),
+        "airplane_capacity": ("airplane",),
+    }
+    annotated_fields = {
+        "tickets_available": (
+            F("airplane__rows") * F("airplane__seats_in_row")
+            - Count("tickets")
+        ),
+    }
+
     class Meta:
         model = Flight
         fields = (
@@ -147,9 +427,16 @@ class FlightListSerializer(FlightSerializer):
             "crew",
             "duration",
             "tickets_available",
+            "price",
         )
 
 
+class TicketSeatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = ("row", "seat")
+
+
 class FlightDetailSerializer(FlightSerializer):
     route = RouteListSerializer(many=False, read_only=True)
     airplane = AirplaneListSerializer(many=False, read_only=True)
@@ -159,6 +446,18 @@ class FlightDetailSerializer(FlightSerializer):
     airplane_image = serializers.ImageField(
         source="airplane.image", read_only=True
     )
+    taken_places = TicketSeatsSerializer(
+        source="tickets", many=True, read_only=True
+    )
+
+    select_related_fields = {
+        "route": ("route__source", "route__destination"),
+        "airplane": ("airplane__airplane_type",),
+        "airplane_image": ("airplane",),
+    }
+    prefetch_related_fields = {
+        "taken_places": ("tickets",),
+    }
 
     class Meta:
         model = Flight
@@ -170,7 +469,126 @@ class FlightDetailSerializer(FlightSerializer):
             "departure_time",
             "arrival_time",
             "airplane_image",
+            "taken_places",
+            "price",
+        )
+
+
+class WeekdaysField(serializers.ListField):
+    """ISO weekdays (Monday is 1) stored as a ``days_of_week`` bitmask"""
+
+    child = serializers.IntegerField(min_value=1, max_value=7)
+
+    def to_internal_value(self, data):
+        return FlightSchedule.weekdays_mask(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        return [day for day in range(1, 8) if value & (1 << (day - 1))]
+
+
+class FlightScheduleSerializer(serializers.ModelSerializer):
+    days_of_week = WeekdaysField(allow_empty=False)
+
+    def validate_time_zone(self, value):
+        check_time_zone(value)
+        return value
+
+    def validate_duration(self, value):
+        check_duration(value)
+        return value
+
+    def validate(self, attrs):
+        data = super(FlightScheduleSerializer, self).validate(attrs=attrs)
+        valid_from = attrs.get(
+            "valid_from", getattr(self.instance, "valid_from", None)
+        )
+        valid_until = attrs.get(
+            "valid_until", getattr(self.instance, "valid_until", None)
+        )
+        if valid_until < valid_from:
+            raise serializers.ValidationError(
+                {"valid_until": "Validity can't end before it starts."}
+            )
+        return data
+
+    def create(self, validated_data):
+        schedule = super().create(validated_data)
+        materialize_schedules(FlightSchedule.objects.filter(pk=schedule.pk))
+        return schedule
+
+    def update(self, instance, validated_data):
+        today = timezone.now().date()
+        previous_departure = local_departure(instance, today)
+        schedule = super().update(instance, validated_data)
+        update_schedule_flights(
+            schedule,
+            shift=local_departure(schedule, today) - previous_departure,
+            crew_changed="crew" in validated_data,
+        )
+        return schedule
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super(FlightScheduleSerializer, self).save(**kwargs)
+        except ValidationError as error:
+            # Upcoming flights can't follow the edit
+            raise serializers.ValidationError(error.message_dict) from error
+        except IntegrityError as error:
+            if is_airplane_overlap_error(error):
+                raise serializers.ValidationError(
+                    {"airplane": AIRPLANE_OVERLAP_MESSAGE}
+                ) from error
+            raise
+
+    class Meta:
+        model = FlightSchedule
+        fields = (
+            "id",
+            "route",
+            "airplane",
+            "crew",
+            "days_of_week",
+            "departure_time",
+            "time_zone",
+            "duration",
+            "valid_from",
+            "valid_until",
+            "materialized_until",
         )
+        read_only_fields = ("materialized_until",)
+
+
+class CrewFlightSerializer(serializers.ModelSerializer):
+    route_source = serializers.CharField(
+        source="route.source.name", read_only=True
+    )
+    route_destination = serializers.CharField(
+        source="route.destination.name", read_only=True
+    )
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "route_source",
+            "route_destination",
+            "departure_time",
+            "arrival_time",
+        )
+
+
+class TimeWindowSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class CrewConflictSerializer(serializers.Serializer):
+    crew_id = serializers.IntegerField()
+    flight_id = serializers.IntegerField()
+    conflicting_flight_id = serializers.IntegerField()
+    kind = serializers.CharField()
+    gap_hours = serializers.FloatField()
 
 
 class TicketSerializer(serializers.ModelSerializer):
@@ -186,34 +604,192 @@ class TicketSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ticket
-        fields = ("id", "row", "seat", "flight", "order")
+        fields = ("id", "row", "seat", "flight", "order", "price")
+        read_only_fields = ("order", "price")
 
 
 class TicketListSerializer(TicketSerializer):
     flight = FlightListSerializer(many=False, read_only=True)
 
 
-class TicketSeatsSerializer(TicketSerializer):
-    class Meta:
-        model = Ticket
-        fields = ("row", "seat")
-
-
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
 
     class Meta:
         model = Order
         fields = ("id", "tickets", "created_at")
 
+    @staticmethod
+    def _seat_key(ticket_data):
+        return (
+            ticket_data["flight"].id, ticket_data["row"], ticket_data["seat"]
+        )
+
+    def validate_tickets(self, tickets):
+        seats = [self._seat_key(ticket_data) for ticket_data in tickets]
+        repeated = sorted(
+            seat for seat in set(seats) if seats.count(seat) > 1
+        )
+        if repeated:
+            raise serializers.ValidationError([
+                DUPLICATE_SEAT_MESSAGE.format(flight=flight, row=row,
+                                              seat=seat)
+                for flight, row, seat in repeated
+            ])
+        return tickets
+
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        # Inserting in seat order makes concurrent orders lock the unique
+        # index entries in the same order, so they cannot deadlock
+        tickets_data = sorted(validated_data.pop("tickets"),
+                              key=self._seat_key)
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+                for ticket_data in tickets_data:
+                    Ticket.objects.create(order=order, **ticket_data)
+                return order
+        except (IntegrityError, ValidationError) as error:
+            # Another order took a seat after validation
+            taken = self.taken_seats(tickets_data)
+            if not taken:
+                raise
+            raise serializers.ValidationError({"tickets": [
+                SEAT_TAKEN_MESSAGE.format(flight=flight, row=row, seat=seat)
+                for flight, row, seat in taken
+            ]}) from error
+
+    def taken_seats(self, tickets_data) -> list[tuple[int, int, int]]:
+        seats = {self._seat_key(ticket_data) for ticket_data in tickets_data}
+        query = Q()
+        for flight, row, seat in seats:
+            query |= Q(flight_id=flight, row=row, seat=seat)
+        return sorted(
+            Ticket.objects.filter(query)
+            .values_list("flight_id", "row", "seat")
+        )
 
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+    prefetch_related_fields = {
+        "tickets": (
+            "tickets__flight__route__source",
+            "tickets__flight__route__destination",
+            "tickets__flight__airplane",
+            "tickets__flight__crew",
+        ),
+    }
+
+
+class RouteTripsSerializer(serializers.Serializer):
+    route = serializers.IntegerField()
+    source = serializers.CharField()
+    destination = serializers.CharField()
+    distance = serializers.IntegerField()
+    trips = serializers.IntegerField()
+
+
+class OrderSummarySerializer(serializers.Serializer):
+    orders = serializers.IntegerField()
+    tickets = serializers.IntegerField()
+    upcoming_trips = serializers.IntegerField()
+    past_trips = serializers.IntegerField()
+    distance_flown = serializers.IntegerField()
+    total_spent = serializers.DecimalField(max_digits=12, decimal_places=2)
+    top_routes = RouteTripsSerializer(many=True)
+
+
+class OrderCancelSerializer(serializers.Serializer):
+    tickets = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        help_text="Tickets of the order to cancel, all when omitted",
+    )
+
+
+class CancellationSerializer(serializers.Serializer):
+    tickets = serializers.IntegerField()
+    orders = serializers.IntegerField()
+    flights = serializers.IntegerField()
+    refund = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    key = serializers.CharField(required=False)
+    method = serializers.ChoiceField(
+        choices=("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"),
+        default="GET",
+    )
+    url = serializers.CharField()
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False
+    )
+    body = serializers.JSONField(required=False)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"A batch can contain at most "
+                f"{settings.BATCH_MAX_REQUESTS} requests."
+            )
+        return value
+
+
+class BatchSubResponseSerializer(serializers.Serializer):
+    key = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    responses = BatchSubResponseSerializer(many=True)
+
+
+class AutocompleteResultSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(
+        choices=("airport", "city", "country", "airplane")
+    )
+    pk = serializers.IntegerField()
+    label = serializers.CharField()
+    detail = serializers.CharField()
+
+
+class StreamTicketSerializer(serializers.Serializer):
+    ticket = serializers.CharField()
+    expires_in = serializers.IntegerField()
+
+
+class ProfileSerializer(serializers.Serializer):
+    entry_id = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    method = serializers.CharField()
+    path = serializers.CharField()
+    view = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField()
+    duration_ms = serializers.FloatField()
+    sql = serializers.JSONField()
+    top_functions = serializers.ListField(child=serializers.JSONField())
+
+
+class SlowQuerySerializer(serializers.Serializer):
+    entry_id = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    fingerprint = serializers.CharField()
+    sql = serializers.CharField()
+    params = serializers.ListField(
+        child=serializers.CharField(), allow_null=True
+    )
+    many = serializers.BooleanField()
+    duration_ms = serializers.FloatField()
+    database = serializers.CharField()
+    view = serializers.CharField(allow_null=True)
+    path = serializers.CharField()
+    plan = serializers.CharField(allow_null=True)
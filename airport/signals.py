@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed,
+                                      post_delete,
+                                      post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from airport.availability import publish
+from airport.conditional import mark_changed
+from airport.metrics import ORDERS_CREATED, TICKETS_CREATED
+from airport.models import (Country,
+                            City,
+                            Airport,
+                            AirplaneType,
+                            Airplane,
+                            Route,
+                            Flight,
+                            FlightSchedule,
+                            Order,
+                            Ticket,
+                            Crew)
+from airport.pricing import current_fare
+
+VERSIONED_MODELS = (
+    Crew,
+    Country,
+    City,
+    Airport,
+    AirplaneType,
+    Airplane,
+    Route,
+    Flight,
+    FlightSchedule,
+    Order,
+    Ticket,
+)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_table_version(sender, using, **kwargs):
+    if sender in VERSIONED_MODELS:
+        mark_changed(sender, using=using)
+
+
+@receiver(m2m_changed, sender=Flight.crew.through)
+def bump_flight_crew_version(sender, action, using, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        mark_changed(Flight, using=using)
+
+
+@receiver(m2m_changed, sender=FlightSchedule.crew.through)
+def bump_flight_schedule_crew_version(sender, action, using, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        mark_changed(FlightSchedule, using=using)
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def publish_seat_availability(sender, instance, using, **kwargs):
+    publish([instance.flight_id], using=using)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Ticket)
+def count_created_bookings(sender, created, using, **kwargs):
+    if created:
+        counter = ORDERS_CREATED if sender is Order else TICKETS_CREATED
+        transaction.on_commit(counter.inc, using=using)
+
+
+@receiver(pre_save, sender=Ticket)
+def price_ticket_of_unpriced_flight(sender, instance, **kwargs):
+    # Flights saved by the admin or in bulk have no fare until repriced
+    if instance._state.adding and instance.price is None:
+        instance.price = current_fare(instance.flight_id)
@@ -0,0 +1,186 @@
+"""Slow query capture.
+
+``SlowQueryMiddleware`` wraps the queries of every request and records
+the ones slower than ``SLOW_QUERY_THRESHOLD_MS`` in a bounded on-disk
+ring buffer: normalized SQL, duration and originating view. Parameters
+can hold emails, password hashes or tokens, so they are only stored with
+``SLOW_QUERY_CAPTURE_PARAMS`` on; otherwise the string literals of the
+plans are masked too.
+
+On PostgreSQL a background thread then attaches an ``EXPLAIN (ANALYZE,
+BUFFERS)`` plan. ANALYZE executes the statement again, so only SELECTs
+are explained, inside a read-only transaction with a statement timeout,
+and each normalized statement at most once per
+``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds.
+"""
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection, connections, transaction
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from airport.ring_buffer import DiskRingBuffer
+from airport.serializers import SlowQuerySerializer
+
+MAX_PARAMS = 50
+MAX_PARAM_LENGTH = 200
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, *(?:%s|\?))*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_explain_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="explain"
+)
+_pending = set()
+_explained_at = {}
+_explained_lock = threading.Lock()
+
+
+def get_slow_query_buffer() -> DiskRingBuffer:
+    return DiskRingBuffer(
+        settings.SLOW_QUERY_DIR, settings.SLOW_QUERY_MAX_ENTRIES
+    )
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals and IN lists so equivalent statements compare equal"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _explainable(sql, many, using) -> bool:
+    return (
+        settings.SLOW_QUERY_EXPLAIN
+        and not many
+        and connections[using].vendor == "postgresql"
+        and sql.lstrip().upper().startswith("SELECT")
+    )
+
+
+def _claim_explain(fingerprint) -> bool:
+    """Allow one EXPLAIN per statement and interval across threads"""
+    now = time.monotonic()
+    interval = settings.SLOW_QUERY_EXPLAIN_INTERVAL
+    with _explained_lock:
+        for expired in [
+            key for key, last in _explained_at.items()
+            if now - last >= interval
+        ]:
+            del _explained_at[expired]
+
+        if fingerprint in _explained_at:
+            return False
+        _explained_at[fingerprint] = now
+        return True
+
+
+def explain(sql, params, using) -> str:
+    """Run EXPLAIN (ANALYZE, BUFFERS) on a SELECT without side effects"""
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                [str(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)],
+            )
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def _explain_entry(entry_id, sql, params, using):
+    try:
+        plan = explain(sql, params, using)
+    except DatabaseError as error:
+        plan = f"EXPLAIN failed: {error}"
+    finally:
+        connections[using].close()
+
+    if not settings.SLOW_QUERY_CAPTURE_PARAMS:
+        plan = _STRING.sub("?", plan)
+
+    get_slow_query_buffer().update(entry_id, {"plan": plan})
+
+
+def wait_for_explains(timeout=None):
+    """Block until the scheduled EXPLAIN plans are stored"""
+    wait(list(_pending), timeout=timeout)
+
+
+class SlowQueryRecorder:
+    """Execute wrapper storing the request's queries over the threshold"""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.record(sql, params, many, context, duration_ms)
+
+    def record(self, sql, params, many, context, duration_ms):
+        using = context["connection"].alias
+        normalized = normalize_sql(sql)
+        fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+        resolver_match = getattr(self.request, "resolver_match", None)
+        entry_id = get_slow_query_buffer().append({
+            "created_at": timezone.now().isoformat(),
+            "fingerprint": fingerprint,
+            "sql": normalized,
+            "params": [
+                repr(param)[:MAX_PARAM_LENGTH]
+                for param in list(params or ())[:MAX_PARAMS]
+            ] if settings.SLOW_QUERY_CAPTURE_PARAMS else None,
+            "many": many,
+            "duration_ms": duration_ms,
+            "database": using,
+            "view": resolver_match.view_name if resolver_match else None,
+            "path": self.request.path,
+            "plan": None,
+        })
+
+        if _explainable(sql, many, using) and _claim_explain(fingerprint):
+            future = _explain_executor.submit(
+                _explain_entry, entry_id, sql, params, using
+            )
+            _pending.add(future)
+            future.add_done_callback(_pending.discard)
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(SlowQueryRecorder(request)):
+            return self.get_response(request)
+
+
+class SlowQueryListView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=SlowQuerySerializer(many=True))
+    def get(self, request):
+        """Endpoint listing captured slow queries, newest first"""
+        serializer = SlowQuerySerializer(get_slow_query_buffer().entries(),
+                                         many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from airport.models import Flight, Order
+from airport.pagination import EstimatedCountPaginator
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+
+class AdminQueriesTests(TestCase):
+    """Admin pages run the same number of queries for 1 or many rows"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@admin.com", "testpass"
+        )
+        self.client.force_login(self.admin)
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+
+    def flights(self, count):
+        return [
+            sample_flight(
+                airplane=sample_airplane(),
+                departure_time=f"2030-06-{day:02d}T08:00:00Z",
+                arrival_time=f"2030-06-{day:02d}T10:00:00Z",
+            )
+            for day in range(1, count + 1)
+        ]
+
+    def assert_constant_queries(self, url, add_rows):
+        add_rows(1)
+        # Warm up the caches of content types and sessions
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+
+        add_rows(10)
+        with self.assertNumQueries(len(queries)):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+
+    def test_flight_changelist(self):
+        self.assert_constant_queries(
+            reverse("admin:airport_flight_changelist"), self.flights
+        )
+
+    def test_order_changelist(self):
+        flight = sample_flight()
+
+        def add_orders(count):
+            for _ in range(count):
+                sample_order(self.user, flight)
+                flight.tickets.all().delete()
+
+        self.assert_constant_queries(
+            reverse("admin:airport_order_changelist"), add_orders
+        )
+
+    def test_ticket_changelist(self):
+        def add_tickets(count):
+            for flight in self.flights(count):
+                sample_order(self.user, flight)
+
+        self.assert_constant_queries(
+            reverse("admin:airport_ticket_changelist"), add_tickets
+        )
+
+    def test_order_changeform_with_tickets(self):
+        order = Order.objects.create(user=self.user)
+
+        def add_tickets(count):
+            for flight in self.flights(count):
+                sample_order(self.user, flight).tickets.update(order=order)
+
+        self.assert_constant_queries(
+            reverse("admin:airport_order_change", args=[order.id]),
+            add_tickets,
+        )
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=100)
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        sample_flight()
+
+    @mock.patch("airport.pagination.estimate_count", return_value=5000)
+    def test_estimate_above_threshold(self, _):
+        paginator = EstimatedCountPaginator(
+            Flight.objects.order_by("pk"), 10
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 5000)
+        self.assertTrue(paginator.is_estimate)
+
+    @mock.patch("airport.pagination.estimate_count", return_value=50)
+    def test_exact_count_below_threshold(self, _):
+        paginator = EstimatedCountPaginator(
+            Flight.objects.order_by("pk"), 10
+        )
+
+        self.assertEqual(paginator.count, 1)
+        self.assertFalse(paginator.is_estimate)
+
+    def test_exact_count_without_estimate(self):
+        paginator = EstimatedCountPaginator([1, 2, 3], 10)
+
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.is_estimate)
@@ -0,0 +1,214 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.availability import SeatAvailabilityHub
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+STREAM_URL = reverse("airport:flight-availability-stream")
+TICKET_URL = reverse("airport:flight-availability-ticket")
+ORDER_URL = reverse("airport:order-list")
+
+
+def order_cancel_url(order_id):
+    return reverse("airport:order-cancel", args=[order_id])
+
+
+def parse_event(chunk):
+    lines = chunk.decode().strip().splitlines()
+    assert lines[0] == "event: availability", lines
+    return json.loads(lines[1].removeprefix("data: "))
+
+
+@override_settings(
+    SEAT_AVAILABILITY_BACKEND="airport.availability.LocalBackend",
+    SEAT_AVAILABILITY_INTERVAL=0.05,
+)
+class SeatAvailabilityStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+        self.authorization = f"Bearer {AccessToken.for_user(self.user)}"
+        # 50 seats
+        self.flight = sample_flight()
+
+    def ticket(self):
+        res = self.api_client.post(TICKET_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data["ticket"]
+
+    async def open_stream(self, flights=None, **params):
+        if "ticket" not in params:
+            params["ticket"] = await sync_to_async(self.ticket)()
+        return await self.async_client.get(
+            STREAM_URL, {"flights": flights or self.flight.id, **params}
+        )
+
+    def book(self, *seats):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "flight": self.flight.id}
+                for seat in seats
+            ]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.api_client.post(ORDER_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def cancel(self, order_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.api_client.post(order_cancel_url(order_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    async def test_stream_pushes_availability(self):
+        res = await self.open_stream()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        events = aiter(res.streaming_content)
+
+        self.assertTrue((await anext(events)).startswith(b"retry:"))
+        snapshot = parse_event(await anext(events))
+        order_id = await sync_to_async(self.book)(1, 2, 3)
+        booked = parse_event(await asyncio.wait_for(anext(events), 5))
+        await sync_to_async(self.cancel)(order_id)
+        cancelled = parse_event(await asyncio.wait_for(anext(events), 5))
+        await events.aclose()
+
+        self.assertEqual(snapshot["flight"], self.flight.id)
+        self.assertEqual(snapshot["tickets_available"], 50)
+        self.assertEqual(booked["tickets_available"], 47)
+        self.assertEqual(booked["capacity"], 50)
+        self.assertEqual(cancelled["tickets_available"], 50)
+
+    def test_ticket_writes_are_published_once_per_transaction(self):
+        with mock.patch(
+            "airport.availability.LocalBackend.publish"
+        ) as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                order = sample_order(
+                    self.user, self.flight, seats=((1, 1), (1, 2))
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                order.delete()
+
+        self.assertEqual(
+            publish.call_args_list,
+            [mock.call({self.flight.id}), mock.call({self.flight.id})],
+        )
+
+    async def test_burst_sends_one_update_per_flight(self):
+        other = await sync_to_async(sample_flight)(
+            departure_time="2030-07-01T08:00:00Z",
+            arrival_time="2030-07-01T10:00:00Z",
+        )
+        hub = SeatAvailabilityHub()
+        with self.settings(SEAT_AVAILABILITY_INTERVAL=60):
+            subscription = hub.subscribe({self.flight.id})
+        for _ in range(3):
+            hub.mark_changed({self.flight.id, other.id})
+
+        await hub.flush()
+        updates = await subscription.updates(timeout=0.1)
+        await hub.flush()
+        hub.unsubscribe(subscription)
+        hub._flusher.cancel()
+
+        self.assertEqual([update["id"] for update in updates],
+                         [self.flight.id])
+        self.assertEqual(await subscription.updates(timeout=0.1), [])
+
+    async def test_stream_requires_credentials(self):
+        res = await self.async_client.get(
+            STREAM_URL, {"flights": str(self.flight.id)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_stream_with_authorization_header(self):
+        res = await self.async_client.get(
+            STREAM_URL,
+            {"flights": str(self.flight.id)},
+            headers={"Authorization": self.authorization},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    async def test_ticket_is_single_use(self):
+        ticket = await sync_to_async(self.ticket)()
+
+        first = await self.open_stream(ticket=ticket)
+        second = await self.open_stream(ticket=ticket)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_access_token_is_not_a_ticket(self):
+        res = await self.open_stream(
+            ticket=self.authorization.removeprefix("Bearer ")
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        SEAT_AVAILABILITY_MAX_STREAMS=1,
+        SEAT_AVAILABILITY_STREAM_TIMEOUT=0.2,
+        SEAT_AVAILABILITY_HEARTBEAT=0.1,
+    )
+    async def test_open_streams_per_user_limited(self):
+        first = await self.open_stream()
+        second = await self.open_stream()
+        async for _ in first.streaming_content:
+            pass
+        third = await self.open_stream()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+
+    async def test_stream_rejects_invalid_flights(self):
+        for flights in ("", "a,b", ",".join(map(str, range(1, 100)))):
+            res = await self.async_client.get(
+                STREAM_URL,
+                {"flights": flights},
+                headers={"Authorization": self.authorization},
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_stream_of_missing_flights(self):
+        res = await self.async_client.get(
+            STREAM_URL,
+            {"flights": "0"},
+            headers={"Authorization": self.authorization},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stream_needs_asgi(self):
+        res = self.client.get(
+            STREAM_URL,
+            {"flights": str(self.flight.id)},
+            headers={"Authorization": self.authorization},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_ticket_requires_authentication(self):
+        res = APIClient().post(TICKET_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,259 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.throttling import UserRateThrottle
+
+from airport.models import Country
+from airport.tests.order_api_tests import sample_flight
+from airport.views import CountryViewSet
+
+BATCH_URL = reverse("batch")
+
+
+class UnauthenticatedBatchApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.post(
+            BATCH_URL,
+            {"requests": [{"url": "/api/airport/countries/"}]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BatchApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        Country.objects.create(name="Ukraine")
+
+    def test_batch_returns_every_response_in_order(self):
+        res = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {"key": "countries", "url": "/api/airport/countries/"},
+                    {"key": "cities", "url": "/api/airport/cities/?page=1"},
+                    {"key": "me", "url": "/api/user/me/"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data["responses"]
+        self.assertEqual(
+            [response["key"] for response in responses],
+            ["countries", "cities", "me"],
+        )
+        self.assertEqual(responses[0]["status"], status.HTTP_200_OK)
+        self.assertEqual(responses[0]["body"]["count"], 1)
+        self.assertEqual(responses[1]["body"]["count"], 0)
+        self.assertEqual(responses[2]["body"]["email"], self.user.email)
+
+    def test_reads_after_write_see_its_effects(self):
+        res = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {
+                        "method": "POST",
+                        "url": "/api/airport/countries/",
+                        "body": {"name": "Poland"},
+                    },
+                    {"url": "/api/airport/countries/"},
+                ]
+            },
+            format="json",
+        )
+
+        responses = res.data["responses"]
+        self.assertEqual(responses[0]["status"], status.HTTP_201_CREATED)
+        self.assertEqual(responses[1]["body"]["count"], 2)
+
+    def test_sub_request_errors_are_reported_per_request(self):
+        res = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {"url": "/admin/"},
+                    {"url": "/api/airport/unknown/"},
+                    {"method": "POST", "url": "/api/airport/countries/",
+                     "body": {}},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [
+                status.HTTP_400_BAD_REQUEST,
+                status.HTTP_404_NOT_FOUND,
+                status.HTTP_400_BAD_REQUEST,
+            ],
+        )
+
+    def test_sub_requests_are_throttled(self):
+        with mock.patch.dict(UserRateThrottle.THROTTLE_RATES, user="3/min"):
+            res = self.client.post(
+                BATCH_URL,
+                {"requests": [{"url": "/api/airport/countries/"}] * 3},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [
+                status.HTTP_200_OK,
+                status.HTTP_200_OK,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ],
+        )
+
+    def test_sub_request_exception_reported_as_500(self):
+        with (
+            mock.patch.object(
+                CountryViewSet, "list", side_effect=RuntimeError("boom")
+            ),
+            self.assertLogs("airport.batch", "ERROR"),
+        ):
+            res = self.client.post(
+                BATCH_URL,
+                {
+                    "requests": [
+                        {"url": "/api/airport/countries/"},
+                        {"url": "/api/user/me/"},
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [status.HTTP_500_INTERNAL_SERVER_ERROR, status.HTTP_200_OK],
+        )
+
+    def test_streaming_sub_request_reported_per_request(self):
+        flight = sample_flight()
+
+        res = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {"url": "/api/airport/flights/"},
+                    {"url": f"/api/airport/flights/{flight.id}/manifest/"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        flights, manifest = res.data["responses"]
+        self.assertEqual(flights["status"], status.HTTP_200_OK)
+        self.assertEqual(manifest["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            manifest["body"],
+            {"detail": "Streaming responses can't be batched."},
+        )
+
+    def test_empty_json_body_kept(self):
+        res = self.client.post(
+            BATCH_URL,
+            {"requests": [{"url": "/api/airport/flights/"}]},
+            format="json",
+        )
+
+        self.assertEqual(res.data["responses"][0]["body"], [])
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_limited(self):
+        res = self.client.post(
+            BATCH_URL,
+            {"requests": [{"url": "/api/airport/countries/"}] * 3},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(BATCH_MAX_WORKERS=4)
+class ConcurrentBatchApiTests(TransactionTestCase):
+    """Read-only groups run in worker threads outside of a transaction"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        Country.objects.create(name="Ukraine")
+
+    def test_read_only_sub_requests_run_concurrently(self):
+        with mock.patch(
+            "airport.batch.ThreadPoolExecutor",
+            wraps=ThreadPoolExecutor,
+        ) as executor:
+            res = self.client.post(
+                BATCH_URL,
+                {
+                    "requests": [
+                        {"key": "countries", "url": "/api/airport/countries/"},
+                        {"key": "cities", "url": "/api/airport/cities/"},
+                        {"key": "me", "url": "/api/user/me/"},
+                    ]
+                },
+                format="json",
+            )
+
+        executor.assert_called_once_with(max_workers=3)
+        responses = res.data["responses"]
+        self.assertEqual(
+            [response["key"] for response in responses],
+            ["countries", "cities", "me"],
+        )
+        self.assertEqual(
+            [response["status"] for response in responses],
+            [status.HTTP_200_OK] * 3,
+        )
+        self.assertEqual(responses[0]["body"]["count"], 1)
+        self.assertEqual(responses[2]["body"]["email"], self.user.email)
+
+    def test_failing_sub_request_in_thread_reported_as_500(self):
+        with (
+            mock.patch.object(
+                CountryViewSet, "list", side_effect=RuntimeError("boom")
+            ),
+            self.assertLogs("airport.batch", "ERROR"),
+        ):
+            res = self.client.post(
+                BATCH_URL,
+                {
+                    "requests": [
+                        {"url": "/api/airport/countries/"},
+                        {"url": "/api/user/me/"},
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [status.HTTP_500_INTERNAL_SERVER_ERROR, status.HTTP_200_OK],
+        )
@@ -0,0 +1,159 @@
+import io
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport import boarding_passes
+from airport.boarding_passes import (discard_passes,
+                                     pass_data,
+                                     pass_path,
+                                     wait_for_passes)
+from airport.models import Ticket
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+ORDER_URL = reverse("airport:order-list")
+
+
+def pass_url(order_id, ticket_id):
+    return reverse(
+        "airport:order-boarding-pass",
+        kwargs={"pk": order_id, "ticket_id": ticket_id},
+    )
+
+
+class BoardingPassApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_passes_rendered_after_order_commits(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": self.flight.id},
+                {"row": 1, "seat": 2, "flight": self.flight.id},
+            ]
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_URL, payload, format="json")
+        wait_for_passes(timeout=60)
+
+        for ticket in Ticket.objects.filter(order_id=res.data["id"]):
+            self.assertTrue(pass_path(pass_data(ticket)).is_file())
+
+    def test_order_created_when_pass_rendering_fails(self):
+        payload = {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.id}]}
+
+        with (
+            mock.patch(
+                "airport.views.render_order_passes",
+                side_effect=BrokenProcessPool,
+            ),
+            self.assertLogs("django", "ERROR"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_failed_render_answers_503(self):
+        order = sample_order(self.user, self.flight, seats=((3, 4),))
+        ticket = order.tickets.get()
+        failed = Future()
+        failed.set_exception(BrokenProcessPool())
+
+        with (
+            mock.patch("airport.views.render", return_value=failed),
+            mock.patch("airport.views.discard_render") as discard_render,
+            self.assertLogs("airport.views", "ERROR"),
+        ):
+            res = self.client.get(pass_url(order.id, ticket.id))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("Retry-After", res)
+        discard_render.assert_called_once_with(
+            pass_data(ticket), failed
+        )
+
+    def test_broken_pool_replaced(self):
+        order = sample_order(self.user, self.flight, seats=((3, 5),))
+        data = pass_data(order.tickets.get())
+        broken = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool))
+
+        with mock.patch.object(boarding_passes, "_executor", broken):
+            boarding_passes.render(data).result(timeout=60)
+            replacement = boarding_passes._executor
+
+        self.assertIsNot(replacement, broken)
+        broken.shutdown.assert_called_once()
+        self.assertTrue(pass_path(data).is_file())
+
+    def test_download_pass(self):
+        order = sample_order(self.user, self.flight, seats=((3, 4),))
+        ticket = order.tickets.get()
+
+        res = self.client.get(pass_url(order.id, ticket.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "image/png")
+        image = Image.open(io.BytesIO(b"".join(res.streaming_content)))
+        self.assertEqual(image.format, "PNG")
+
+        cached = self.client.get(
+            pass_url(order.id, ticket.id), HTTP_IF_NONE_MATCH=res["ETag"]
+        )
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_pass_redrawn_when_flight_changes(self):
+        order = sample_order(self.user, self.flight)
+        ticket = order.tickets.get()
+        etag = self.client.get(pass_url(order.id, ticket.id))["ETag"]
+
+        self.flight.departure_time = "2030-06-01T09:00:00Z"
+        self.flight.arrival_time = "2030-06-01T11:00:00Z"
+        self.flight.save()
+        res = self.client.get(
+            pass_url(order.id, ticket.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_pass_of_other_users_order_not_found(self):
+        other = get_user_model().objects.create_user(
+            "other@test.com", "testpass"
+        )
+        order = sample_order(other, self.flight)
+
+        res = self.client.get(pass_url(order.id, order.tickets.get().id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_discard_passes_of_tickets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            names = ("1-a.png", "1-b.png", "11-c.png", "2-d.png")
+            for name in names:
+                open(f"{directory}/{name}", "wb").close()
+
+            with override_settings(BOARDING_PASS_DIR=directory):
+                discard_passes([1, 2])
+
+            self.assertEqual(
+                sorted(path.name for path in Path(directory).iterdir()),
+                ["11-c.png"],
+            )
@@ -0,0 +1,264 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.cancellation import cancel_tickets
+from airport.models import (CancelledDeparture,
+                            Flight,
+                            FlightSchedule,
+                            Order,
+                            Ticket)
+from airport.pricing import reprice_flights
+from airport.schedules import materialize_schedules
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import (sample_flight,
+                                           sample_order,
+                                           sample_route)
+
+ORDER_URL = reverse("airport:order-list")
+
+
+def order_cancel_url(order_id):
+    return reverse("airport:order-cancel", args=[order_id])
+
+
+def flight_cancel_url(flight_id):
+    return reverse("airport:flight-cancel", args=[flight_id])
+
+
+class OrderCancelApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight(price=Decimal("100.00"))
+        self.order = sample_order(
+            self.user, self.flight, seats=((1, 1), (1, 2))
+        )
+
+    def test_cancel_ticket(self):
+        ticket = self.order.tickets.get(seat=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                order_cancel_url(self.order.id),
+                {"tickets": [ticket.id]},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {"tickets": 1, "orders": 0, "flights": 0, "refund": "100.00"},
+        )
+        self.assertEqual(list(self.order.tickets.all()), [
+            self.order.tickets.get(seat=2)
+        ])
+
+        rebooked = self.client.post(
+            ORDER_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.id}]},
+            format="json",
+        )
+        self.assertEqual(rebooked.status_code, status.HTTP_201_CREATED)
+
+    def test_cancel_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(order_cancel_url(self.order.id))
+
+        self.assertEqual(res.data["tickets"], 2)
+        self.assertEqual(res.data["orders"], 1)
+        self.assertEqual(res.data["refund"], "200.00")
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancel_frees_seats_for_pricing(self):
+        reprice_flights()
+        seats = [(row, seat) for row in (2, 3) for seat in range(1, 6)]
+        sample_order(self.user, self.flight, seats=seats[:8])
+        reprice_flights()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(order_cancel_url(self.order.id))
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.price, Decimal("116.00"))
+
+    def test_cancel_order_when_follow_ups_fail(self):
+        with (
+            mock.patch(
+                "airport.cancellation.reprice_flights",
+                side_effect=RuntimeError,
+            ),
+            mock.patch(
+                "airport.cancellation.discard_passes",
+                side_effect=RuntimeError,
+            ),
+            self.assertLogs("django", "ERROR"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            res = self.client.post(order_cancel_url(self.order.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancel_ticket_of_other_order(self):
+        other = sample_order(self.user, self.flight, seats=((3, 3),))
+
+        res = self.client.post(
+            order_cancel_url(self.order.id),
+            {"tickets": [other.tickets.get().id]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_cancel_order_of_other_user(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("other@test.com", "pass")
+        )
+
+        res = self.client.post(order_cancel_url(self.order.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_departed_flight_ticket(self):
+        departed = sample_flight(
+            route=self.flight.route,
+            airplane=sample_airplane(),
+            departure_time="2020-01-01T08:00:00Z",
+            arrival_time="2020-01-01T10:00:00Z",
+        )
+        order = sample_order(self.user, departed)
+
+        res = self.client.post(order_cancel_url(order.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(order.tickets.exists())
+
+    def test_tickets_checked_when_cancelled(self):
+        ticket = self.order.tickets.get(seat=1)
+        other = sample_order(self.user, self.flight, seats=((3, 3),))
+
+        with self.assertRaises(ValidationError):
+            cancel_tickets(
+                self.order.tickets.all(),
+                [ticket.id, other.tickets.get().id],
+            )
+        Flight.objects.filter(pk=self.flight.pk).update(
+            departure_time=timezone.now() - timedelta(hours=1)
+        )
+        with self.assertRaises(ValidationError):
+            cancel_tickets(self.order.tickets.all(), [ticket.id])
+
+        self.assertEqual(Ticket.objects.count(), 3)
+
+
+class FlightCancelApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.users = [
+            get_user_model().objects.create_user(f"user{i}@test.com", "pass")
+            for i in range(5)
+        ]
+
+    def book_flight(self, departure_time, rows):
+        flight = sample_flight(
+            airplane=sample_airplane(rows=rows),
+            departure_time=departure_time,
+            arrival_time=departure_time,
+        )
+        for row in range(1, rows + 1):
+            sample_order(
+                self.users[row % len(self.users)],
+                flight,
+                seats=[(row, seat) for seat in range(1, 6)],
+            )
+        return flight
+
+    def test_cancel_flight(self):
+        flight = self.book_flight("2030-06-01T08:00:00Z", rows=4)
+        other = self.book_flight("2030-06-02T08:00:00Z", rows=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(flight_cancel_url(flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tickets"], 20)
+        self.assertEqual(res.data["orders"], 4)
+        self.assertEqual(res.data["flights"], 1)
+        self.assertEqual(list(Flight.objects.all()), [other])
+        self.assertEqual(Ticket.objects.count(), 5)
+
+    def test_cancel_flight_queries_do_not_grow_with_passengers(self):
+        small = self.book_flight("2030-06-01T08:00:00Z", rows=1)
+        large = self.book_flight("2030-06-02T08:00:00Z", rows=40)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(flight_cancel_url(small.id))
+        with CaptureQueriesContext(connection) as large_queries:
+            res = self.client.post(flight_cancel_url(large.id))
+
+        self.assertEqual(res.data["tickets"], 200)
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_cancel_flight_admin_only(self):
+        flight = self.book_flight("2030-06-01T08:00:00Z", rows=1)
+        self.client.force_authenticate(self.users[0])
+
+        res = self.client.post(flight_cancel_url(flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Flight.objects.filter(pk=flight.pk).exists())
+
+    def test_cancelled_scheduled_flight_stays_cancelled(self):
+        schedule = FlightSchedule.objects.create(
+            route=sample_route(),
+            airplane=sample_airplane(),
+            days_of_week=FlightSchedule.weekdays_mask(range(1, 8)),
+            departure_time=time(8),
+            duration=timedelta(hours=2),
+            valid_from=timezone.now().date() + timedelta(days=1),
+            valid_until=timezone.now().date() + timedelta(days=7),
+        )
+        materialize_schedules()
+        flight = Flight.objects.filter(schedule=schedule).first()
+        sample_order(self.users[0], flight)
+
+        res = self.client.post(flight_cancel_url(flight.id))
+        edited = self.client.patch(
+            reverse("airport:flightschedule-detail", args=[schedule.id]),
+            {"duration": "03:00:00"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(edited.status_code, status.HTTP_200_OK)
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 6)
+        self.assertFalse(
+            Flight.objects.filter(departure_time=flight.departure_time)
+            .exists()
+        )
+        self.assertEqual(
+            CancelledDeparture.objects.get(schedule=schedule).day,
+            flight.departure_time.date(),
+        )
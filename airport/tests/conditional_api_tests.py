@@ -0,0 +1,153 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Country, Ticket, TableVersion
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+COUNTRY_URL = reverse("airport:country-list")
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+def seconds_later(seconds=2):
+    """Move the clock of the conditional checks forward"""
+    return mock.patch(
+        "airport.conditional.time",
+        mock.Mock(time=lambda: time.time() + seconds),
+    )
+
+
+class ConditionalGetApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight = sample_flight()
+
+    def test_matching_etag_returns_not_modified_without_queryset(self):
+        etag = self.client.get(FLIGHT_URL)["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_etag_depends_on_query_string(self):
+        etag = self.client.get(FLIGHT_URL)["ETag"]
+
+        res = self.client.get(
+            FLIGHT_URL, {"fields": "id"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_committed_write_changes_etag(self):
+        etag = self.client.get(FLIGHT_URL)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_order(self.user, self.flight)
+
+        with seconds_later():
+            res = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertIn("Last-Modified", res)
+
+    def test_unrelated_write_keeps_etag(self):
+        etag = self.client.get(COUNTRY_URL)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_order(self.user, self.flight)
+
+        res = self.client.get(COUNTRY_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_in_one_transaction_bump_once(self):
+        version = TableVersion.objects.get(label="airport.ticket").version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_order(self.user, self.flight, seats=((1, 1), (1, 2)))
+
+        self.assertEqual(
+            TableVersion.objects.get(label="airport.ticket").version,
+            version + 1,
+        )
+
+    def test_failed_version_bump_is_logged(self):
+        with (
+            mock.patch(
+                "airport.conditional.bump_versions", side_effect=RuntimeError
+            ),
+            self.assertLogs("django", "ERROR"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            sample_order(self.user, self.flight)
+
+        self.assertTrue(Ticket.objects.exists())
+
+    def test_order_etag_is_per_user(self):
+        etag = self.client.get(ORDER_URL)["ETag"]
+        other = get_user_model().objects.create_user(
+            "other@test.com", "testpass"
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_order_response_varies_on_authorization(self):
+        res = self.client.get(ORDER_URL)
+
+        self.assertIn("Authorization", res["Vary"])
+        self.assertNotIn("Authorization", self.client.get(COUNTRY_URL)["Vary"])
+
+    def test_if_modified_since(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Country.objects.create(name="Ukraine")
+        with seconds_later():
+            last_modified = self.client.get(COUNTRY_URL)["Last-Modified"]
+
+            res = self.client.get(
+                COUNTRY_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_no_last_modified_in_second_of_latest_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Country.objects.create(name="Ukraine")
+
+        res = self.client.get(COUNTRY_URL)
+
+        self.assertIn("ETag", res)
+        self.assertNotIn("Last-Modified", res)
+
+    def test_if_none_match_takes_precedence_over_if_modified_since(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Country.objects.create(name="Ukraine")
+        with seconds_later():
+            last_modified = self.client.get(COUNTRY_URL)["Last-Modified"]
+
+            res = self.client.get(
+                COUNTRY_URL,
+                HTTP_IF_NONE_MATCH='"stale"',
+                HTTP_IF_MODIFIED_SINCE=last_modified,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Crew
+from airport.roster import CrewConflict, season_conflicts
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import sample_flight, sample_route
+
+FLIGHT_URL = reverse("airport:flight-list")
+CREW_CONFLICTS_URL = reverse("airport:crew-conflicts")
+
+
+def schedule_url(crew_id):
+    return reverse("airport:crew-schedule", args=[crew_id])
+
+
+@override_settings(CREW_MIN_REST=timedelta(hours=10))
+class CrewRosterApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.crew = Crew.objects.create(first_name="Ann", last_name="Lee")
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.other_airplane = sample_airplane(name="Other airplane")
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.flight = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start,
+            arrival_time=self.start + timedelta(hours=2),
+        )
+        self.flight.crew.add(self.crew)
+
+    def flight_payload(self, departure_time, duration_hours=2):
+        return {
+            "route": self.route.id,
+            "airplane": self.other_airplane.id,
+            "crew": [self.crew.id],
+            "departure_time": departure_time,
+            "arrival_time": departure_time + timedelta(hours=duration_hours),
+        }
+
+    def test_overlapping_crew_assignment_rejected(self):
+        payload = self.flight_payload(self.start + timedelta(hours=1))
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("overlap", res.data["crew"][0])
+
+    def test_insufficient_rest_rejected(self):
+        payload = self.flight_payload(self.start + timedelta(hours=5))
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("insufficient rest", res.data["crew"][0])
+
+    def test_rested_crew_assignment_allowed(self):
+        payload = self.flight_payload(self.start + timedelta(hours=12))
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["crew"], [self.crew.id])
+
+    def test_updating_flight_does_not_conflict_with_itself(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+        payload = {"arrival_time": self.start + timedelta(hours=3)}
+
+        res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_crew_schedule(self):
+        later = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start + timedelta(days=2),
+            arrival_time=self.start + timedelta(days=2, hours=2),
+        )
+        later.crew.add(self.crew)
+
+        res = self.client.get(schedule_url(self.crew.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [flight["id"] for flight in res.data], [self.flight.id, later.id]
+        )
+
+    def test_conflicts_report(self):
+        overlapping = sample_flight(
+            route=self.route,
+            airplane=self.other_airplane,
+            departure_time=self.start + timedelta(hours=1),
+            arrival_time=self.start + timedelta(hours=3),
+        )
+        overlapping.crew.add(self.crew)
+        rested = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start + timedelta(hours=20),
+            arrival_time=self.start + timedelta(hours=22),
+        )
+        rested.crew.add(self.crew)
+
+        res = self.client.get(CREW_CONFLICTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["flight_id"], overlapping.id)
+        self.assertEqual(res.data[0]["kind"], CrewConflict.OVERLAP)
+
+    def test_conflicts_report_admin_only(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(CREW_CONFLICTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_season_sweep_compares_with_latest_arrival(self):
+        long_haul = sample_flight(
+            route=self.route,
+            airplane=self.other_airplane,
+            departure_time=self.start - timedelta(hours=1),
+            arrival_time=self.start + timedelta(hours=12),
+        )
+        long_haul.crew.add(self.crew)
+        short = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start + timedelta(hours=6),
+            arrival_time=self.start + timedelta(hours=7),
+        )
+        short.crew.add(self.crew)
+
+        conflicts = list(season_conflicts(start=self.start - timedelta(1)))
+
+        self.assertEqual(
+            [(conflict.flight_id, conflict.conflicting_flight_id)
+             for conflict in conflicts],
+            [(self.flight.id, long_haul.id), (short.id, long_haul.id)],
+        )
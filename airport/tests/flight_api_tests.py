@@ -0,0 +1,307 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Crew
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import (sample_flight,
+                                           sample_order,
+                                           sample_route)
+
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def availability_url(airplane_id):
+    return reverse("airport:airplane-availability", args=[airplane_id])
+
+
+def manifest_url(flight_id):
+    return reverse("airport:flight-manifest", args=[flight_id])
+
+
+class AdminFlightScheduleApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.flight = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start,
+            arrival_time=self.start + timedelta(hours=2),
+        )
+
+    def flight_payload(self, departure_time, duration_hours=2):
+        return {
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "departure_time": departure_time,
+            "arrival_time": departure_time + timedelta(hours=duration_hours),
+        }
+
+    def test_overlapping_airplane_booking_rejected(self):
+        payload = self.flight_payload(self.start + timedelta(hours=1))
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+
+    def test_back_to_back_airplane_booking_allowed(self):
+        payload = self.flight_payload(self.start + timedelta(hours=2))
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_moving_flight_onto_another_rejected(self):
+        later = sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start + timedelta(hours=5),
+            arrival_time=self.start + timedelta(hours=7),
+        )
+        url = reverse("airport:flight-detail", args=[later.id])
+
+        res = self.client.patch(
+            url,
+            {"departure_time": self.start + timedelta(hours=1)},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+
+    def test_arrival_before_departure_rejected(self):
+        payload = self.flight_payload(self.start + timedelta(days=1), -1)
+
+        res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("arrival_time", res.data)
+
+    def test_flight_longer_than_max_duration_rejected(self):
+        payload = self.flight_payload(self.start + timedelta(days=1), 25)
+
+        with self.settings(MAX_FLIGHT_DURATION=timedelta(hours=24)):
+            res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("arrival_time", res.data)
+
+    def test_overlap_checked_after_locking_airplane(self):
+        payload = self.flight_payload(self.start + timedelta(hours=1))
+
+        with (
+            mock.patch(
+                "airport.serializers.enforced_by_database",
+                return_value=False,
+            ),
+            mock.patch("airport.serializers.lock_airplane") as lock,
+        ):
+            res = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+        lock.assert_called_once_with(self.airplane.id)
+
+    def test_airplane_availability(self):
+        sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=self.start + timedelta(hours=4),
+            arrival_time=self.start + timedelta(hours=6),
+        )
+        window_start = self.start - timedelta(hours=1)
+        window_end = self.start + timedelta(hours=8)
+
+        res = self.client.get(
+            availability_url(self.airplane.id),
+            {
+                "start": window_start.isoformat(),
+                "end": window_end.isoformat(),
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (parse_datetime(window["start"]), parse_datetime(window["end"]))
+                for window in res.data
+            ],
+            [
+                (self.start - timedelta(hours=1), self.start),
+                (self.start + timedelta(hours=2),
+                 self.start + timedelta(hours=4)),
+                (self.start + timedelta(hours=6),
+                 self.start + timedelta(hours=8)),
+            ],
+        )
+
+
+class FlightSparseFieldsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.crew = Crew.objects.create(first_name="Ann", last_name="Lee")
+        self.flight = sample_flight()
+        self.flight.crew.add(self.crew)
+
+    def test_list_only_requested_fields(self):
+        res = self.client.get(FLIGHT_URL, {"fields": "id,duration"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{"id": self.flight.id, "duration": 2.0}]
+        )
+
+    def test_unrequested_relations_are_not_queried(self):
+        sample_flight(
+            route=self.flight.route,
+            departure_time="2030-06-02T08:00:00Z",
+            arrival_time="2030-06-02T10:00:00Z",
+        ).crew.add(self.crew)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(FLIGHT_URL, {"fields": "id,route_source"})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_default_list_prefetches_crew(self):
+        res = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(res.data[0]["crew"], [self.crew.id])
+        self.assertEqual(res.data[0]["route_destination"], "Destination")
+        self.assertEqual(res.data[0]["tickets_available"], 50)
+
+    def test_expand_nested_objects(self):
+        res = self.client.get(
+            FLIGHT_URL, {"expand": "route,crew", "fields": "id,route,crew"}
+        )
+
+        self.assertEqual(res.data[0]["route"]["source"], "Source")
+        self.assertEqual(
+            res.data[0]["crew"],
+            [{"id": self.crew.id, "first_name": "Ann", "last_name": "Lee"}],
+        )
+
+    def test_detail_only_requested_fields(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+
+        with self.assertNumQueries(2):
+            res = self.client.get(url, {"fields": "id,departure_time"})
+
+        self.assertEqual(set(res.data), {"id", "departure_time"})
+
+    def test_detail_lists_taken_places(self):
+        sample_order(self.user, self.flight, seats=((2, 3), (1, 4)))
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(
+            res.data["taken_places"],
+            [{"row": 1, "seat": 4}, {"row": 2, "seat": 3}],
+        )
+        self.assertEqual(res.data["airplane"]["rows"], 10)
+        self.assertEqual(res.data["airplane"]["seats_in_row"], 5)
+
+
+class FlightManifestApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.flight = sample_flight()
+        passenger = get_user_model().objects.create_user(
+            "jane@test.com", "testpass", first_name="Jane", last_name="Doe"
+        )
+        self.order = sample_order(passenger, self.flight, seats=((2, 1),))
+        sample_order(self.admin, self.flight, seats=((1, 3), (1, 2)))
+        sample_order(self.admin, sample_flight(
+            departure_time="2030-07-01T08:00:00Z",
+            arrival_time="2030-07-01T10:00:00Z",
+        ))
+
+    def test_manifest_json(self):
+        res = self.client.get(manifest_url(self.flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        manifest = json.loads(b"".join(res.streaming_content))
+        self.assertEqual(manifest["flight"], self.flight.id)
+        self.assertEqual(
+            manifest["seat_map"],
+            {
+                "rows": 10,
+                "seats_in_row": 5,
+                "capacity": 50,
+                "sold": 3,
+                "available": 47,
+            },
+        )
+        self.assertEqual(
+            [(row["row"], row["seat"]) for row in manifest["passengers"]],
+            [(1, 2), (1, 3), (2, 1)],
+        )
+        self.assertEqual(manifest["passengers"][2]["order"], self.order.id)
+        self.assertEqual(manifest["passengers"][2]["email"], "jane@test.com")
+        self.assertEqual(manifest["passengers"][2]["last_name"], "Doe")
+        self.assertEqual(res["Seat-Map-Available"], "47")
+
+    def test_manifest_csv(self):
+        res = self.client.get(manifest_url(self.flight.id), {"format": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/csv"))
+        rows = list(csv.reader(io.StringIO(
+            b"".join(res.streaming_content).decode()
+        )))
+        self.assertEqual(rows[0][:4], ["row", "seat", "order", "email"])
+        self.assertEqual(rows[3][:4], ["2", "1", str(self.order.id),
+                                       "jane@test.com"])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(res["Seat-Map-Sold"], "3")
+
+    def test_manifest_takes_three_queries(self):
+        with self.assertNumQueries(3):
+            res = self.client.get(manifest_url(self.flight.id))
+            b"".join(res.streaming_content)
+
+    def test_manifest_admin_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.get(email="jane@test.com")
+        )
+
+        res = self.client.get(manifest_url(self.flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_manifest_of_missing_flight(self):
+        res = self.client.get(manifest_url(0), {"format": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
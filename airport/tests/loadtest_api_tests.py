@@ -0,0 +1,77 @@
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from airport.loadtest import percentile, saturation_point, summarize
+from airport.models import Ticket
+from airport.tests.order_api_tests import sample_flight
+
+
+class LoadTestReportTests(SimpleTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+        self.assertEqual(percentile(values, 0.5), 0.5)
+        self.assertEqual(percentile(values, 0.99), 1.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_summarize_separates_errors_from_throttling(self):
+        samples = [
+            ("flights", 200, 0.01, True),
+            ("flights", 429, 0.01, False),
+            ("order", 500, 0.02, False),
+            ("order", 400, 0.02, True),
+        ]
+
+        summary = summarize(samples, 2.0)
+
+        self.assertEqual(summary["throughput"], 2.0)
+        self.assertEqual(summary["error_rate"], 0.25)
+        self.assertEqual(summary["throttled"], 1)
+        self.assertEqual(
+            summary["statuses"], {"200": 1, "400": 1, "429": 1, "500": 1}
+        )
+
+    def test_saturation_point(self):
+        stages = [
+            {"concurrency": 1, "throughput": 50},
+            {"concurrency": 2, "throughput": 95},
+            {"concurrency": 4, "throughput": 100},
+            {"concurrency": 8, "throughput": 90},
+        ]
+
+        self.assertEqual(saturation_point(stages)["concurrency"], 2)
+        self.assertIsNone(saturation_point(stages[:2]))
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = sample_flight()
+
+    def test_booking_flow_against_running_server(self):
+        out = StringIO()
+
+        with self.settings(THROTTLING_ENABLED=False):
+            call_command(
+                "loadtest",
+                url=self.live_server_url,
+                concurrency="1",
+                duration=0.5,
+                processes=0,
+                weights="new_customer=1",
+                json=True,
+                stdout=out,
+            )
+
+        stage = json.loads(out.getvalue())["stages"][0]
+        self.assertEqual(stage["concurrency"], 1)
+        self.assertEqual(stage["error_rate"], 0)
+        self.assertEqual(
+            set(stage["endpoints"]),
+            {"register", "token", "flights", "flight", "order", "orders"},
+        )
+        self.assertTrue(Ticket.objects.filter(flight=self.flight).exists())
@@ -0,0 +1,85 @@
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+IMAGE_NAME = "boeing-0b6d0d9e-6f4a-4b8e-9a7d-3c2f1e0a9b8c.jpg"
+IMAGE_CONTENT = bytes(range(256)) * 4
+
+
+def media_url(path):
+    return reverse("media", args=[path])
+
+
+class MediaApiTests(SimpleTestCase):
+    def setUp(self):
+        temporary_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_dir.cleanup)
+        uploads = Path(temporary_dir.name) / "uploads" / "airplanes"
+        uploads.mkdir(parents=True)
+        (uploads / IMAGE_NAME).write_bytes(IMAGE_CONTENT)
+        (uploads / "logo.png").write_bytes(b"logo")
+        settings_override = override_settings(
+            MEDIA_ROOT=temporary_dir.name, MEDIA_SENDFILE_HEADER=None
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = media_url(f"uploads/airplanes/{IMAGE_NAME}")
+
+    def test_uuid_upload_cached_as_immutable(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), IMAGE_CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_other_files_revalidated(self):
+        res = self.client.get(media_url("uploads/airplanes/logo.png"))
+
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_range_request(self):
+        res = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(
+            b"".join(res.streaming_content), IMAGE_CONTENT[10:20]
+        )
+        self.assertEqual(
+            res["Content-Range"], f"bytes 10-19/{len(IMAGE_CONTENT)}"
+        )
+
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-24")
+
+        self.assertEqual(b"".join(res.streaming_content), IMAGE_CONTENT[-24:])
+        self.assertEqual(res["Content-Length"], "24")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_path_outside_media_root_not_found(self):
+        res = self.client.get(media_url("../settings.py"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="x-accel-redirect")
+    def test_delegated_to_front_proxy(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(
+            res["X-Accel-Redirect"],
+            f"/protected-media/uploads/airplanes/{IMAGE_NAME}",
+        )
+        self.assertEqual(res.content, b"")
@@ -0,0 +1,116 @@
+import json
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport import metrics
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+FLIGHT_URL = reverse("airport:flight-list")
+METRICS_URL = reverse("metrics")
+FLIGHT_LIST_LATENCY = (
+    'airport_http_request_duration_seconds_count{view="airport:flight-list",'
+    'action="list",method="GET",status="200"}'
+)
+FLIGHT_LIST_SERIALIZED = (
+    'airport_serialized_objects_total{serializer="FlightListSerializer"}'
+)
+ORDERS_CREATED = "airport_orders_created_total"
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def sample(self, name):
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        match = re.search(
+            rf"^{re.escape(name)} (\S+)$", res.content.decode(), re.MULTILINE
+        )
+        return float(match.group(1)) if match else 0
+
+    def test_view_latency_and_serializer_metrics(self):
+        requests_before = self.sample(FLIGHT_LIST_LATENCY)
+        serialized_before = self.sample(FLIGHT_LIST_SERIALIZED)
+
+        self.client.get(FLIGHT_URL)
+
+        self.assertEqual(
+            self.sample(FLIGHT_LIST_LATENCY), requests_before + 1
+        )
+        self.assertEqual(
+            self.sample(FLIGHT_LIST_SERIALIZED), serialized_before + 1
+        )
+
+    def test_orders_counted_on_commit(self):
+        orders_before = self.sample(ORDERS_CREATED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_order(self.user, self.flight)
+
+        self.assertEqual(self.sample(ORDERS_CREATED), orders_before + 1)
+
+    def test_metrics_token(self):
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_staff_only_without_token(self):
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(self.user)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_exited_threads_fold_into_process_totals(self):
+        orders_before = self.sample(ORDERS_CREATED)
+
+        threads = [
+            threading.Thread(target=metrics.ORDERS_CREATED.inc)
+            for _ in range(200)
+        ]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        self.assertLess(len(metrics._shards), 10)
+        self.assertEqual(self.sample(ORDERS_CREATED), orders_before + 200)
+
+    def test_multiprocess_mode_sums_worker_files(self):
+        orders_before = self.sample(ORDERS_CREATED)
+
+        with tempfile.TemporaryDirectory() as directory:
+            (Path(directory) / "metrics-1.json").write_text(
+                json.dumps([[ORDERS_CREATED, [], "", 5]])
+            )
+            with override_settings(METRICS_MULTIPROCESS_DIR=directory):
+                self.assertEqual(
+                    self.sample(ORDERS_CREATED), orders_before + 5
+                )
@@ -0,0 +1,318 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import (Country,
+                            City,
+                            Airport,
+                            Route,
+                            Flight,
+                            Order,
+                            Ticket)
+from airport.order_summary import order_summary
+from airport.tests.airplane_api_tests import sample_airplane
+
+ORDER_URL = reverse("airport:order-list")
+ORDER_SUMMARY_URL = reverse("airport:order-summary")
+
+
+def sample_route(**params):
+    country, _ = Country.objects.get_or_create(name="Country")
+    city, _ = City.objects.get_or_create(name="City", country=country)
+    source, _ = Airport.objects.get_or_create(
+        name="Source", city=city, closest_big_city="City"
+    )
+    destination, _ = Airport.objects.get_or_create(
+        name="Destination", city=city, closest_big_city="City"
+    )
+
+    defaults = {
+        "source": source,
+        "destination": destination,
+        "distance": 1000,
+    }
+    defaults.update(params)
+
+    return Route.objects.create(**defaults)
+
+
+def sample_flight(**params):
+    defaults = {
+        "departure_time": "2030-06-01T08:00:00Z",
+        "arrival_time": "2030-06-01T10:00:00Z",
+    }
+    defaults.update(params)
+    if "route" not in defaults:
+        defaults["route"] = sample_route()
+    if "airplane" not in defaults:
+        defaults["airplane"] = sample_airplane()
+
+    return Flight.objects.create(**defaults)
+
+
+def sample_order(user, flight, seats=((1, 1),)):
+    order = Order.objects.create(user=user)
+    for row, seat in seats:
+        Ticket.objects.create(order=order, flight=flight, row=row, seat=seat)
+
+    return order
+
+
+class UnauthenticatedOrderApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        flight = sample_flight()
+        payload = {"tickets": [{"row": 1, "seat": 1, "flight": flight.id}]}
+
+        self.assertEqual(
+            self.client.get(ORDER_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        self.assertEqual(
+            self.client.post(ORDER_URL, payload, format="json").status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+
+class AuthenticatedOrderApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_create_order(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": self.flight.id},
+                {"row": 1, "seat": 2, "flight": self.flight.id},
+            ]
+        }
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.tickets.count(), 2)
+
+    def test_ticket_order_is_read_only(self):
+        other_order = sample_order(
+            get_user_model().objects.create_user("other@test.com", "pass"),
+            self.flight,
+        )
+        payload = {
+            "tickets": [{
+                "row": 2,
+                "seat": 1,
+                "flight": self.flight.id,
+                "order": other_order.id,
+            }]
+        }
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["tickets"][0]["order"], res.data["id"])
+        self.assertEqual(other_order.tickets.count(), 1)
+
+    def test_list_only_own_orders(self):
+        own = sample_order(self.user, self.flight, seats=((1, 1),))
+        sample_order(
+            get_user_model().objects.create_user("other@test.com", "pass"),
+            self.flight,
+            seats=((1, 2),),
+        )
+
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(
+            [order["id"] for order in res.data["results"]], [own.id]
+        )
+
+    def test_create_order_for_taken_seat_rejected(self):
+        sample_order(self.user, self.flight, seats=((1, 1),))
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+        payload = {"tickets": [ticket]}
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_with_repeated_seat_rejected(self):
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+
+        res = self.client.post(
+            ORDER_URL, {"tickets": [ticket, ticket]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_retry_with_idempotency_key_replays_response(self):
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+        payload = {"tickets": [ticket]}
+
+        first = self.client.post(
+            ORDER_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="abc"
+        )
+        retry = self.client.post(
+            ORDER_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="abc"
+        )
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_reused_for_other_request_rejected(self):
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+        self.client.post(
+            ORDER_URL,
+            {"tickets": [ticket]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc",
+        )
+
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [{**ticket, "seat": 2}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc",
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_is_not_replayed(self):
+        sample_order(self.user, self.flight, seats=((1, 1),))
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+        self.client.post(
+            ORDER_URL,
+            {"tickets": [ticket]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc",
+        )
+        Ticket.objects.all().delete()
+
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [ticket]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_expired_idempotency_key_creates_again(self):
+        ticket = {"row": 1, "seat": 1, "flight": self.flight.id}
+        payload = {"tickets": [ticket]}
+        self.client.post(
+            ORDER_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="abc"
+        )
+        Ticket.objects.all().delete()
+
+        with self.settings(IDEMPOTENCY_KEY_TTL=timedelta(0)):
+            res = self.client.post(
+                ORDER_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="abc"
+            )
+
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_list_orders_reports_exact_count(self):
+        sample_order(self.user, self.flight, seats=((1, 1),))
+        sample_order(self.user, self.flight, seats=((1, 2),))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 2)
+        self.assertNotIn("count_is_estimate", res.data)
+        self.assertFalse(any(
+            query["sql"].startswith("EXPLAIN") for query in queries
+        ))
+
+
+class OrderSummaryApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+        self.other_route = sample_route(distance=300)
+
+    def flight(self, route, departure_time):
+        return sample_flight(
+            route=route,
+            airplane=sample_airplane(),
+            departure_time=departure_time,
+            arrival_time=departure_time,
+            price=Decimal("50.00"),
+        )
+
+    def test_summary(self):
+        first = self.flight(self.route, "2020-01-01T08:00:00Z")
+        second = self.flight(self.route, "2020-02-01T08:00:00Z")
+        other = self.flight(self.other_route, "2020-03-01T08:00:00Z")
+        upcoming = self.flight(self.route, "2030-01-01T08:00:00Z")
+        sample_order(self.user, first, seats=((1, 1), (1, 2)))
+        sample_order(self.user, second)
+        sample_order(self.user, other)
+        sample_order(self.user, upcoming)
+        stranger = get_user_model().objects.create_user(
+            "other@test.com", "testpass"
+        )
+        sample_order(stranger, first, seats=((2, 1),))
+
+        res = self.client.get(ORDER_SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["orders"], 4)
+        self.assertEqual(res.data["tickets"], 5)
+        self.assertEqual(res.data["upcoming_trips"], 1)
+        self.assertEqual(res.data["past_trips"], 3)
+        self.assertEqual(res.data["distance_flown"], 2300)
+        self.assertEqual(res.data["total_spent"], "250.00")
+        self.assertEqual(
+            [(route["route"], route["trips"])
+             for route in res.data["top_routes"]],
+            [(self.route.id, 2), (self.other_route.id, 1)],
+        )
+
+    def test_summary_without_orders(self):
+        res = self.client.get(ORDER_SUMMARY_URL)
+
+        self.assertEqual(res.data["orders"], 0)
+        self.assertEqual(res.data["distance_flown"], 0)
+        self.assertEqual(res.data["total_spent"], "0.00")
+        self.assertEqual(res.data["top_routes"], [])
+
+    def test_summary_takes_two_queries(self):
+        flight = self.flight(self.route, "2020-01-01T08:00:00Z")
+        for row in range(1, 6):
+            sample_order(self.user, flight, seats=((row, 1),))
+
+        with self.assertNumQueries(2):
+            order_summary(self.user)
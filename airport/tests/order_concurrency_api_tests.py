@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Order, Ticket
+from airport.tests.order_api_tests import sample_flight
+
+ORDER_URL = reverse("airport:order-list")
+FLIGHT_URL = reverse("airport:flight-list")
+# Generous bound, a request only exceeds it when it waits on a lock
+MAX_LATENCY = 5
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentOrderApiTests(TransactionTestCase):
+    """Orders racing for the same seats over separate connections"""
+
+    def setUp(self):
+        cache.clear()
+        self.flight = sample_flight()
+        self.users = [
+            get_user_model().objects.create_user(
+                f"user{number}@test.com", "testpass"
+            )
+            for number in range(12)
+        ]
+
+    def post_concurrently(self, seat_lists, users=None, headers=None):
+        """POST one order per seat list at once, return (res, seconds)"""
+        users = users or self.users
+        barrier = threading.Barrier(len(seat_lists))
+
+        def create_order(user, seats):
+            client = APIClient()
+            client.force_authenticate(user)
+            payload = {
+                "tickets": [
+                    {"row": row, "seat": seat, "flight": self.flight.id}
+                    for row, seat in seats
+                ]
+            }
+            try:
+                barrier.wait()
+                start = time.perf_counter()
+                res = client.post(ORDER_URL, payload, format="json",
+                                  **(headers or {}))
+                return res, time.perf_counter() - start
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(seat_lists)) as executor:
+            return list(executor.map(create_order, users, seat_lists))
+
+    def assert_seats_consistent(self):
+        seats = list(Ticket.objects.values_list("flight", "row", "seat"))
+        self.assertEqual(len(seats), len(set(seats)))
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        res = client.get(FLIGHT_URL, {"fields": "id,tickets_available"})
+        self.assertEqual(
+            res.data[0]["tickets_available"],
+            self.flight.airplane.capacity - len(seats),
+        )
+
+    def test_same_seat_sold_once(self):
+        results = self.post_concurrently([[(1, 1)]] * len(self.users))
+
+        statuses = sorted(res.status_code for res, _ in results)
+        self.assertEqual(
+            statuses,
+            [status.HTTP_201_CREATED]
+            + [status.HTTP_400_BAD_REQUEST] * (len(self.users) - 1),
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assert_seats_consistent()
+        self.assertLess(max(seconds for _, seconds in results), MAX_LATENCY)
+
+    def test_overlapping_seats_never_deadlock_or_oversell(self):
+        # Neighbouring seat pairs, listed in both directions
+        seat_lists = []
+        for number in range(len(self.users)):
+            pair = [(1, number % 4 + 1), (1, (number + 1) % 4 + 1)]
+            seat_lists.append(pair if number % 2 else pair[::-1])
+
+        results = self.post_concurrently(seat_lists)
+
+        created = [
+            seats
+            for seats, (res, _) in zip(seat_lists, results, strict=True)
+            if res.status_code == status.HTTP_201_CREATED
+        ]
+        self.assertTrue(created)
+        self.assertTrue(all(
+            res.status_code in (status.HTTP_201_CREATED,
+                                status.HTTP_400_BAD_REQUEST)
+            for res, _ in results
+        ))
+        self.assertEqual(
+            Ticket.objects.count(), sum(len(seats) for seats in created)
+        )
+        self.assert_seats_consistent()
+        self.assertLess(max(seconds for _, seconds in results), MAX_LATENCY)
+
+    def test_concurrent_retries_create_one_order(self):
+        user = self.users[0]
+
+        results = self.post_concurrently(
+            [[(2, 1)]] * 6,
+            users=[user] * 6,
+            headers={"HTTP_IDEMPOTENCY_KEY": "retry"},
+        )
+
+        self.assertEqual(
+            {res.status_code for res, _ in results},
+            {status.HTTP_201_CREATED},
+        )
+        self.assertEqual({res.data["id"] for res, _ in results},
+                         {Order.objects.get(user=user).id})
+        self.assert_seats_consistent()
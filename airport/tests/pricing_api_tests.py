@@ -0,0 +1,151 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Flight, Ticket
+from airport.pricing import reprice_flights
+from airport.tests.order_api_tests import sample_flight, sample_order
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+@override_settings(
+    FARE_BASE=Decimal("20.00"),
+    FARE_PER_KM=Decimal("0.08"),
+    FARE_LOAD_FACTOR_SURCHARGE=1.0,
+    FARE_DEPARTURE_SURCHARGES=((timedelta(days=3), 0.5),),
+)
+class PricingApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        # 1000 km route and 50 seats
+        self.flight = sample_flight()
+
+    def price_of(self, flight):
+        return Flight.objects.get(pk=flight.pk).price
+
+    def test_fare_from_distance(self):
+        self.assertEqual(reprice_flights(), 1)
+
+        self.assertEqual(self.price_of(self.flight), Decimal("100.00"))
+        self.assertEqual(reprice_flights(), 0)
+
+    def test_fare_rises_with_load_factor(self):
+        sample_order(self.user, self.flight,
+                     seats=[(1, seat) for seat in range(1, 6)])
+        sample_order(self.user, self.flight,
+                     seats=[(2, seat) for seat in range(1, 6)])
+
+        reprice_flights()
+
+        self.assertEqual(self.price_of(self.flight), Decimal("120.00"))
+
+    def test_fare_rises_close_to_departure(self):
+        departure = timezone.now() + timedelta(days=1)
+        flight = sample_flight(
+            route=self.flight.route,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+
+        reprice_flights()
+
+        self.assertEqual(self.price_of(flight), Decimal("150.00"))
+
+    def test_departed_flights_keep_their_fare(self):
+        departure = timezone.now() - timedelta(days=1)
+        flight = sample_flight(
+            route=self.flight.route,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+
+        self.assertEqual(reprice_flights(batch_size=1), 1)
+
+        self.assertIsNone(self.price_of(flight))
+
+    def test_list_flights_shows_fare(self):
+        reprice_flights()
+
+        res = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(res.data[0]["price"], "100.00")
+
+    def test_ticket_keeps_fare_it_was_sold_at(self):
+        reprice_flights()
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "flight": self.flight.id}
+                for row in (1, 2)
+                for seat in range(1, 6)
+            ]
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["tickets"][0]["price"], "100.00")
+        self.assertEqual(self.price_of(self.flight), Decimal("120.00"))
+        self.assertEqual(
+            set(Ticket.objects.values_list("price", flat=True)),
+            {Decimal("100.00")},
+        )
+
+    def test_ticket_of_unpriced_flight_gets_current_fare(self):
+        Flight.objects.filter(pk=self.flight.pk).update(price=None)
+
+        order = sample_order(self.user, self.flight)
+
+        self.assertEqual(order.tickets.get().price, Decimal("100.00"))
+
+    def test_admin_prices_saved_flight(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@admin.com", "testpass"
+        )
+        self.client.force_login(admin)
+        departure = timezone.now() + timedelta(days=30)
+
+        res = self.client.post(
+            reverse("admin:airport_flight_add"),
+            {
+                "route": self.flight.route.id,
+                "airplane": self.flight.airplane.id,
+                "departure_time_0": departure.strftime("%Y-%m-%d"),
+                "departure_time_1": "08:00:00",
+                "arrival_time_0": departure.strftime("%Y-%m-%d"),
+                "arrival_time_1": "10:00:00",
+            },
+        )
+
+        self.assertEqual(res.status_code, 302)
+        flight = Flight.objects.exclude(pk=self.flight.pk).get()
+        self.assertEqual(flight.price, Decimal("100.00"))
+
+    def test_order_created_when_reprice_fails(self):
+        payload = {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.id}]}
+
+        with (
+            mock.patch(
+                "airport.views.reprice_flights", side_effect=RuntimeError
+            ),
+            self.assertLogs("django", "ERROR"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
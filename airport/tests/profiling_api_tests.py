@@ -0,0 +1,105 @@
+import marshal
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.ring_buffer import DiskRingBuffer
+from airport.tests.order_api_tests import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+PROFILE_LIST_URL = reverse("profile-list")
+
+
+def download_url(profile_id):
+    return reverse("profile-download", args=[profile_id])
+
+
+class DiskRingBufferTests(SimpleTestCase):
+    def test_oldest_entries_dropped_over_capacity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ring_buffer = DiskRingBuffer(directory, capacity=2)
+            first = ring_buffer.append({"n": 1}, b"first")
+            ring_buffer.append({"n": 2})
+            ring_buffer.append({"n": 3}, b"third")
+
+            self.assertEqual(
+                [entry["n"] for entry in ring_buffer.entries()], [3, 2]
+            )
+            self.assertIsNone(ring_buffer.get(first))
+            self.assertIsNone(ring_buffer.payload_path(first))
+            self.assertIsNone(ring_buffer.get("../../etc/passwd"))
+
+
+class ProfilingApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        temporary_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_dir.cleanup)
+        settings_override = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_SAMPLE_RATE=0,
+            PROFILING_PATHS=[r"^/api/airport/flights/$"],
+            PROFILING_TOKEN="secret",
+            PROFILING_DIR=temporary_dir.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        sample_flight()
+
+    def test_matching_path_profiled_with_sql_summary(self):
+        self.client.get(FLIGHT_URL)
+
+        res = self.client.get(PROFILE_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        profile = res.data[0]
+        self.assertEqual(profile["view"], "airport:flight-list")
+        self.assertEqual(profile["status"], status.HTTP_200_OK)
+        self.assertGreater(profile["sql"]["count"], 0)
+        self.assertTrue(profile["top_functions"])
+
+        res = self.client.get(download_url(profile["entry_id"]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats = marshal.loads(b"".join(res.streaming_content))
+        self.assertTrue(stats)
+
+    def test_profile_header_requires_token(self):
+        url = reverse("airport:route-list")
+
+        res = self.client.get(url, HTTP_X_PROFILE="wrong")
+        self.assertNotIn("X-Profile-Id", res)
+
+        res = self.client.get(url, HTTP_X_PROFILE="secret")
+        self.assertIn("X-Profile-Id", res)
+
+    def test_profiles_admin_only(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(PROFILE_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_profiler_records_nothing(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.get(FLIGHT_URL)
+
+        res = client.get(PROFILE_LIST_URL)
+
+        self.assertEqual(res.data, [])
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Route
+from airport.pagination import estimate_count
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import sample_flight, sample_route
+from airport.views import RouteFlightsPagination
+
+ROUTE_URL = reverse("airport:route-list")
+
+
+def detail_url(route_id):
+    return reverse("airport:route-detail", args=[route_id])
+
+
+def flights_url(route_id):
+    return reverse("airport:route-flights", args=[route_id])
+
+
+class RouteFlightsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.now = timezone.now().replace(microsecond=0)
+        self.past_flight = self.create_flight(self.now - timedelta(days=1))
+
+    def create_flight(self, departure_time):
+        return sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+        )
+
+    def create_upcoming_flights(self, count):
+        return [
+            self.create_flight(self.now + timedelta(days=day + 1))
+            for day in range(count)
+        ]
+
+    def test_route_detail_embeds_upcoming_flights_only(self):
+        upcoming = self.create_upcoming_flights(2)
+
+        res = self.client.get(detail_url(self.route.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [flight["id"] for flight in res.data["flights"]],
+            [flight.id for flight in upcoming],
+        )
+        self.assertIsNone(res.data["flights_next"])
+
+    def test_route_detail_caps_flights_and_links_next_page(self):
+        page_size = RouteFlightsPagination.page_size
+        self.create_upcoming_flights(page_size + 1)
+
+        res = self.client.get(detail_url(self.route.id))
+
+        self.assertEqual(len(res.data["flights"]), page_size)
+        self.assertIn(flights_url(self.route.id), res.data["flights_next"])
+
+        res = self.client.get(res.data["flights_next"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNone(res.data["next"])
+
+    def test_route_flights_filter_by_departure_after(self):
+        res = self.client.get(
+            flights_url(self.route.id),
+            {"departure_after": (self.now - timedelta(days=2)).isoformat()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [flight["id"] for flight in res.data["results"]],
+            [self.past_flight.id],
+        )
+
+
+class RouteListCountApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        for distance in (100, 200, 300):
+            sample_route(distance=distance)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=10000)
+    @mock.patch("airport.pagination.estimate_count", return_value=50000)
+    def test_list_routes_uses_estimate_above_threshold(self, _):
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data["count"], 50000)
+        self.assertTrue(res.data["count_is_estimate"])
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=10000)
+    @mock.patch("airport.pagination.estimate_count", return_value=5)
+    def test_list_routes_counts_exactly_below_threshold(self, _):
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data["count"], 3)
+        self.assertFalse(res.data["count_is_estimate"])
+
+    @skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_list_routes_counts_from_planner_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Route._meta.db_table}")
+
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data["count"], 3)
+        self.assertTrue(res.data["count_is_estimate"])
+
+    @skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+    def test_estimate_filtered_count_with_explain(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Route._meta.db_table}")
+
+        estimate = estimate_count(Route.objects.filter(distance__gt=150))
+
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 1)
@@ -0,0 +1,336 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Crew, Flight, FlightSchedule
+from airport.schedules import materialize_schedules
+from airport.tests.airplane_api_tests import sample_airplane
+from airport.tests.order_api_tests import (sample_flight,
+                                           sample_order,
+                                           sample_route)
+
+SCHEDULE_URL = reverse("airport:flightschedule-list")
+
+
+def detail_url(schedule_id):
+    return reverse("airport:flightschedule-detail", args=[schedule_id])
+
+
+class FlightScheduleApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.crew = Crew.objects.create(first_name="Jane", last_name="Doe")
+        self.start = timezone.now().date() + timedelta(days=1)
+
+    def payload(self, **params):
+        # Two weeks of Monday, Wednesday and Friday flights: 6 flights
+        payload = {
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "crew": [self.crew.id],
+            "days_of_week": [1, 3, 5],
+            "departure_time": "08:00",
+            "time_zone": "UTC",
+            "duration": "02:00:00",
+            "valid_from": self.start,
+            "valid_until": self.start + timedelta(days=13),
+        }
+        payload.update(params)
+        return payload
+
+    def create_schedule(self, **params):
+        res = self.client.post(
+            SCHEDULE_URL, self.payload(**params), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return FlightSchedule.objects.get(pk=res.data["id"])
+
+    def admin_edit(self, schedule, **fields):
+        self.client.force_login(self.user)
+        form = {
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "crew": [self.crew.id],
+            "days_of_week": schedule.days_of_week,
+            "departure_time": "08:00:00",
+            "time_zone": "UTC",
+            "duration": "02:00:00",
+            "valid_from": schedule.valid_from,
+            "valid_until": schedule.valid_until,
+            "cancelled_departures-TOTAL_FORMS": 0,
+            "cancelled_departures-INITIAL_FORMS": 0,
+        }
+        form.update(fields)
+        return self.client.post(
+            reverse("admin:airport_flightschedule_change",
+                    args=[schedule.id]),
+            form,
+        )
+
+    def first_monday(self):
+        departure = datetime.combine(
+            self.start, time(), tzinfo=ZoneInfo("UTC")
+        )
+        while departure.isoweekday() != 1:
+            departure += timedelta(days=1)
+        return departure
+
+    def test_create_schedule_materializes_flights(self):
+        schedule = self.create_schedule()
+
+        flights = Flight.objects.filter(schedule=schedule)
+        self.assertEqual(flights.count(), 6)
+        for flight in flights:
+            self.assertIn(flight.departure_time.isoweekday(), (1, 3, 5))
+            self.assertEqual(flight.departure_time.hour, 8)
+            self.assertEqual(
+                flight.arrival_time - flight.departure_time,
+                timedelta(hours=2),
+            )
+            self.assertEqual(list(flight.crew.all()), [self.crew])
+            self.assertIsNotNone(flight.price)
+
+    def test_materialize_is_idempotent(self):
+        schedule = self.create_schedule()
+        FlightSchedule.objects.update(materialized_until=None)
+
+        self.assertEqual(materialize_schedules(), 0)
+
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 6)
+
+    def test_materialize_rolls_horizon(self):
+        schedule = self.create_schedule(
+            valid_until=self.start + timedelta(days=60)
+        )
+        Flight.objects.all().delete()
+        FlightSchedule.objects.update(materialized_until=None)
+
+        materialize_schedules(horizon=timedelta(days=7))
+        first_week = Flight.objects.filter(schedule=schedule).count()
+        materialize_schedules(horizon=timedelta(days=7))
+        materialize_schedules(horizon=timedelta(days=14))
+
+        self.assertEqual(first_week, 3)
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 6)
+
+    def test_busy_airplane_skipped(self):
+        departure = self.first_monday()
+        sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=departure + timedelta(hours=9),
+            arrival_time=departure + timedelta(hours=11),
+        )
+
+        schedule = self.create_schedule()
+
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 5)
+
+    def test_local_departure_time(self):
+        schedule = self.create_schedule(time_zone="Europe/Kyiv")
+
+        for flight in Flight.objects.filter(schedule=schedule):
+            local = flight.departure_time.astimezone(ZoneInfo("Europe/Kyiv"))
+            self.assertEqual(local.hour, 8)
+
+    def test_edit_schedule_updates_flights(self):
+        schedule = self.create_schedule()
+        sold = Flight.objects.filter(
+            schedule=schedule, departure_time__week_day=6
+        ).first()
+        sample_order(self.user, sold)
+        other_crew = Crew.objects.create(first_name="John", last_name="Roe")
+
+        res = self.client.patch(
+            detail_url(schedule.id),
+            {
+                "departure_time": "09:30",
+                "days_of_week": [1, 3],
+                "crew": [other_crew.id],
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        flights = Flight.objects.filter(schedule=schedule)
+        self.assertEqual(flights.count(), 4)
+        for flight in flights:
+            self.assertIn(flight.departure_time.isoweekday(), (1, 3))
+            self.assertEqual(
+                (flight.departure_time.hour, flight.departure_time.minute),
+                (9, 30),
+            )
+            self.assertEqual(list(flight.crew.all()), [other_crew])
+        sold.refresh_from_db()
+        self.assertIsNone(sold.schedule)
+        self.assertEqual(Flight.objects.count(), 5)
+
+    def test_invalid_duration(self):
+        for duration in ("-02:00:00", "00:00:00", "1 01:00:00"):
+            res = self.client.post(
+                SCHEDULE_URL, self.payload(duration=duration), format="json"
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("duration", res.data)
+        self.assertFalse(FlightSchedule.objects.exists())
+
+    def test_airplane_without_sold_seats_refused(self):
+        schedule = self.create_schedule()
+        sample_order(
+            self.user, Flight.objects.filter(schedule=schedule).first(),
+            seats=((8, 5),),
+        )
+        smaller = sample_airplane(name="Smaller", rows=6)
+
+        res = self.client.patch(
+            detail_url(schedule.id), {"airplane": smaller.id}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+        self.assertFalse(Flight.objects.filter(airplane=smaller).exists())
+
+    def test_move_onto_busy_airplane_refused(self):
+        schedule = self.create_schedule()
+        monday = self.first_monday()
+        sample_flight(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=monday + timedelta(hours=11),
+            arrival_time=monday + timedelta(hours=13),
+        )
+
+        res = self.client.patch(
+            detail_url(schedule.id), {"departure_time": "10:00"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+        for flight in Flight.objects.filter(schedule=schedule):
+            self.assertEqual(flight.departure_time.hour, 8)
+
+    def crew_flight(self, departure):
+        flight = sample_flight(
+            route=self.route,
+            airplane=sample_airplane(name="Other"),
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+        flight.crew.add(self.crew)
+        return flight
+
+    def test_busy_crew_refused(self):
+        # Lands at 12:00, two hours before the schedule departs
+        self.crew_flight(self.first_monday() + timedelta(hours=10))
+
+        res = self.client.post(
+            SCHEDULE_URL, self.payload(departure_time="14:00"),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+        self.assertFalse(FlightSchedule.objects.exists())
+
+    def test_crew_without_rest_between_flights_refused(self):
+        res = self.client.post(
+            SCHEDULE_URL,
+            self.payload(days_of_week=[1, 2], duration="16:00:00"),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+
+    def test_move_onto_busy_crew_refused(self):
+        schedule = self.create_schedule()
+        self.crew_flight(self.first_monday() + timedelta(hours=20))
+
+        res = self.client.patch(
+            detail_url(schedule.id), {"departure_time": "18:00"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+        for flight in Flight.objects.filter(schedule=schedule):
+            self.assertEqual(flight.departure_time.hour, 8)
+
+    def test_admin_edit_refused_for_busy_crew(self):
+        schedule = self.create_schedule()
+        self.crew_flight(self.first_monday() + timedelta(hours=20))
+
+        res = self.admin_edit(schedule, departure_time="18:00:00")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("crew", res.context["adminform"].form.errors)
+
+    def test_admin_edit_updates_flights(self):
+        schedule = self.create_schedule()
+
+        res = self.admin_edit(
+            schedule, departure_time="09:30:00", duration="03:00:00"
+        )
+
+        self.assertEqual(res.status_code, 302)
+        flights = Flight.objects.filter(schedule=schedule)
+        self.assertEqual(flights.count(), 6)
+        for flight in flights:
+            self.assertEqual(
+                (flight.departure_time.hour, flight.departure_time.minute),
+                (9, 30),
+            )
+            self.assertEqual(
+                flight.arrival_time - flight.departure_time,
+                timedelta(hours=3),
+            )
+
+    def test_admin_edit_refused_for_sold_seats(self):
+        schedule = self.create_schedule()
+        sample_order(
+            self.user, Flight.objects.filter(schedule=schedule).first(),
+            seats=((8, 5),),
+        )
+        smaller = sample_airplane(name="Smaller", rows=6)
+
+        res = self.admin_edit(schedule, airplane=smaller.id)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("airplane", res.context["adminform"].form.errors)
+        self.assertFalse(Flight.objects.filter(airplane=smaller).exists())
+
+    def test_invalid_time_zone(self):
+        res = self.client.post(
+            SCHEDULE_URL, self.payload(time_zone="Mars/Olympus"), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_admin_cannot_create_schedule(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.post(SCHEDULE_URL, self.payload(), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.client.get(SCHEDULE_URL).status_code, status.HTTP_200_OK
+        )
@@ -0,0 +1,97 @@
+import gzip
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from airport import schema
+
+SCHEMA_URL = reverse("schema")
+
+
+class CachedSchemaApiTests(SimpleTestCase):
+    def setUp(self):
+        temporary_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_dir.cleanup)
+        self.schema_file = Path(temporary_dir.name) / "openapi-schema.json"
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_FILE=self.schema_file
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+
+    def test_schema_generated_once_and_stored(self):
+        with mock.patch(
+            "airport.schema.generate_schema", wraps=schema.generate_schema
+        ) as generate_schema:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(generate_schema.call_count, 1)
+        stored = json.loads(self.schema_file.read_text())
+        self.assertIn("/api/airport/flights/", stored["schema"]["paths"])
+
+    def test_schema_loaded_from_file_after_restart(self):
+        self.client.get(SCHEMA_URL)
+        schema.clear_schema_cache()
+
+        with mock.patch("airport.schema.generate_schema") as generate_schema:
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        generate_schema.assert_not_called()
+
+    def test_stale_schema_file_regenerated(self):
+        schema.write_schema_file({"paths": {}}, "old release")
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT="application/json")
+
+        self.assertIn("/api/airport/flights/", res.json()["paths"])
+
+    def test_gzip_refused_with_zero_quality(self):
+        for accept_encoding in ("gzip;q=0, deflate", "identity", "*;q=0"):
+            res = self.client.get(
+                SCHEMA_URL,
+                HTTP_ACCEPT="application/json",
+                HTTP_ACCEPT_ENCODING=accept_encoding,
+            )
+
+            self.assertNotIn("Content-Encoding", res)
+            self.assertIn("paths", res.json())
+            self.assertIn("Accept-Encoding", res["Vary"])
+
+    def test_accepts_gzip(self):
+        self.assertTrue(schema.accepts_gzip("gzip"))
+        self.assertTrue(schema.accepts_gzip("deflate, GZIP;q=0.5"))
+        self.assertTrue(schema.accepts_gzip("br, *"))
+        self.assertFalse(schema.accepts_gzip(""))
+        self.assertFalse(schema.accepts_gzip("gzip;q=0"))
+        self.assertFalse(schema.accepts_gzip("gzip;q=0.0, *;q=1"))
+        self.assertFalse(schema.accepts_gzip("x-gzip"))
+
+    def test_schema_served_with_etag_and_gzip(self):
+        res = self.client.get(
+            SCHEMA_URL,
+            HTTP_ACCEPT="application/json",
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+        )
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertIn("paths", json.loads(gzip.decompress(res.content)))
+
+        res = self.client.get(
+            SCHEMA_URL,
+            HTTP_ACCEPT="application/json",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
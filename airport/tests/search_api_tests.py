@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Airport, City, Country
+from airport.search import clear_index
+from airport.tests.airplane_api_tests import sample_airplane
+
+AUTOCOMPLETE_URL = reverse("airport:autocomplete")
+
+
+class AutocompleteApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_index()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.country = Country.objects.create(name="United States")
+            self.city = City.objects.create(
+                name="New York", country=self.country
+            )
+            self.airport = Airport.objects.create(
+                name="John F. Kennedy",
+                city=self.city,
+                closest_big_city="Newark",
+            )
+            self.airplane = sample_airplane(name="Boeing 747")
+
+    def search(self, query, **params):
+        return self.client.get(AUTOCOMPLETE_URL, {"q": query, **params})
+
+    def test_autocomplete_requires_authentication(self):
+        self.client.force_authenticate(None)
+
+        res = self.search("new")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_autocomplete_ranks_name_matches_first(self):
+        res = self.search("new")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(result["kind"], result["pk"]) for result in res.data],
+            [("city", self.city.id), ("airport", self.airport.id)],
+        )
+
+    def test_autocomplete_matches_every_word_prefix(self):
+        res = self.search("boe 74")
+
+        self.assertEqual(
+            [(result["kind"], result["label"]) for result in res.data],
+            [("airplane", "Boeing 747")],
+        )
+
+    def test_autocomplete_index_follows_changes(self):
+        self.search("united")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.country.name = "Ukraine"
+            self.country.save()
+
+        res = self.search("uk")
+
+        self.assertEqual(
+            [result["label"] for result in res.data], ["Ukraine"]
+        )
+
+    def test_autocomplete_limit(self):
+        res = self.search("n", limit=1)
+
+        self.assertEqual(len(res.data), 1)
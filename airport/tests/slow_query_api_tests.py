@@ -0,0 +1,124 @@
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport import slow_queries
+from airport.slow_queries import normalize_sql, wait_for_explains
+from airport.tests.order_api_tests import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+SLOW_QUERY_URL = reverse("slow-query-list")
+
+
+class NormalizeSqlTests(SimpleTestCase):
+    def test_literals_and_in_lists_replaced(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT * FROM t WHERE name = 'O''Hare' AND id IN "
+                "(%s, %s, %s)\n  AND rows > 10"
+            ),
+            "SELECT * FROM t WHERE name = ? AND id IN (...) AND rows > ?",
+        )
+
+
+class SlowQueryApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        slow_queries._explained_at.clear()
+        temporary_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_dir.cleanup)
+        settings_override = override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0,
+            SLOW_QUERY_EXPLAIN=False,
+            SLOW_QUERY_DIR=temporary_dir.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        sample_flight()
+
+    def flight_list_queries(self):
+        res = self.client.get(SLOW_QUERY_URL)
+        return [
+            query for query in res.data
+            if query["view"] == "airport:flight-list"
+        ]
+
+    def test_queries_over_threshold_recorded_with_view(self):
+        self.client.get(FLIGHT_URL, {"date": "2030-06-01"})
+
+        queries = self.flight_list_queries()
+
+        self.assertTrue(queries)
+        self.assertTrue(all(query["plan"] is None for query in queries))
+        self.assertTrue(any(
+            "airport_flight" in query["sql"] for query in queries
+        ))
+        self.assertTrue(all(query["params"] is None for query in queries))
+
+    def test_params_recorded_when_enabled(self):
+        with override_settings(SLOW_QUERY_CAPTURE_PARAMS=True):
+            self.client.get(FLIGHT_URL, {"date": "2030-06-01"})
+
+        self.assertTrue(any(
+            "airport_flight" in query["sql"] and query["params"]
+            for query in self.flight_list_queries()
+        ))
+
+    def test_login_params_not_stored(self):
+        self.client.post(
+            reverse("user:token_obtain_pair"),
+            {"email": "admin@admin.com", "password": "testpass"},
+        )
+
+        entries = slow_queries.get_slow_query_buffer().entries()
+        self.assertTrue(entries)
+        self.assertNotIn("admin@admin.com", str(entries))
+
+    @override_settings(SLOW_QUERY_EXPLAIN_INTERVAL=60)
+    def test_explain_claims_expire(self):
+        self.assertTrue(slow_queries._claim_explain("old"))
+        self.assertFalse(slow_queries._claim_explain("old"))
+        slow_queries._explained_at["old"] -= 61
+
+        self.assertTrue(slow_queries._claim_explain("new"))
+
+        self.assertEqual(list(slow_queries._explained_at), ["new"])
+
+    def test_slow_queries_admin_only(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(SLOW_QUERY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @skipUnless(connection.vendor == "postgresql", "EXPLAIN needs PostgreSQL")
+    def test_select_explained_in_background(self):
+        with override_settings(SLOW_QUERY_EXPLAIN=True):
+            self.client.get(FLIGHT_URL, {"date": "2030-06-01"})
+            wait_for_explains(timeout=10)
+
+        plans = [
+            query["plan"] for query in self.flight_list_queries()
+            if query["sql"].startswith("SELECT")
+        ]
+        self.assertTrue(any(
+            plan and "Execution Time" in plan for plan in plans
+        ))
+        self.assertFalse(any(
+            plan and "2030-06-01" in plan for plan in plans
+        ))
@@ -0,0 +1,38 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from airport.management.commands.startupprofile import parse_importtime
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     yaml.reader
+import time:       800 |        920 |   yaml
+import time:      1500 |       2420 | drf_spectacular.views
+"""
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        imports = parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(
+            imports,
+            [
+                ("yaml.reader", 120, 120, 2),
+                ("yaml", 800, 920, 1),
+                ("drf_spectacular.views", 1500, 2420, 0),
+            ],
+        )
+
+    def test_startup_profile_reports_time_to_first_request(self):
+        out = StringIO()
+
+        call_command("startupprofile", runs=1, json=True, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["status"], "200 OK")
+        self.assertGreater(report["first_request_ms"], report["boot_ms"])
+        self.assertTrue(report["packages"])
@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.throttling import (AnonRateThrottle,
+                                       ScopedRateThrottle,
+                                       UserRateThrottle)
+
+
+class ToggleableThrottleMixin:
+    """Lift every limit when ``THROTTLING_ENABLED`` is False"""
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLING_ENABLED:
+            return True
+
+        return super().allow_request(request, view)
+
+
+class ToggleableAnonRateThrottle(ToggleableThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class ToggleableUserRateThrottle(ToggleableThrottleMixin, UserRateThrottle):
+    pass
+
+
+class ToggleableScopedRateThrottle(
+    ToggleableThrottleMixin, ScopedRateThrottle
+):
+    pass
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from airport.availability import availability_stream
+
 from airport.views import (CrewViewSet,
                            CountryViewSet,
                            CityViewSet,
@@ -9,7 +11,10 @@ from airport.views import (CrewViewSet,
                            AirplaneViewSet,
                            RouteViewSet,
                            FlightViewSet,
-                           OrderViewSet)
+                           FlightScheduleViewSet,
+                           OrderViewSet,
+                           AutocompleteView,
+                           StreamTicketView)
 
 router = routers.DefaultRouter()
 router.register("crews", CrewViewSet)
@@ -20,8 +25,26 @@ router.register("airplane_types", AirplaneTypeViewSet)
 router.register("airplanes", AirplaneViewSet)
 router.register("routes", RouteViewSet)
 router.register("flights", FlightViewSet)
+router.register("flight_schedules", FlightScheduleViewSet)
 router.register("orders", OrderViewSet)
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path(
+        "flights/availability/stream/",
+        availability_stream,
+        name="flight-availability-stream",
+    ),
+    path(
+        "flights/availability/ticket/",
+        StreamTicketView.as_view(),
+        name="flight-availability-ticket",
+    ),
+    path(
+        "search/autocomplete/",
+        AutocompleteView.as_view(),
+        name="autocomplete",
+    ),
+    path("", include(router.urls)),
+]
 
 app_name = "airport"
@@ -1,11 +1,28 @@
-from django.db.models import F, Count
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAdminUser
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 from airport.models import (Crew,
                             Country,
@@ -15,9 +32,34 @@ from airport.models import (Crew,
                             Airplane,
                             Route,
                             Order,
-                            Flight)
+                            Flight,
+                            FlightSchedule,
+                            Ticket)
+from airport.availability import StreamTicket
+from airport.boarding_passes import (discard_render,
+                                     pass_data,
+                                     pass_path,
+                                     pass_tickets,
+                                     render,
+                                     render_order_passes)
+from airport.cancellation import cancel_flight, cancel_tickets
+from airport.conditional import ConditionalGetMixin
+from airport.fleet import airplane_free_windows
+from airport.idempotency import (IDEMPOTENCY_KEY_PARAMETER,
+                                 IdempotentCreateMixin)
+from airport.manifest import (CSVRenderer,
+                              manifest_rows,
+                              seat_map,
+                              stream_csv,
+                              stream_json)
+from airport.order_summary import order_summary
+from airport.pagination import EstimatedCountPaginator
 from airport.permissions import IsAdminOrIfAuthenticatedReadOnly
-from airport.serializers import (CountrySerializer,
+from airport.pricing import reprice_flights
+from airport.roster import crew_schedule, season_conflicts
+from airport.search import autocomplete
+from airport.serializers import (DynamicFieldsMixin,
+                                 CountrySerializer,
                                  CrewSerializer,
                                  CitySerializer,
                                  AirportSerializer,
@@ -26,13 +68,41 @@ from airport.serializers import (CountrySerializer,
                                  RouteSerializer,
                                  OrderSerializer,
                                  OrderListSerializer,
+                                 OrderSummarySerializer,
+                                 OrderCancelSerializer,
+                                 CancellationSerializer,
                                  FlightSerializer,
                                  AirplaneImageSerializer,
                                  FlightListSerializer,
                                  FlightDetailSerializer,
+                                 FlightScheduleSerializer,
                                  AirplaneListSerializer,
                                  RouteListSerializer,
-                                 RouteDetailSerializer)
+                                 RouteDetailSerializer,
+                                 CrewFlightSerializer,
+                                 CrewConflictSerializer,
+                                 TimeWindowSerializer,
+                                 AutocompleteResultSerializer,
+                                 StreamTicketSerializer)
+from airport.throttling import ToggleableScopedRateThrottle
+
+logger = logging.getLogger(__name__)
+
+AIRPLANE_AVAILABILITY_PERIOD = timedelta(days=7)
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+DYNAMIC_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Only return these fields (ex. ?fields=id,name)",
+    ),
+    OpenApiParameter(
+        "expand",
+        type=OpenApiTypes.STR,
+        description="Nest these related objects (ex. ?expand=route,crew)",
+    ),
+]
 
 
 class Pagination(PageNumberPagination):
@@ -40,66 +110,228 @@ class Pagination(PageNumberPagination):
     max_page_size = 100
 
 
+class RouteFlightsPagination(CursorPagination):
+    """Keyset pagination served by the (route, departure_time) index"""
+
+    page_size = 20
+    ordering = "departure_time"
+
+
+class EstimatedCountPagination(Pagination):
+    """Pagination for very large listings shared by every user.
+
+    Uses PostgreSQL planner estimates instead of an exact ``COUNT(*)``
+    once the result set exceeds ``ESTIMATED_COUNT_THRESHOLD`` rows.
+    Listings filtered per user are small and counted exactly with
+    ``Pagination`` instead, which doesn't pay for an ``EXPLAIN``.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_is_estimate": self.page.paginator.is_estimate,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_estimate"] = {
+            "type": "boolean",
+            "example": False,
+        }
+        return response_schema
+
+
+def datetime_query_param(request, name, default=None):
+    """Parse an ISO date or datetime query parameter into an aware datetime"""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValidationError(
+                {name: "Enter a valid date or datetime (ex. 2025-06-22)."}
+            )
+        parsed = datetime.combine(parsed_date, time.min)
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+
+    return parsed
+
+
+class DynamicFieldsViewMixin:
+    """Shape the queryset after the fields the serializer will render"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if (
+            self.request is not None
+            and issubclass(serializer_class, DynamicFieldsMixin)
+            and serializer_class.Meta.model is queryset.model
+        ):
+            queryset = serializer_class.optimize_queryset(
+                queryset, self.request
+            )
+
+        return queryset
+
+
 class CrewViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = Crew.objects.all()
+    etag_models = (Crew,)
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
+    def get_serializer_class(self):
+        if self.action == "schedule":
+            return CrewFlightSerializer
+
+        if self.action == "conflicts":
+            return CrewConflictSerializer
+
+        return CrewSerializer
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "start",
+                type=OpenApiTypes.DATETIME,
+                description="Only flights arriving after this moment, "
+                            "defaults to now (ex. ?start=2025-06-22)",
+            ),
+            OpenApiParameter(
+                "end",
+                type=OpenApiTypes.DATETIME,
+                description="Only flights departing before this moment "
+                            "(ex. ?end=2025-07-01)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=True, url_path="schedule")
+    def schedule(self, request, pk=None):
+        """Endpoint listing the flights a crew member is assigned to"""
+        crew = self.get_object()
+        flights = crew_schedule(
+            crew.id,
+            start=datetime_query_param(request, "start", timezone.now()),
+            end=datetime_query_param(request, "end"),
+        )
+        serializer = self.get_serializer(flights, many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "start",
+                type=OpenApiTypes.DATETIME,
+                description="Start of the scanned period, defaults to now "
+                            "(ex. ?start=2025-06-01)",
+            ),
+            OpenApiParameter(
+                "end",
+                type=OpenApiTypes.DATETIME,
+                description="End of the scanned period (ex. ?end=2025-10-01)",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="conflicts",
+        permission_classes=[IsAdminUser],
+    )
+    def conflicts(self, request):
+        """Endpoint reporting overlapping or under-rested crew duties"""
+        conflicts = season_conflicts(
+            start=datetime_query_param(request, "start", timezone.now()),
+            end=datetime_query_param(request, "end"),
+        )
+        serializer = self.get_serializer(list(conflicts), many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 class CountryViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = Country.objects.all()
+    etag_models = (Country,)
     serializer_class = CountrySerializer
     pagination_class = Pagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
 class CityViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = City.objects.all()
+    etag_models = (City, Country)
     serializer_class = CitySerializer
-    pagination_class = Pagination
+    pagination_class = EstimatedCountPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
 class AirportViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = Airport.objects.all()
+    etag_models = (Airport, City, Country)
     serializer_class = AirportSerializer
-    pagination_class = Pagination
+    pagination_class = EstimatedCountPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
 class AirplaneTypeViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = AirplaneType.objects.all()
+    etag_models = (AirplaneType,)
     serializer_class = AirplaneTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
 class AirplaneViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     GenericViewSet,
 ):
-    queryset = Airplane.objects.prefetch_related("airplane_type")
+    queryset = Airplane.objects.all()
+    etag_models = (Airplane, AirplaneType)
     pagination_class = Pagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
@@ -110,6 +342,9 @@ class AirplaneViewSet(
         if self.action == "upload_image":
             return AirplaneImageSerializer
 
+        if self.action == "availability":
+            return TimeWindowSerializer
+
         return AirplaneSerializer
 
     @staticmethod
@@ -123,7 +358,7 @@ class AirplaneViewSet(
         airplane_types = self.request.query_params.get("airplane_types")
         capacity_gte = self.request.query_params.get("capacity_gte")
 
-        queryset = self.queryset.annotate(
+        queryset = super().get_queryset().annotate(
             total_capacity=F("rows") * F("seats_in_row")
         )
 
@@ -156,6 +391,38 @@ class AirplaneViewSet(
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "start",
+                type=OpenApiTypes.DATETIME,
+                description="Start of the period, defaults to now "
+                            "(ex. ?start=2025-06-22)",
+            ),
+            OpenApiParameter(
+                "end",
+                type=OpenApiTypes.DATETIME,
+                description="End of the period, defaults to a week "
+                            "after start (ex. ?end=2025-06-29)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=True, url_path="availability")
+    def availability(self, request, pk=None):
+        """Endpoint listing time windows when the airplane has no flights"""
+        airplane = self.get_object()
+        start = datetime_query_param(request, "start", timezone.now())
+        end = datetime_query_param(
+            request, "end", start + AIRPLANE_AVAILABILITY_PERIOD
+        )
+        if end <= start:
+            raise ValidationError({"end": "End must be later than start."})
+
+        windows = airplane_free_windows(airplane.id, start, end)
+        serializer = self.get_serializer(windows, many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -176,6 +443,7 @@ class AirplaneViewSet(
                             "greater than or equal to the "
                             "specified value (ex. ?capacity_gte=200)",
             ),
+            *DYNAMIC_FIELDS_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -183,40 +451,123 @@ class AirplaneViewSet(
 
 
 class RouteViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     GenericViewSet,
 ):
-    queryset = Route.objects.all().select_related("source", "destination")
-    pagination_class = Pagination
+    queryset = Route.objects.all()
+    etag_models = (Route, Airport, City, Country, Flight)
+    etag_time_bucket = 60
+    conditional_actions = ("list", "retrieve", "flights")
+    pagination_class = EstimatedCountPagination
 
     def get_serializer_class(self):
         if self.action == "list":
             return RouteListSerializer
         if self.action == "retrieve":
             return RouteDetailSerializer
+        if self.action == "flights":
+            return FlightSerializer
         return RouteSerializer
 
+    def get_route_flights(self, route):
+        """Flights of the route departing after ?departure_after= (now)"""
+        departure_after = datetime_query_param(
+            self.request, "departure_after", timezone.now()
+        )
+        return Flight.objects.filter(
+            route=route, departure_time__gte=departure_after
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "departure_after",
+                type=OpenApiTypes.DATETIME,
+                description="Only embed flights departing after this "
+                            "moment, defaults to now (ex. ?departure_after="
+                            "2025-06-22)",
+            ),
+            *DYNAMIC_FIELDS_PARAMETERS,
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        """Route with the first page of its upcoming flights"""
+        route = self.get_object()
+        if "flights" in RouteDetailSerializer.requested_fields(request):
+            paginator = RouteFlightsPagination()
+            route.upcoming_flights = paginator.paginate_queryset(
+                self.get_route_flights(route).prefetch_related("crew"),
+                request,
+                view=self,
+            )
+            paginator.base_url = request.build_absolute_uri(
+                reverse("airport:route-flights", args=[route.id])
+            )
+            if "departure_after" in request.query_params:
+                paginator.base_url = replace_query_param(
+                    paginator.base_url,
+                    "departure_after",
+                    request.query_params["departure_after"],
+                )
+            route.flights_next = paginator.get_next_link()
+
+        serializer = self.get_serializer(route)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "departure_after",
+                type=OpenApiTypes.DATETIME,
+                description="Only flights departing after this moment, "
+                            "defaults to now (ex. ?departure_after="
+                            "2025-06-22)",
+            ),
+            *DYNAMIC_FIELDS_PARAMETERS,
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="flights",
+        pagination_class=RouteFlightsPagination,
+    )
+    def flights(self, request, pk=None):
+        """Endpoint paginating the flights of a route by departure time"""
+        route = self.get_object()
+        flights = FlightSerializer.optimize_queryset(
+            self.get_route_flights(route), request
+        )
+        page = self.paginate_queryset(flights)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
 
 class FlightViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     GenericViewSet
 ):
-    queryset = (
-        Flight.objects.all()
-        .select_related("route__source",
-                        "route__destination",
-                        "airplane__airplane_type")
-        .annotate(
-            tickets_available=(
-                F("airplane__rows") * F("airplane__seats_in_row")
-                - Count("tickets")
-            )
-        )
+    queryset = Flight.objects.all()
+    etag_models = (
+        Flight,
+        Route,
+        Airport,
+        City,
+        Country,
+        Airplane,
+        AirplaneType,
+        Crew,
+        Ticket,
     )
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
@@ -230,11 +581,11 @@ class FlightViewSet(
         routes = self.request.query_params.get("routes")
         date = self.request.query_params.get("date")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if airplanes:
             airplanes_ids = self._params_to_ints(airplanes)
-            queryset = queryset.filter(airplane__id_in=airplanes_ids)
+            queryset = queryset.filter(airplane__id__in=airplanes_ids)
 
         if routes:
             routes_ids = self._params_to_ints(routes)
@@ -254,6 +605,14 @@ class FlightViewSet(
 
         return FlightSerializer
 
+    def perform_create(self, serializer):
+        flight = serializer.save()
+        reprice_flights(Flight.objects.filter(pk=flight.pk))
+
+    def perform_update(self, serializer):
+        flight = serializer.save()
+        reprice_flights(Flight.objects.filter(pk=flight.pk))
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -271,32 +630,288 @@ class FlightViewSet(
                 type=OpenApiTypes.DATE,
                 description="Filter by flight date (ex. ?date=2025-06-22)",
             ),
+            *DYNAMIC_FIELDS_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(parameters=DYNAMIC_FIELDS_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        responses={
+            (200, "application/json"): OpenApiTypes.OBJECT,
+            (200, "text/csv"): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="manifest",
+        permission_classes=[IsAdminUser],
+        renderer_classes=[JSONRenderer, CSVRenderer],
+    )
+    def manifest(self, request, pk=None):
+        """Endpoint streaming the passengers of a flight (JSON or CSV)"""
+        flight = get_object_or_404(
+            Flight.objects.select_related("airplane"), pk=pk
+        )
+        seats = seat_map(flight)
+        rows = manifest_rows(flight)
+
+        if request.accepted_renderer.format == "csv":
+            response = StreamingHttpResponse(
+                stream_csv(rows), content_type="text/csv; charset=utf-8"
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="flight-{flight.id}-manifest.csv"'
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_json({"flight": flight.id, "seat_map": seats}, rows),
+                content_type="application/json",
+            )
+
+        for name, value in seats.items():
+            response[f"Seat-Map-{name.replace('_', '-').title()}"] = value
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+    @extend_schema(request=None, responses=CancellationSerializer)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="cancel",
+        permission_classes=[IsAdminUser],
+    )
+    def cancel(self, request, pk=None):
+        """Endpoint cancelling a flight with all its tickets"""
+        flight = get_object_or_404(Flight, pk=pk)
+        if flight.departure_time <= timezone.now():
+            raise ValidationError(
+                {"flight": "A departed flight can't be cancelled."}
+            )
+
+        cancellation = cancel_flight(flight)
+
+        return Response(
+            CancellationSerializer(cancellation).data,
+            status=status.HTTP_200_OK,
+        )
+
+
+class FlightScheduleViewSet(
+    ConditionalGetMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    GenericViewSet
+):
+    queryset = FlightSchedule.objects.prefetch_related("crew").order_by("id")
+    serializer_class = FlightScheduleSerializer
+    etag_models = (FlightSchedule,)
+    pagination_class = Pagination
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+
 
 class OrderViewSet(
+    ConditionalGetMixin,
+    DynamicFieldsViewMixin,
+    IdempotentCreateMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
-    queryset = Order.objects.select_related(
-        "tickets__flight__route", "tickets__flight__airplane"
-    )
+    queryset = Order.objects.all()
+    etag_per_user = True
+    etag_models = (Order, Ticket, Flight, Route, Airport, Airplane, Crew)
+    conditional_actions = ("list", "summary")
     serializer_class = OrderSerializer
     pagination_class = Pagination
-    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    permission_classes = (IsAuthenticated,)
+
+    @property
+    def etag_time_bucket(self):
+        """Trips of the summary move from upcoming to past with time"""
+        return 60 if self.action == "summary" else None
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
             return OrderListSerializer
 
+        if self.action == "summary":
+            return OrderSummarySerializer
+
+        if self.action == "cancel":
+            return OrderCancelSerializer
+
         return OrderSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        order = serializer.save(user=self.request.user)
+        # The load factor changed, so do the fares of the flights. A failed
+        # reprice must not fail the committed order: the next one fixes it.
+        flights = Flight.objects.filter(
+            pk__in=order.tickets.values("flight_id")
+        )
+        transaction.on_commit(lambda: reprice_flights(flights), robust=True)
+        # The order is committed whatever happens to its passes, which are
+        # rendered again on download. Robust callbacks are logged by their
+        # __qualname__, which partial objects lack.
+        transaction.on_commit(
+            lambda: render_order_passes(order.id), robust=True
+        )
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @action(methods=["GET"], detail=False, url_path="summary")
+    def summary(self, request):
+        """Endpoint summarizing the user's orders, trips and routes flown"""
+        serializer = self.get_serializer(order_summary(request.user))
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(responses=CancellationSerializer)
+    @action(methods=["POST"], detail=True, url_path="cancel")
+    def cancel(self, request, pk=None):
+        """Endpoint cancelling tickets of an order, or the whole order"""
+        order = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            cancellation = cancel_tickets(
+                Ticket.objects.filter(order=order),
+                serializer.validated_data.get("tickets"),
+            )
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict) from error
+
+        return Response(
+            CancellationSerializer(cancellation).data,
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ticket_id", type=OpenApiTypes.INT,
+                location=OpenApiParameter.PATH,
+            ),
+        ],
+        responses={
+            (200, "image/png"): OpenApiTypes.BINARY,
+            202: OpenApiTypes.OBJECT,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path=r"tickets/(?P<ticket_id>\d+)/pass",
+    )
+    def boarding_pass(self, request, pk=None, ticket_id=None):
+        """Endpoint downloading the boarding pass image of a ticket"""
+        order = self.get_object()
+        ticket = get_object_or_404(pass_tickets(), order=order, pk=ticket_id)
+        data = pass_data(ticket)
+        path = pass_path(data)
+        etag = quote_etag(path.stem)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        future = None
+        try:
+            future = render(data)
+            if future is not None:
+                future.result(timeout=settings.BOARDING_PASS_RENDER_TIMEOUT)
+        except TimeoutError:
+            return Response(
+                {"detail": "The boarding pass is being rendered."},
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": "1"},
+            )
+        except Exception:
+            logger.exception("Failed to render boarding pass %s", path.name)
+            if future is not None:
+                discard_render(data, future)
+            return Response(
+                {"detail": "The boarding pass can't be rendered now."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "5"},
+            )
+
+        response = FileResponse(
+            path.open("rb"),
+            content_type="image/png",
+            filename=f"boarding-pass-{ticket.id}.png",
+        )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AutocompleteView(APIView):
+    """Typeahead over airports, cities, countries and airplanes"""
+
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (ToggleableScopedRateThrottle,)
+    throttle_scope = "autocomplete"
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description="Typed prefix, every word must match "
+                            "(ex. ?q=new yo)",
+            ),
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description=f"Number of results, at most "
+                            f"{AUTOCOMPLETE_MAX_LIMIT} (ex. ?limit=5)",
+            ),
+        ],
+        responses=AutocompleteResultSerializer(many=True),
+    )
+    def get(self, request):
+        """Endpoint returning ranked name suggestions for a prefix"""
+        limit = request.query_params.get("limit", AUTOCOMPLETE_LIMIT)
+        try:
+            limit = min(max(int(limit), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError as error:
+            raise ValidationError(
+                {"limit": "Enter a whole number."}
+            ) from error
+
+        results = autocomplete(request.query_params.get("q", ""), limit)
+        serializer = AutocompleteResultSerializer(results, many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class StreamTicketView(APIView):
+    """Single-use ticket opening a seat availability stream"""
+
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (ToggleableScopedRateThrottle,)
+    throttle_scope = "stream_ticket"
+
+    @extend_schema(request=None, responses=StreamTicketSerializer)
+    def post(self, request):
+        """Endpoint trading the access token for a stream ticket"""
+        serializer = StreamTicketSerializer({
+            "ticket": str(StreamTicket.for_user(request.user)),
+            "expires_in": settings.SEAT_AVAILABILITY_TICKET_LIFETIME,
+        })
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -2,6 +2,8 @@
 ASGI config for airport_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. uvicorn) for the seat availability stream
+(``airport.availability``), which holds no thread per connected client.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
 from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / "subdir".
@@ -48,7 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "airport.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "airport.profiling.ProfilingMiddleware",
+    "airport.slow_queries.SlowQueryMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -146,12 +150,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "airport.throttling.ToggleableAnonRateThrottle",
+        "airport.throttling.ToggleableUserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "10/day", "user": "30/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10/day",
+        "user": "30/day",
+        "autocomplete": "120/min",
+        "stream_ticket": "30/min",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "airport.authentication.BatchSubRequestAuthentication",
     ),
 }
 
@@ -160,6 +170,10 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "Book flights",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    # Batch sub-request authentication is internal to /api/batch/
+    "AUTHENTICATION_WHITELIST": [
+        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    ],
     "SWAGGER_UI_SETTINGS": {
         "deepLinking": True,
         "defaultModelRendering": "model",
@@ -173,3 +187,112 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
 }
+
+# Shortest rest a crew member needs between two consecutive flights
+CREW_MIN_REST = timedelta(hours=10)
+
+# Longest flight accepted, which bounds the airplane overlap lookups
+MAX_FLIGHT_DURATION = timedelta(hours=24)
+
+# Row count above which paginators trust PostgreSQL planner estimates
+# instead of running an exact COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# /api/batch/ limits: sub-requests per batch and threads running the
+# read-only ones concurrently
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# File caching the OpenAPI schema between restarts, written by
+# `manage.py buildschema` or the first /api/schema/ request (None keeps the
+# schema in memory only)
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi-schema.json"
+
+# Let the front proxy send media files: "x-accel-redirect" (nginx, with an
+# internal location aliased to MEDIA_ROOT at MEDIA_ACCEL_REDIRECT_PREFIX)
+# or "x-sendfile" (Apache/lighttpd). None streams them from Django.
+MEDIA_SENDFILE_HEADER = os.environ.get("MEDIA_SENDFILE_HEADER") or None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
+# Browser cache lifetime of UUID-named uploads, which never change
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Request profiling (off unless PROFILING_ENABLED=True): the sampled
+# fraction of requests, path regexes always profiled and the secret that
+# profiles a request sending it in the X-Profile header
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED") == "True"
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_PATHS = []
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_ENTRIES = 200
+
+# Prometheus metrics at /metrics, for scrapers sending METRICS_TOKEN as a
+# bearer token (without one, for staff users logged in to the admin only).
+# Set METRICS_MULTIPROCESS_DIR when several worker processes serve the app
+# so each scrape sums all of them.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_MULTIPROCESS_DIR = os.environ.get("METRICS_MULTIPROCESS_DIR")
+METRICS_FLUSH_INTERVAL = 5
+
+# Queries slower than this are stored with their view and, on PostgreSQL,
+# an EXPLAIN (ANALYZE, BUFFERS) plan for SELECTs (None disables capture).
+# Their parameters may hold personal data and are only kept with
+# SLOW_QUERY_CAPTURE_PARAMS on.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 500))
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_CAPTURE_PARAMS = False
+SLOW_QUERY_EXPLAIN_INTERVAL = 600
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = 5000
+SLOW_QUERY_DIR = BASE_DIR / "slow_queries"
+SLOW_QUERY_MAX_ENTRIES = 500
+
+# Off lifts every API rate limit, e.g. while `manage.py loadtest` runs
+THROTTLING_ENABLED = True
+
+# How long a POST /orders/ response is replayed to retries sending the
+# same Idempotency-Key header
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# Boarding pass images: where they are cached, the worker processes
+# rendering them and how long a download waits for a missing one
+BOARDING_PASS_DIR = BASE_DIR / "boarding_passes"
+BOARDING_PASS_WORKERS = 2
+BOARDING_PASS_RENDER_TIMEOUT = 10
+
+# `manage.py test` caches boarding passes in a temporary directory
+TEST_RUNNER = "airport_system.test_runner.TestRunner"
+
+# Fares (see airport.pricing): base fare plus a rate per km, raised by
+# FARE_LOAD_FACTOR_SURCHARGE times the load factor and by the surcharge
+# of the first window departure falls in. `manage.py reprice` recomputes
+# FARE_REPRICE_BATCH_SIZE flights per statement.
+FARE_BASE = Decimal("20.00")
+FARE_PER_KM = Decimal("0.08")
+FARE_LOAD_FACTOR_SURCHARGE = 1.0
+FARE_DEPARTURE_SURCHARGES = (
+    (timedelta(days=3), 0.5),
+    (timedelta(days=7), 0.3),
+    (timedelta(days=14), 0.15),
+    (timedelta(days=30), 0.05),
+)
+FARE_REPRICE_BATCH_SIZE = 5000
+
+# Flight schedules (see airport.schedules) are materialized into flights
+# FLIGHT_SCHEDULE_HORIZON ahead, FLIGHT_SCHEDULE_BATCH_SIZE rows per INSERT
+FLIGHT_SCHEDULE_HORIZON = timedelta(days=90)
+FLIGHT_SCHEDULE_BATCH_SIZE = 1000
+
+# Live seat availability streams (see airport.availability): the backend
+# fanning changes out to processes, how often changes are pushed, the
+# keep-alive period, after how long clients have to reconnect, how many
+# flights one stream may watch, the seconds a stream ticket stays valid and
+# how many streams a user may keep open
+SEAT_AVAILABILITY_BACKEND = "airport.availability.LocalBackend"
+SEAT_AVAILABILITY_INTERVAL = 1.0
+SEAT_AVAILABILITY_HEARTBEAT = 15
+SEAT_AVAILABILITY_STREAM_TIMEOUT = 300
+SEAT_AVAILABILITY_MAX_FLIGHTS = 50
+SEAT_AVAILABILITY_TICKET_LIFETIME = 30
+SEAT_AVAILABILITY_MAX_STREAMS = 3
@@ -0,0 +1,23 @@
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Write the files tests create to a directory removed afterwards"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.boarding_pass_dir = tempfile.TemporaryDirectory(
+            prefix="boarding_passes-"
+        )
+        # Assigned like Django's own test settings: override_settings
+        # would hide SETTINGS_MODULE from the code under test
+        self.saved_boarding_pass_dir = settings.BOARDING_PASS_DIR
+        settings.BOARDING_PASS_DIR = self.boarding_pass_dir.name
+
+    def teardown_test_environment(self, **kwargs):
+        settings.BOARDING_PASS_DIR = self.saved_boarding_pass_dir
+        self.boarding_pass_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
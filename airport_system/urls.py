@@ -1,24 +1,70 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (SpectacularAPIView,
-                                   SpectacularSwaggerView,
-                                   SpectacularRedocView)
+from django.utils.module_loading import import_string
+
+from airport.batch import BatchView
+from airport.media import serve_media
+from airport.metrics import metrics_view
+from airport.profiling import ProfileDownloadView, ProfileListView
+from airport.slow_queries import SlowQueryListView
+
+
+def lazy_view(view_path, **initkwargs):
+    """Import a class-based view on its first request instead of at boot"""
+    view = None
+
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(view_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    dispatch.csrf_exempt = True
+    return dispatch
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/airport/", include("airport.urls", namespace="airport")),
     path("api/user/", include("user.urls", namespace="user")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("metrics", metrics_view, name="metrics"),
+    path("api/profiles/", ProfileListView.as_view(), name="profile-list"),
+    path(
+        "api/profiles/<str:profile_id>/download/",
+        ProfileDownloadView.as_view(),
+        name="profile-download",
+    ),
+    path(
+        "api/slow-queries/",
+        SlowQueryListView.as_view(),
+        name="slow-query-list",
+    ),
+    path(
+        "api/schema/",
+        lazy_view("airport.schema.CachedSchemaView"),
+        name="schema",
+    ),
     path(
         "api/doc/swagger/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        lazy_view(
+            "drf_spectacular.views.SpectacularSwaggerView",
+            url_name="schema",
+        ),
         name="swagger-ui",
     ),
     path(
         "api/doc/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
+        lazy_view(
+            "drf_spectacular.views.SpectacularRedocView",
+            url_name="schema",
+        ),
         name="redoc",
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/<path:path>",
+        serve_media,
+        name="media",
+    ),
+]